@@ -0,0 +1,425 @@
+"""
+Real Python 异步爬取引擎。
+
+与 real_python_scraper.py 的串行流程相比：
+- 列表页发现与文章详情抓取同时进行：列表页解析出的文章立即进入队列，
+  由固定数量的工作协程并发抓取；
+- 每个主机有独立的礼貌预算：并发连接数 + 聚合请求速率（每 delay 秒最多发起一个请求），
+  替代每个请求后的随机 sleep；两者由 rate_control.AimdController 根据响应延迟和 429/5xx 自适应调整；
+- 暂时性失败的文章进入 rate_control.RetryQueue，按指数退避延迟重试，而不是直接放弃；
+- 输出记录与串行模式完全相同（Title, URL, Date, Course Duration, Keywords, Content），
+  每篇文章解析完成后立即交给 output_writer.StreamingCSVWriter 写出；
+- 可选的增量模式与串行模式共用 crawl_state.CrawlStateStore（条件请求、跳过未变化文章）；
+- 传入 sitemap_url 时文章URL来自 sitemap（见 sitemap.py），而不是博客列表页；
+- 每次抓取的 dns / connect / ttfb / download 耗时通过 aiohttp 的 TraceConfig 计入 crawl_metrics。
+"""
+import asyncio
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import aiohttp
+
+import crawl_metrics
+from extractors import MISSING_DETAILS
+from rate_control import (
+    AimdController, RetryQueue, RetryableError, RETRYABLE_STATUSES, parse_retry_after, retry_inline_async,
+)
+from sitemap import SitemapDiscovery, SitemapParser, SitemapError, SITEMAP_CHUNK_SIZE
+
+REQUEST_TIMEOUT = 10 # 秒，与串行模式的 requests 超时保持一致
+QUEUE_SIZE_PER_WORKER = 4 # 文章队列长度 = 协程数 * 该值，发现过快时对列表页抓取形成背压
+RETRY_POLL_INTERVAL = 0.5 # 秒，检查重试队列中到期条目的最长间隔
+
+
+def fetch_trace_config():
+    """
+    记录 dns（未命中缓存时）、connect（不含 dns）和 ttfb（发出请求到收到响应头）阶段的耗时；
+    页面类型通过 session.get(..., trace_request_ctx={"kind": kind}) 传入。
+    """
+    config = aiohttp.TraceConfig()
+
+    def kind_of(ctx):
+        return (ctx.trace_request_ctx or {}).get("kind", "other")
+
+    async def on_request_start(session, ctx, params):
+        ctx.request_start = time.perf_counter()
+        ctx.dns_seconds = 0.0
+
+    async def on_dns_resolvehost_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_resolvehost_end(session, ctx, params):
+        ctx.dns_seconds = time.perf_counter() - ctx.dns_start
+        crawl_metrics.observe_fetch_phase(kind_of(ctx), "dns", ctx.dns_seconds)
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connection_create_end(session, ctx, params):
+        seconds = time.perf_counter() - ctx.connect_start - ctx.dns_seconds
+        crawl_metrics.observe_fetch_phase(kind_of(ctx), "connect", max(0.0, seconds))
+
+    async def on_request_end(session, ctx, params):
+        crawl_metrics.observe_fetch_phase(kind_of(ctx), "ttfb", time.perf_counter() - ctx.request_start)
+
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    config.on_connection_create_start.append(on_connection_create_start)
+    config.on_connection_create_end.append(on_connection_create_end)
+    config.on_request_end.append(on_request_end)
+    return config
+
+
+class HostPoliteness:
+    """
+    每个主机的礼貌预算，由该主机的 rate_control.AimdController 动态调整。
+
+    - 并发：同一主机同时进行中的请求不超过控制器当前的 limit（上限 max_per_host）；
+    - 速率：同一主机相邻两次请求的发起时间至少间隔控制器当前的 delay 秒（初始为 request_delay），
+      Retry-After 要求的暂停期间不发起新请求。
+      请求时间槽在进入时预约，因此多个协程排队时不会同时醒来挤占同一个时间槽。
+    adaptive=False 时保持固定的 request_delay 和 max_per_host（仍然遵守 Retry-After）。
+    """
+
+    def __init__(self, request_delay, max_per_host, min_delay=0.0, max_delay=60.0, adaptive=True):
+        self.request_delay = request_delay
+        self.max_per_host = max_per_host
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.adaptive = adaptive
+        self._controllers = {}
+        self._active = {}
+        self._waiters = {}
+        self._next_slot = {}
+
+    def controller(self, host):
+        if host not in self._controllers:
+            self._controllers[host] = AimdController(
+                self.request_delay, self.min_delay, self.max_delay, self.max_per_host,
+                initial_concurrency=1 if self.adaptive else self.max_per_host,
+                adaptive=self.adaptive,
+            )
+            self._active[host] = 0
+            self._waiters[host] = deque()
+        return self._controllers[host]
+
+    async def acquire(self, url):
+        host = urlparse(url).netloc
+        controller = self.controller(host)
+        loop = asyncio.get_running_loop()
+        while self._active[host] >= controller.limit:
+            waiter = loop.create_future()
+            self._waiters[host].append(waiter)
+            await waiter
+        self._active[host] += 1
+        now = loop.time()
+        slot = max(now, self._next_slot.get(host, now), controller.paused_until)
+        self._next_slot[host] = slot + controller.delay
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return host
+
+    def release(self, host):
+        self._active[host] -= 1
+        self._wake(host)
+
+    def record(self, host, status, latency, retry_after=None):
+        """把一次响应的结果交给该主机的控制器（status 为 None 表示连接错误或超时）。"""
+        self.controller(host).record(status, latency, retry_after)
+        self._wake(host)
+
+    def _wake(self, host):
+        """并发额度有空余时唤醒排队的协程；被唤醒的协程会重新检查额度。"""
+        waiters = self._waiters[host]
+        free = self._controllers[host].limit - self._active[host]
+        while waiters and free > 0:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+class AsyncCrawler:
+    """
+    有界工作池的异步爬虫。
+
+    scraper 参数是 real_python_scraper 模块本身，用于复用它的
+    listing_page_url / parse_listing_html / parse_article_html / build_article_record，
+    保证两种模式使用同一套选择器和输出格式。
+    """
+
+    def __init__(self, scraper, writer, concurrency, per_host, request_delay, crawl_state=None, adaptive=True):
+        self.scraper = scraper
+        self.writer = writer
+        self.crawl_state = crawl_state
+        self.concurrency = concurrency
+        self.politeness = HostPoliteness(
+            request_delay, per_host, scraper.MIN_REQUEST_DELAY, scraper.MAX_REQUEST_DELAY, adaptive
+        )
+        self.retries = RetryQueue()
+
+    async def fetch(self, session, url, headers=None, kind="article"):
+        """
+        在礼貌预算内抓取一个URL，返回 (状态码, 正文 bytes, 响应头)；请求失败返回 None。
+        304 响应不视为错误，正文为空。启用归档时，成功的响应以 kind（"article" 或 "listing"）归档。
+        429/5xx、连接错误和超时抛出 RetryableError，由调用方决定何时重试。
+        """
+        host = await self.politeness.acquire(url)
+        start = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers, trace_request_ctx={"kind": kind}) as response:
+                latency = time.perf_counter() - start
+                self.check_response(host, url, kind, response, latency)
+                if response.status == 304:
+                    self.scraper.notify_fetch(url, kind, response.status, 0, latency)
+                    return response.status, b"", response.headers
+                if response.status >= 400:
+                    self.scraper.notify_fetch(url, kind, response.status, 0, latency)
+                response.raise_for_status()
+                body = await response.read()
+                seconds = time.perf_counter() - start
+                crawl_metrics.observe_fetch_phase(kind, "download", seconds - latency)
+                self.scraper.notify_fetch(url, kind, response.status, len(body), seconds)
+                if self.scraper.ARCHIVE is not None:
+                    self.scraper.ARCHIVE.store(url, body, response.headers, kind)
+                return response.status, body, response.headers
+        except aiohttp.ClientResponseError as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.politeness.record(host, None, None)
+            raise RetryableError(f"Error fetching {url}: {e}") from e
+        finally:
+            self.politeness.release(host)
+
+    def check_response(self, host, url, kind, response, latency):
+        """把响应头到达的延迟和状态码交给速率控制器；暂时性失败的状态码抛出 RetryableError。"""
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        self.politeness.record(host, response.status, latency, retry_after)
+        if response.status in RETRYABLE_STATUSES:
+            self.scraper.notify_fetch(url, kind, response.status, 0, latency)
+            raise RetryableError(f"HTTP {response.status} for {url}", retry_after)
+
+    async def read_sitemap(self, session, url):
+        """在礼貌预算内流式读取并解析一个 sitemap 文件，返回其中的条目；失败时返回空列表。"""
+        print(f"Reading sitemap: {url}")
+        try:
+            entries = await retry_inline_async(self.read_sitemap_once, session, url)
+        except (aiohttp.ClientError, SitemapError) as e:
+            print(f"Error reading sitemap {url}: {e}")
+            return []
+        return entries or []
+
+    async def read_sitemap_once(self, session, url):
+        host = await self.politeness.acquire(url)
+        start = time.perf_counter()
+        parser = SitemapParser()
+        entries = []
+        try:
+            async with session.get(url, trace_request_ctx={"kind": "sitemap"}) as response:
+                latency = time.perf_counter() - start
+                self.check_response(host, url, "sitemap", response, latency)
+                response.raise_for_status()
+                num_bytes = 0
+                chunks = [] if self.scraper.ARCHIVE is not None else None # 供 --replay --sitemap 使用
+                async for chunk in response.content.iter_chunked(SITEMAP_CHUNK_SIZE):
+                    num_bytes += len(chunk)
+                    entries.extend(parser.feed(chunk))
+                    if chunks is not None:
+                        chunks.append(chunk)
+                entries.extend(parser.close())
+                if chunks is not None:
+                    self.scraper.ARCHIVE.store(url, b"".join(chunks), response.headers, "sitemap")
+                seconds = time.perf_counter() - start
+                crawl_metrics.observe_fetch_phase("sitemap", "download", seconds - latency)
+                self.scraper.notify_fetch(url, "sitemap", response.status, num_bytes, seconds)
+                return entries
+        except aiohttp.ClientResponseError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.politeness.record(host, None, None)
+            raise RetryableError(f"Error reading sitemap {url}: {e}") from e
+        finally:
+            self.politeness.release(host)
+
+    async def discover_sitemap(self, session, sitemap_url, max_pages, queue, start_page=1):
+        """遍历 sitemap，把每批文章放入队列；增量模式下跳过 lastmod 未变化的已知文章。"""
+        discovery = SitemapDiscovery(
+            sitemap_url, self.scraper.admit_sitemap_url, self.scraper.SITEMAP_PAGE_SIZE
+        )
+        while True:
+            sitemap = discovery.next_sitemap()
+            if sitemap is None:
+                pages = discovery.finish()
+            else:
+                pages = discovery.add_entries(await self.read_sitemap(session, sitemap))
+            for page_num, posts in pages:
+                if page_num > max_pages:
+                    return
+                if page_num >= start_page:
+                    posts = self.scraper.skip_unchanged_sitemap_posts(posts, self.crawl_state)
+                    await self.queue_page(page_num, posts, queue)
+            if sitemap is None:
+                return
+
+    async def discover(self, session, max_pages, queue, start_page=1):
+        """逐页抓取列表页，把发现的文章放入队列；某一页没有文章时停止分页。"""
+        for page_num in range(start_page, max_pages + 1):
+            page_url = self.scraper.listing_page_url(page_num)
+            print(f"\n--- Scraping Page {page_num} ---")
+            print(f"Scraping blog list page: {page_url}")
+            result = await retry_inline_async(self.fetch, session, page_url, None, "listing")
+            posts_on_page = self.scraper.parse_listing_html(result[1], page_url) if result else []
+            if not posts_on_page:
+                print(f"No posts found on page {page_num}. Stopping further pagination.")
+                break
+            if self.crawl_state and self.crawl_state.all_known(post["url"] for post in posts_on_page):
+                print(f"All articles on page {page_num} are already known. Stopping incremental crawl.")
+                for post_info in posts_on_page:
+                    self.crawl_state.mark_seen(post_info["url"])
+                break
+            await self.queue_page(page_num, self.scraper.admit_new_posts(posts_on_page), queue)
+
+    async def queue_page(self, page_num, posts_on_page, queue):
+        """登记一个列表页（或一批 sitemap 文章）并把未完成的文章放入队列。"""
+        self.writer.expect_page(page_num, [post["url"] for post in posts_on_page])
+        queued = 0
+        for post_info in posts_on_page:
+            if self.writer.is_done(post_info["url"]):
+                print(f"Already done in previous run, skipping: {post_info['url']}")
+                continue
+            await queue.put((page_num, post_info))
+            queued += 1
+        print(f"--- Queued {queued} articles from page {page_num} ---")
+
+    async def discover_articles(self, session, max_pages, queue, start_page=1, sitemap_url=None):
+        if sitemap_url:
+            await self.discover_sitemap(session, sitemap_url, max_pages, queue, start_page)
+        else:
+            await self.discover(session, max_pages, queue, start_page)
+
+    async def fetch_article(self, session, url, lastmod=None):
+        """
+        抓取并解析一篇文章。
+        全量模式下请求失败返回 MISSING_DETAILS（与串行模式一致）；
+        增量模式下 304、内容未变化或请求失败都返回 None，表示跳过。
+        """
+        headers = self.crawl_state.conditional_headers(url) if self.crawl_state else None
+        result = await self.fetch(session, url, headers=headers)
+        details = None
+        if result is not None and result[0] != 304:
+            details = self.scraper.parse_article_html(result[1], url)
+        return self.resolve_details(url, result, details, lastmod)
+
+    def resolve_details(self, url, result, details, lastmod=None):
+        """
+        根据抓取结果 result（fetch 的返回值）和解析结果 details 决定最终写出的内容，
+        并更新爬取状态库（lastmod 为 sitemap 中的修改时间）。返回 None 表示这篇文章不需要写出。
+        """
+        if not self.crawl_state:
+            return details if result is not None else MISSING_DETAILS
+
+        if result is None:
+            return None
+        status, _, headers = result
+        if status == 304:
+            self.crawl_state.mark_seen(url, lastmod)
+            print(f"Not modified (304), skipping: {url}")
+            return None
+        if not self.crawl_state.record_fetch(url, headers.get("ETag"), headers.get("Last-Modified"), details, lastmod):
+            print(f"Content unchanged, skipping: {url}")
+            return None
+        return details
+
+    def write_article(self, page_num, post_info, details):
+        """把一篇文章交给 writer；details 为 None 时只标记完成。"""
+        if details is None:
+            self.writer.article_done(page_num, post_info["url"])
+            return
+        record = self.scraper.build_article_record(post_info, details)
+        self.writer.article_done(page_num, post_info["url"], record)
+        self.scraper.report_article(post_info, details)
+
+    def retry_later(self, item, error):
+        """
+        把暂时失败的 (page_num, post_info) 放入重试队列；重试次数用完时返回 False，
+        调用方按普通的请求失败处理。
+        """
+        url = item[1]["url"]
+        if self.retries.schedule(url, item, error.retry_after):
+            print(f"{error}; will retry later: {url}")
+            return True
+        print(f"Giving up on {url}: {error}")
+        return False
+
+    async def pump_retries(self, queue):
+        """后台任务：把重试队列中到期的条目放回抓取队列。"""
+        while True:
+            for item in self.retries.pop_due():
+                await queue.put(item)
+            next_due = self.retries.next_due()
+            wait = RETRY_POLL_INTERVAL if next_due is None else next_due - time.monotonic()
+            await asyncio.sleep(min(RETRY_POLL_INTERVAL, max(0.0, wait)))
+
+    async def drain(self, queue):
+        """等待队列中的文章以及重试队列中的文章全部处理完毕。"""
+        while True:
+            await queue.join()
+            if not self.retries:
+                return
+            await asyncio.sleep(RETRY_POLL_INTERVAL)
+
+    async def article_worker(self, session, queue):
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                page_num, post_info = item
+                print(f"Processing article: {post_info.get('list_title', 'Unknown Title')}")
+                print(f"Fetching article details from: {post_info['url']}")
+                try:
+                    details = await self.fetch_article(session, post_info["url"], post_info.get("lastmod"))
+                except RetryableError as e:
+                    if self.retry_later(item, e):
+                        continue
+                    details = self.resolve_details(post_info["url"], None, None)
+                self.write_article(page_num, post_info, details)
+            finally:
+                queue.task_done()
+
+    def session(self):
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit_per_host=self.politeness.max_per_host)
+        return aiohttp.ClientSession(timeout=timeout, connector=connector, trace_configs=[fetch_trace_config()])
+
+    async def crawl(self, max_pages, start_page=1, sitemap_url=None):
+        queue = asyncio.Queue(maxsize=self.concurrency * QUEUE_SIZE_PER_WORKER)
+        async with self.session() as session:
+            workers = [
+                asyncio.create_task(self.article_worker(session, queue))
+                for _ in range(self.concurrency)
+            ]
+            pump = asyncio.create_task(self.pump_retries(queue))
+            try:
+                await self.discover_articles(session, max_pages, queue, start_page, sitemap_url)
+                await self.drain(queue)
+            finally:
+                pump.cancel()
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+
+
+def run_async_crawl(scraper, writer, max_pages, concurrency, per_host, request_delay,
+                    crawl_state=None, start_page=1, sitemap_url=None, adaptive=True):
+    """
+    同步入口：运行一次完整的异步爬取，记录通过 writer 流式写出。
+    传入 crawl_state（crawl_state.CrawlStateStore）时为增量模式，只写出新增或变化的文章；
+    start_page 和 writer 中的检查点用于 --resume 续爬；传入 sitemap_url 时从 sitemap 发现文章；
+    adaptive=False 时使用固定的 request_delay / per_host，不做自适应调整。
+    """
+    crawler = AsyncCrawler(scraper, writer, concurrency, per_host, request_delay, crawl_state, adaptive)
+    asyncio.run(crawler.crawl(max_pages, start_page, sitemap_url))
@@ -0,0 +1,108 @@
+"""
+HTML提取后端的微基准测试。
+
+对保存在本地目录中的文章页面（*.html）分别运行各个提取后端，报告每页平均耗时、
+每秒页数，并检查各后端的提取结果是否与参照实现 "bs4" 一致。
+
+用法：
+    # 先保存若干文章页面到 saved_pages/（只需要联网一次）
+    python bench_extraction.py saved_pages --download https://realpython.com/python-f-strings/ ...
+    # 之后离线反复运行
+    python bench_extraction.py saved_pages --repeat 5
+    # 或直接使用爬虫的原始响应归档（见 page_archive.py）中的全部文章页面
+    python bench_extraction.py --archive ../shared_data/page_archive
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import time
+
+import requests
+
+from extractors import EXTRACTORS, get_extractor
+from page_archive import PageArchive
+
+
+def download_pages(pages_dir, urls):
+    os.makedirs(pages_dir, exist_ok=True)
+    for url in urls:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        filename = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".html"
+        with open(os.path.join(pages_dir, filename), "wb") as f:
+            f.write(response.content)
+        print(f"Saved {url} -> {filename} ({len(response.content)} bytes)")
+
+
+def load_pages(pages_dir):
+    pages = []
+    for filename in sorted(os.listdir(pages_dir)):
+        if filename.endswith(".html"):
+            with open(os.path.join(pages_dir, filename), "rb") as f:
+                pages.append((filename, f.read()))
+    return pages
+
+
+def load_archived_pages(archive_dir):
+    archive = PageArchive(archive_dir)
+    try:
+        return [(url, archive.load(url)) for url in archive.urls("article")]
+    finally:
+        archive.close()
+
+
+def run_backend(extractor, pages, repeat):
+    """返回 (每页平均秒数, 每页的提取结果)。参照实现的调试输出不计入结果展示。"""
+    results = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for filename, html in pages:
+                results[filename] = extractor.extract_article(html, filename)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(pages)), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较各HTML提取后端的解析速度")
+    parser.add_argument("pages_dir", nargs="?", help="保存文章页面 *.html 的目录")
+    parser.add_argument("--archive", help="改为从原始响应归档目录读取文章页面")
+    parser.add_argument("--download", nargs="*", default=[], help="先下载这些文章URL到 pages_dir")
+    parser.add_argument("--repeat", type=int, default=3, help="每个后端重复处理全部页面的次数")
+    parser.add_argument("--backends", nargs="*", default=list(EXTRACTORS), help="参与比较的后端")
+    args = parser.parse_args()
+
+    if args.archive:
+        pages = load_archived_pages(args.archive)
+    elif args.pages_dir:
+        if args.download:
+            download_pages(args.pages_dir, args.download)
+        pages = load_pages(args.pages_dir)
+    else:
+        parser.error("either pages_dir or --archive is required")
+    if not pages:
+        print("No article pages found.")
+        return
+    total_mb = sum(len(html) for _, html in pages) / 1e6
+    print(f"{len(pages)} pages, {total_mb:.2f} MB, repeat={args.repeat}\n")
+
+    baseline_results = None
+    baseline_time = None
+    print(f"{'backend':<10}{'ms/page':>10}{'pages/s':>10}{'speedup':>10}{'mismatches':>12}")
+    for name in args.backends:
+        per_page, results = run_backend(get_extractor(name), pages, args.repeat)
+        if baseline_results is None:
+            baseline_results, baseline_time = results, per_page
+        mismatches = [f for f in results if results[f] != baseline_results[f]]
+        print(f"{name:<10}{per_page * 1000:>10.2f}{1 / per_page:>10.1f}"
+              f"{baseline_time / per_page:>9.1f}x{len(mismatches):>12}")
+        for filename in mismatches:
+            fields = ["title", "duration", "keywords", "content", "structure"]
+            diff = [field for field, a, b in zip(fields, results[filename], baseline_results[filename]) if a != b]
+            print(f"    {filename}: differs in {', '.join(diff)}")
+
+
+if __name__ == "__main__":
+    main()
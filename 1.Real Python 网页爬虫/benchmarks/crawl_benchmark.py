@@ -0,0 +1,241 @@
+"""
+爬取吞吐量基准测试。
+
+在独立进程中启动本地替身站点（mock_site.py），然后针对每种爬取模式
+（sync / async / pipeline）各启动一个新进程运行完整的 real_python_scraper.main()，统计：
+- 页面数、字节数、总耗时、pages/s、bytes/s；
+- 客户端测得的单次抓取延迟 p50 / p99（通过 real_python_scraper.FETCH_OBSERVERS，不含礼貌等待）；
+- 峰值 RSS（爬虫主进程，以及流水线模式下的解析子进程）。
+
+结果写入 JSON 文件，可以用 --compare 与之前的结果对比：
+    python crawl_benchmark.py --modes sync async pipeline --latency-ms 20 --extractor lxml
+    python crawl_benchmark.py --compare results/crawl_20250601-120000.json
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRAPER_DIR not in sys.path:
+    sys.path.insert(0, SCRAPER_DIR)
+
+from mock_site import MockSite, serve # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+MODES = ["sync", "async", "pipeline"]
+
+
+def percentile(values, q):
+    """最近秩法百分位数，values 为空时返回 None。"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    """返回 (本进程峰值RSS, 已结束子进程中的最大峰值RSS)，单位 MB；平台不支持时为 None。"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None, None
+        return psutil.Process().memory_info().peak_wset / 2**20, None
+    # Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 2**20
+    return own, children or None
+
+
+def scraper_argv(mode, options, base_url):
+    argv = [
+        "--max-pages", str(options["pages"] + 1),
+        "--no-archive",
+        # 只有 CSV 被重定向到临时目录，不能覆盖 shared_data 中的 Parquet 数据集和文章库
+        "--no-parquet",
+        "--no-store",
+        "--extractor", options["extractor"],
+        "--batch-size", "50",
+    ]
+    if mode == "async":
+        argv += ["--async"]
+    elif mode == "pipeline":
+        argv += ["--pipeline"]
+        if options["parse_workers"]:
+            argv += ["--parse-workers", str(options["parse_workers"])]
+    if options["sitemap"]:
+        argv += ["--sitemap", base_url + "/sitemap.xml"]
+    if mode in ("async", "pipeline"):
+        argv += ["--concurrency", str(options["concurrency"]), "--per-host", str(options["per_host"])]
+    return argv
+
+
+def run_crawl(base_url, mode, options, results):
+    """子进程入口：对替身站点运行一次完整爬取，把统计结果放入 results 队列。"""
+    import real_python_scraper as scraper
+
+    scraper.BASE_URL = base_url
+    scraper.BLOG_PAGE_URL = base_url + "/blog/"
+    scraper.REQUEST_DELAY = options["request_delay"]
+    scraper.MIN_REQUEST_DELAY = min(scraper.MIN_REQUEST_DELAY, options["request_delay"])
+
+    fetches = []
+    scraper.FETCH_OBSERVERS.append(
+        lambda url, kind, status, num_bytes, seconds: fetches.append((kind, status, num_bytes, seconds))
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scraper.CSV_FILENAME = os.path.join(tmp_dir, "benchmark.csv")
+        if not options["verbose"]:
+            # 在文件描述符层面静音，流水线的解析子进程会继承
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, 1)
+        start = time.perf_counter()
+        scraper.main(scraper_argv(mode, options, base_url))
+        elapsed = time.perf_counter() - start
+        with open(scraper.CSV_FILENAME, encoding="utf-8-sig") as f:
+            rows = sum(1 for _ in csv.DictReader(f))
+
+    latencies_ms = [seconds * 1000 for _, _, _, seconds in fetches]
+    total_bytes = sum(num_bytes for _, _, num_bytes, _ in fetches)
+    own_rss, children_rss = peak_rss_mb()
+    results.put({
+        "mode": mode,
+        "pages_fetched": len(fetches),
+        "articles_written": rows,
+        "bytes": total_bytes,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(len(fetches) / elapsed, 2),
+        "bytes_per_s": round(total_bytes / elapsed, 1),
+        "latency_p50_ms": round(percentile(latencies_ms, 50), 2) if latencies_ms else None,
+        "latency_p99_ms": round(percentile(latencies_ms, 99), 2) if latencies_ms else None,
+        "peak_rss_mb": round(own_rss, 1) if own_rss else None,
+        "peak_rss_children_mb": round(children_rss, 1) if children_rss else None,
+    })
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SCRAPER_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(runs, baseline=None):
+    baseline_by_mode = {run["mode"]: run for run in (baseline or {}).get("runs", [])}
+    header = f"{'mode':<10}{'pages':>7}{'pages/s':>10}{'MB/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'RSS MB':>8}"
+    if baseline_by_mode:
+        header += f"{'vs base':>10}"
+    print(header)
+    for run in runs:
+        line = (
+            f"{run['mode']:<10}{run['pages_fetched']:>7}{run['pages_per_s']:>10.1f}"
+            f"{run['bytes_per_s'] / 1e6:>8.2f}{run['latency_p50_ms'] or 0:>9.2f}"
+            f"{run['latency_p99_ms'] or 0:>9.2f}{run['peak_rss_mb'] or 0:>8.1f}"
+        )
+        base = baseline_by_mode.get(run["mode"])
+        if base:
+            change = (run["pages_per_s"] / base["pages_per_s"] - 1) * 100
+            line += f"{change:>+9.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Real Python 爬虫吞吐量基准测试")
+    parser.add_argument("--modes", nargs="*", choices=MODES, default=MODES)
+    parser.add_argument("--pages", type=int, default=5, help="替身站点的列表页数")
+    parser.add_argument("--per-page", type=int, default=20, help="每个列表页的文章数")
+    parser.add_argument("--paragraphs", type=int, default=120, help="每篇文章的段落数")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="替身站点每个请求的延迟")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身站点随机返回 503 的请求比例")
+    parser.add_argument("--request-delay", type=float, default=0.0,
+                        help="覆盖爬虫的 REQUEST_DELAY（默认 0，只测量爬虫本身）")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=16)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--extractor", default="bs4")
+    parser.add_argument("--sitemap", action="store_true", help="通过替身站点的 sitemap 发现文章，代替列表页")
+    parser.add_argument("--output", help="结果JSON路径，默认 results/crawl_<时间>.json")
+    parser.add_argument("--compare", help="与之前的结果JSON对比 pages/s")
+    parser.add_argument("--verbose", action="store_true", help="显示爬虫自身的输出")
+    args = parser.parse_args()
+
+    options = {
+        "pages": args.pages,
+        "per_page": args.per_page,
+        "paragraphs": args.paragraphs,
+        "latency_ms": args.latency_ms,
+        "error_rate": args.error_rate,
+        "request_delay": args.request_delay,
+        "concurrency": args.concurrency,
+        "per_host": args.per_host,
+        "parse_workers": args.parse_workers,
+        "extractor": args.extractor,
+        "sitemap": args.sitemap,
+        "verbose": args.verbose,
+    }
+
+    site = MockSite(args.pages, args.per_page, args.paragraphs, args.latency_ms, args.error_rate)
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(site, 0, ready), daemon=True)
+    server.start()
+    base_url = ready.get(timeout=30)
+    print(f"Mock site: {base_url}/blog/ ({site.article_count} articles, {args.latency_ms} ms latency)\n")
+
+    runs = []
+    try:
+        for mode in args.modes:
+            results = multiprocessing.Queue()
+            child = multiprocessing.Process(target=run_crawl, args=(base_url, mode, options, results))
+            child.start()
+            runs.append(results.get())
+            child.join()
+            print(f"{mode}: done in {runs[-1]['elapsed_s']} s")
+    finally:
+        server.terminate()
+
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "options": {key: value for key, value in options.items() if key != "verbose"},
+        "runs": runs,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"crawl_{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with contextlib.suppress(KeyError):
+            print(f"\nBaseline: {args.compare} (revision {baseline['git_revision']})")
+    print()
+    print_table(runs, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
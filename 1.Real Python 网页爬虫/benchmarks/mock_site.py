@@ -0,0 +1,232 @@
+"""
+本地的 Real Python 替身站点，供爬取基准测试使用。
+
+- /blog/ 与 /blog/page/N/：N 个博客列表页，每页若干 div.card-body 卡片，
+  另外混入一个会被 EXCLUDED_URL_PATTERNS 过滤掉的 /quizzes/ 卡片；超出页数返回 404；
+- /<slug>/：文章页，使用爬虫选择器期望的标记结构（文章容器、div.mb-0 中的标签、
+  课程时长 span、div.article-body），并带有导航、脚本、侧边栏等真实页面中常见的“噪音”；
+- /sitemap.xml：sitemap 索引，每个列表页对应一个 /sitemap-posts-N.xml（带 lastmod），
+  另有一个只包含非文章页面的 /sitemap-pages.xml；
+- 支持 ETag / If-None-Match（304），可配置的服务端延迟用于模拟网络往返；
+- error_rate > 0 时按该比例随机返回 503 + Retry-After，用于测试退避与重试。
+
+页面内容由文章编号确定性生成，多次运行之间完全一致。
+
+单独运行：
+    python mock_site.py --port 8765 --pages 20 --per-page 20
+"""
+import argparse
+import hashlib
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "python function class module import data list dict string loop async await "
+    "decorator generator iterator context manager exception testing package virtual "
+    "environment pandas numpy django flask api request response database query"
+).split()
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+TAGS = ["basics", "intermediate", "advanced", "python", "data-science", "web-dev", "testing", "devops"]
+
+
+class MockSite:
+    """文章与列表页的确定性生成器。"""
+
+    def __init__(self, pages=10, per_page=20, paragraphs=120, latency_ms=0.0, error_rate=0.0):
+        self.pages = pages
+        self.per_page = per_page
+        self.paragraphs = paragraphs
+        self.latency = latency_ms / 1000.0
+        self.error_rate = error_rate
+        self._rendered = {} # 页面只生成一次，避免服务端的生成开销影响爬虫的测量
+
+    @property
+    def article_count(self):
+        return self.pages * self.per_page
+
+    @staticmethod
+    def slug(article_id):
+        return f"mock-article-{article_id}"
+
+    def listing_html(self, page_num):
+        cards = []
+        first = (page_num - 1) * self.per_page
+        for article_id in range(first, first + self.per_page):
+            cards.append(
+                f'<div class="card border-0"><div class="card-body p-0">'
+                f'<a href="/{self.slug(article_id)}/"><h2 class="card-title h4 my-0 py-0">Mock Article {article_id}</h2></a>'
+                f'<p class="card-text text-muted"><small><span class="mr-2">'
+                f'{["Jan", "Feb", "Mar", "Apr", "May", "Jun"][article_id % 6]} {article_id % 28 + 1}, {2020 + article_id % 5}'
+                f'</span></small></p></div></div>'
+            )
+        cards.append(
+            '<div class="card border-0"><div class="card-body p-0"><a href="/quizzes/mock-quiz/">'
+            '<h2 class="card-title h4 my-0 py-0">Mock Quiz</h2></a></div></div>'
+        )
+        return self._page(f'<div class="container"><div class="row">{"".join(cards)}</div></div>')
+
+    def article_html(self, article_id):
+        rng = random.Random(article_id)
+        tags = rng.sample(TAGS, 3)
+        badges = "".join(
+            f'<a href="/tutorials/{tag}/" class="badge badge-light text-muted" data-previewable>{tag}</a>'
+            for tag in tags
+        )
+        duration = f'<span title="Course duration">{rng.randint(10, 120)}m</span>' if article_id % 3 == 0 else ""
+        body = []
+        for i in range(self.paragraphs):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 80)))
+            body.append(f"<p>{sentence} <code>{rng.choice(WORDS)}_{i}()</code>.</p>")
+            if i % 10 == 0:
+                body.append(f'<h2 id="section-{i}">Section {i}</h2>')
+                body.append(f'<div class="highlight python"><pre><span></span><code>def {rng.choice(WORDS)}_{i}(x):\n'
+                            f'    return x * {i}\n</code></pre></div>')
+        article = (
+            f'<div class="col-md-11 col-lg-8 article with-headerlinks">'
+            f'<h1>Mock Article {article_id}</h1>{duration}'
+            f'<div class="mb-0"><span class="text-muted">by Mock Author</span>'
+            f'<span class="d-inline d-md-block">{badges}</span></div>'
+            f'<div class="article-body">{"".join(body)}<script>trackReading({article_id});</script></div></div>'
+        )
+        sidebar = "".join(
+            f'<li><a class="badge badge-dark" href="/sidebar/{i}/">related {i}</a></li>' for i in range(30)
+        )
+        return self._page(f'<div class="container"><div class="row">{article}<aside><ul>{sidebar}</ul></aside></div></div>')
+
+    @staticmethod
+    def lastmod(article_id):
+        return f"{2020 + article_id % 5}-{article_id % 12 + 1:02d}-{article_id % 28 + 1:02d}T08:00:00+00:00"
+
+    def sitemap_index_xml(self, base_url):
+        sitemaps = [f"{base_url}/sitemap-posts-{n}.xml" for n in range(1, self.pages + 1)]
+        sitemaps.append(f"{base_url}/sitemap-pages.xml")
+        entries = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in sitemaps)
+        return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{SITEMAP_NS}">{entries}</sitemapindex>'
+
+    def sitemap_xml(self, base_url, page_num):
+        first = (page_num - 1) * self.per_page
+        entries = "".join(
+            f"<url><loc>{base_url}/{self.slug(article_id)}/</loc><lastmod>{self.lastmod(article_id)}</lastmod></url>"
+            for article_id in range(first, first + self.per_page)
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">{entries}</urlset>'
+
+    @staticmethod
+    def pages_sitemap_xml(base_url):
+        entries = "".join(
+            f"<url><loc>{base_url}{path}</loc></url>"
+            for path in ["/", "/blog/", "/tutorials/basics/", "/quizzes/mock-quiz/", "/learning-paths/mock/"]
+        )
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">{entries}</urlset>'
+
+    @staticmethod
+    def _page(main):
+        nav = "".join(f'<a class="nav-link" href="/nav/{i}/">Menu {i}</a>' for i in range(80))
+        scripts = "<script>" + "window.dataLayer=window.dataLayer||[];" * 200 + "</script>"
+        return (
+            f'<!doctype html><html><head><meta charset="utf-8"><title>Mock Real Python</title>{scripts}</head>'
+            f'<body><nav>{nav}</nav>{main}<footer>{"<p>Mock footer</p>" * 40}</footer></body></html>'
+        )
+
+    def render(self, path, base_url=""):
+        """返回 (状态码, 正文 bytes)；base_url 用于生成 sitemap 中的绝对URL。"""
+        if path not in self._rendered:
+            self._rendered[path] = self._render(path, base_url)
+        return self._rendered[path]
+
+    def _render(self, path, base_url):
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        if parts == ["sitemap.xml"]:
+            return 200, self.sitemap_index_xml(base_url).encode("utf-8")
+        if parts == ["sitemap-pages.xml"]:
+            return 200, self.pages_sitemap_xml(base_url).encode("utf-8")
+        if len(parts) == 1 and parts[0].startswith("sitemap-posts-") and parts[0].endswith(".xml"):
+            page_num = parts[0][len("sitemap-posts-"):-len(".xml")]
+            if page_num.isdigit() and 1 <= int(page_num) <= self.pages:
+                return 200, self.sitemap_xml(base_url, int(page_num)).encode("utf-8")
+            return 404, b"not found"
+        if parts[:1] == ["blog"]:
+            page_num = 1
+            if len(parts) == 3 and parts[1] == "page" and parts[2].isdigit():
+                page_num = int(parts[2])
+            elif len(parts) != 1:
+                return 404, b"not found"
+            if 1 <= page_num <= self.pages:
+                return 200, self.listing_html(page_num).encode("utf-8")
+            return 404, b"not found"
+        if len(parts) == 1 and parts[0].startswith("mock-article-"):
+            article_id = parts[0].rsplit("-", 1)[1]
+            if article_id.isdigit() and int(article_id) < self.article_count:
+                return 200, self.article_html(int(article_id)).encode("utf-8")
+        return 404, b"not found"
+
+
+def make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if site.latency:
+                time.sleep(site.latency)
+            if site.error_rate and random.random() < site.error_rate:
+                self.send_response(503)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status, body = site.render(self.path, f"http://{self.headers.get('Host', 'localhost')}")
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(status)
+            content_type = "application/xml" if self.path.endswith(".xml") else "text/html; charset=utf-8"
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if status == 200:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128 # 默认的 listen 队列只有 5，高并发时 SYN 被丢弃会带来 1 秒的重传延迟
+
+    def handle_error(self, request, client_address):
+        pass # 客户端在爬取结束时直接断开 keep-alive 连接，不必打印
+
+
+def serve(site, port, ready=None):
+    """在当前进程中阻塞运行服务器；ready 是可选的 multiprocessing 队列，用于回传 base_url。"""
+    server = MockServer(("127.0.0.1", port), make_handler(site))
+    if ready is not None:
+        ready.put(f"http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Real Python 替身站点")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=10, help="博客列表页数")
+    parser.add_argument("--per-page", type=int, default=20, help="每个列表页的文章数")
+    parser.add_argument("--paragraphs", type=int, default=120, help="每篇文章的段落数（控制页面大小）")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的服务端延迟")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 503 的请求比例")
+    args = parser.parse_args()
+    site = MockSite(args.pages, args.per_page, args.paragraphs, args.latency_ms, args.error_rate)
+    print(f"Serving {site.article_count} mock articles on http://127.0.0.1:{args.port}/blog/")
+    serve(site, args.port)
+
+
+if __name__ == "__main__":
+    main()
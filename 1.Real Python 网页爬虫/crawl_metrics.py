@@ -0,0 +1,231 @@
+"""
+爬虫的结构化指标（Prometheus 格式）。
+
+记录每个阶段花费的时间，用来判断爬取时间到底花在哪里：
+- 抓取：按页面类型（listing / article / sitemap）和阶段（dns / connect / ttfb / download / total）
+  的耗时直方图，以及响应数（按状态码）和字节数。ttfb 为发出请求到收到响应头的时间（包含 dns 和 connect）；
+  requests 不暴露连接建立的细节，串行模式只有 ttfb / download / total，异步和流水线模式通过
+  aiohttp 的 TraceConfig 额外记录 dns / connect；
+- 解析：每个提取后端按选择器阶段（document 建树、title、duration、keywords、body、structure、listing）计时，
+  并统计走备用选择器的次数（例如找不到文章容器时的 a.badge 备用路径）；
+- 写出：每条记录交给 writer 的时间、近似重复检测（MinHash + LSH）的时间和每次 flush（写文件 + fsync + 检查点）的时间。
+
+指标注册在独立的 REGISTRY 中，可以用 TextfileExporter 定期写成文本文件（供 node-exporter 的
+textfile collector 读取），或用 start_metrics_server 在本地开放 /metrics 端点，
+爬取结束时 summary_table() 给出各阶段的汇总表。
+
+流水线和重放模式在进程池中解析，子进程调用 buffer_samples() 后，解析阶段的样本先缓存在本地，
+随解析结果一起返回（take_samples），由主进程 apply_samples() 计入指标。
+"""
+import os
+import threading
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, start_http_server, write_to_textfile
+
+DEFAULT_METRICS_PORT = 9108
+TEXTFILE_INTERVAL = 15 # 秒，文本文件的刷新间隔
+
+FETCH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PARSE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+REGISTRY = CollectorRegistry()
+
+FETCHES = Counter(
+    "crawler_fetches",
+    "Completed HTTP responses",
+    ["kind", "status"],
+    registry=REGISTRY,
+)
+FETCH_BYTES = Counter(
+    "crawler_fetch_bytes",
+    "Response body bytes downloaded",
+    ["kind"],
+    registry=REGISTRY,
+)
+FETCH_PHASE_SECONDS = Histogram(
+    "crawler_fetch_phase_seconds",
+    "Time spent in each phase of a fetch",
+    ["kind", "phase"],
+    buckets=FETCH_BUCKETS,
+    registry=REGISTRY,
+)
+PARSE_SECONDS = Histogram(
+    "crawler_parse_seconds",
+    "Time spent in each selector stage of HTML extraction",
+    ["extractor", "stage"],
+    buckets=PARSE_BUCKETS,
+    registry=REGISTRY,
+)
+SELECTOR_FALLBACKS = Counter(
+    "crawler_selector_fallbacks",
+    "Extractions that fell back to a less specific selector",
+    ["extractor", "selector"],
+    registry=REGISTRY,
+)
+WRITE_SECONDS = Histogram(
+    "crawler_write_seconds",
+    "Time spent handing records to the CSV writer and flushing them",
+    ["op"],
+    buckets=PARSE_BUCKETS,
+    registry=REGISTRY,
+)
+
+_samples = None # 解析子进程中的样本缓存，为 None 时直接计入指标
+
+
+def record_fetch(url, kind, status, num_bytes, seconds):
+    """抓取观察者（见 real_python_scraper.FETCH_OBSERVERS）：响应数、字节数和总耗时。"""
+    FETCHES.labels(kind, str(status)).inc()
+    FETCH_BYTES.labels(kind).inc(num_bytes)
+    FETCH_PHASE_SECONDS.labels(kind, "total").observe(seconds)
+
+
+def observe_fetch_phase(kind, phase, seconds):
+    FETCH_PHASE_SECONDS.labels(kind, phase).observe(seconds)
+
+
+def observe_write(op, seconds):
+    WRITE_SECONDS.labels(op).observe(seconds)
+
+
+def observe_parse(extractor, stage, seconds):
+    if _samples is not None:
+        _samples.append(("parse", extractor, stage, seconds))
+    else:
+        PARSE_SECONDS.labels(extractor, stage).observe(seconds)
+
+
+def count_fallback(extractor, selector):
+    if _samples is not None:
+        _samples.append(("fallback", extractor, selector, 1))
+    else:
+        SELECTOR_FALLBACKS.labels(extractor, selector).inc()
+
+
+def buffer_samples():
+    """在解析子进程中调用：之后的解析样本先缓存，由 take_samples() 取出。"""
+    global _samples
+    _samples = []
+
+
+def take_samples():
+    """取出并清空缓存的解析样本（可以 pickle，随解析结果返回主进程）。"""
+    if _samples is None:
+        return []
+    samples = list(_samples)
+    _samples.clear()
+    return samples
+
+
+def apply_samples(samples):
+    for kind, first, second, value in samples:
+        if kind == "parse":
+            PARSE_SECONDS.labels(first, second).observe(value)
+        else:
+            SELECTOR_FALLBACKS.labels(first, second).inc(value)
+
+
+class StageTimer:
+    """连续阶段计时：lap(stage) 记录从上一次 lap（或创建时）到现在的耗时。"""
+
+    __slots__ = ("extractor", "_last")
+
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        observe_parse(self.extractor, stage, now - self._last)
+        self._last = now
+
+
+class TextfileExporter:
+    """后台线程每 interval 秒把全部指标原子地写入 path，stop() 时再写最后一次。"""
+
+    def __init__(self, path, interval=TEXTFILE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+
+    def start(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            write_to_textfile(self.path, REGISTRY)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        write_to_textfile(self.path, REGISTRY)
+
+
+def start_metrics_server(port=DEFAULT_METRICS_PORT, addr="0.0.0.0"):
+    """在后台线程中开放 http://<addr>:<port>/metrics，进程退出时随之结束。"""
+    start_http_server(port, addr=addr, registry=REGISTRY)
+    print(f"Serving crawler metrics on http://{addr}:{port}/metrics")
+
+
+def _histogram_totals(histogram):
+    """{标签元组: (次数, 总秒数)}，按标签排序。"""
+    totals = {}
+    for metric in histogram.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count") or sample.name.endswith("_sum"):
+                labels = tuple(sample.labels.values())
+                count, total = totals.get(labels, (0, 0.0))
+                if sample.name.endswith("_count"):
+                    count = int(sample.value)
+                else:
+                    total = sample.value
+                totals[labels] = (count, total)
+    return dict(sorted(totals.items()))
+
+
+def _counter_values(counter):
+    values = {}
+    for metric in counter.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                values[tuple(sample.labels.values())] = sample.value
+    return dict(sorted(values.items()))
+
+
+def summary_table(wall_seconds=None):
+    """各阶段的次数、总耗时和平均耗时，以及字节数和备用选择器计数；异步模式下各阶段的时间相互重叠。"""
+    lines = ["", "=== Crawl metrics summary ==="]
+    if wall_seconds is not None:
+        lines.append(f"Wall time: {wall_seconds:.2f} s")
+    lines.append(f"{'stage':<36}{'count':>8}{'total s':>11}{'mean ms':>11}")
+    sections = [
+        ("fetch", FETCH_PHASE_SECONDS),
+        ("parse", PARSE_SECONDS),
+        ("write", WRITE_SECONDS),
+    ]
+    for prefix, histogram in sections:
+        for labels, (count, total) in _histogram_totals(histogram).items():
+            if not count:
+                continue
+            stage = " ".join((prefix,) + labels)
+            lines.append(f"{stage:<36}{count:>8}{total:>11.3f}{total / count * 1000:>11.2f}")
+
+    fetched = _counter_values(FETCH_BYTES)
+    if fetched:
+        lines.append("Bytes fetched: " + ", ".join(
+            f"{kind} {num_bytes / 1e6:.2f} MB" for (kind,), num_bytes in fetched.items()
+        ))
+    statuses = _counter_values(FETCHES)
+    if statuses:
+        lines.append("Responses: " + ", ".join(
+            f"{kind} {status} x{int(count)}" for (kind, status), count in statuses.items()
+        ))
+    fallbacks = _counter_values(SELECTOR_FALLBACKS)
+    lines.append("Selector fallbacks: " + (", ".join(
+        f"{extractor} {selector} x{int(count)}" for (extractor, selector), count in fallbacks.items()
+    ) or "none"))
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+"""
+增量爬取的状态库（SQLite）。
+
+为每篇文章记录 URL、ETag / Last-Modified、提取结果的内容哈希以及最近一次见到的时间。
+重新运行时：
+- 文章请求带上 If-None-Match / If-Modified-Since，服务器返回 304 即跳过；
+- 返回 200 但提取结果哈希未变的文章同样视为未变化，不重写输出；
+- 列表页上全部是已知URL时停止继续分页；
+- sitemap 模式下还记录每篇文章在 sitemap 中的 lastmod，lastmod 未变化的已知文章不再请求。
+"""
+import hashlib
+import os
+import sqlite3
+import time
+
+CRAWL_STATE_DB = "../shared_data/crawl_state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url           TEXT PRIMARY KEY,
+    etag          TEXT,
+    last_modified TEXT,
+    content_hash  TEXT,
+    first_seen    REAL NOT NULL,
+    last_seen     REAL NOT NULL,
+    last_changed  REAL,
+    sitemap_lastmod TEXT
+)
+"""
+
+# 旧版本状态库缺少的列，打开时补上
+MIGRATIONS = {
+    "sitemap_lastmod": "ALTER TABLE articles ADD COLUMN sitemap_lastmod TEXT",
+}
+
+
+def details_hash(details):
+    """
+    对 (标题, 课程时长, 关键词, 正文) 计算稳定的内容哈希。结构化正文由同一段HTML派生，不计入哈希，
+    这样旧版本状态库中的哈希仍然有效。
+    """
+    title, duration, keywords, content = details[:4]
+    payload = "\x1f".join([title, duration, ",".join(keywords), content])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CrawlStateStore:
+    """文章级别的爬取状态，按 URL 索引。"""
+
+    def __init__(self, path=CRAWL_STATE_DB):
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(SCHEMA)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(articles)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                self.conn.execute(statement)
+        self.conn.commit()
+
+    def get(self, url):
+        row = self.conn.execute("SELECT * FROM articles WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def is_known(self, url):
+        """是否已经成功抓取并记录过这篇文章。"""
+        row = self.conn.execute(
+            "SELECT 1 FROM articles WHERE url = ? AND content_hash IS NOT NULL", (url,)
+        ).fetchone()
+        return row is not None
+
+    def all_known(self, urls):
+        """列表页上的URL是否全部已记录过（空列表视为 False）。"""
+        urls = list(urls)
+        return bool(urls) and all(self.is_known(url) for url in urls)
+
+    def lastmod_unchanged(self, url, lastmod):
+        """sitemap 中的 lastmod 与上次成功抓取时记录的相同（lastmod 缺失时总是视为可能变化）。"""
+        if not lastmod:
+            return False
+        row = self.conn.execute(
+            "SELECT 1 FROM articles WHERE url = ? AND content_hash IS NOT NULL AND sitemap_lastmod = ?",
+            (url, lastmod),
+        ).fetchone()
+        return row is not None
+
+    def conditional_headers(self, url):
+        """根据上次响应的 ETag / Last-Modified 构造条件请求头。"""
+        row = self.get(url)
+        headers = {}
+        if row:
+            if row["etag"]:
+                headers["If-None-Match"] = row["etag"]
+            if row["last_modified"]:
+                headers["If-Modified-Since"] = row["last_modified"]
+        return headers
+
+    def mark_seen(self, url, sitemap_lastmod=None):
+        """已知文章在列表页出现或返回 304 时，只刷新 last_seen（以及 sitemap 中的 lastmod）。"""
+        self.conn.execute(
+            "UPDATE articles SET last_seen = ?, sitemap_lastmod = COALESCE(?, sitemap_lastmod) WHERE url = ?",
+            (time.time(), sitemap_lastmod, url),
+        )
+
+    def record_fetch(self, url, etag, last_modified, details, sitemap_lastmod=None):
+        """
+        记录一次成功抓取（HTTP 200）的结果。
+        返回 True 表示文章是新的或提取结果发生了变化，需要写入输出。
+        """
+        now = time.time()
+        new_hash = details_hash(details)
+        row = self.get(url)
+        changed = row is None or row["content_hash"] != new_hash
+        self.conn.execute(
+            "INSERT INTO articles (url, etag, last_modified, content_hash, first_seen, last_seen, last_changed, "
+            "sitemap_lastmod) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified, "
+            "content_hash = excluded.content_hash, last_seen = excluded.last_seen, "
+            "last_changed = CASE WHEN articles.content_hash IS excluded.content_hash "
+            "THEN articles.last_changed ELSE excluded.last_changed END, "
+            "sitemap_lastmod = COALESCE(excluded.sitemap_lastmod, articles.sitemap_lastmod)",
+            (url, etag, last_modified, new_hash, now, now, now, sitemap_lastmod),
+        )
+        return changed
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        """关闭连接；未 commit 的更新会被丢弃。"""
+        self.conn.close()
@@ -0,0 +1,153 @@
+"""
+分布式爬取：一个协调者 + 任意多个工作进程，通过 work_queue 中的持久化任务队列协作。
+
+    python real_python_scraper.py --coordinator --max-pages 50    # 发现文章、等待完成、合并分片
+    python real_python_scraper.py --worker                         # 每个工作进程一条命令，可以随时增减
+
+- 协调者按列表页（或 --sitemap）发现文章，经过 frontier 规范化和去重后放入队列，
+  然后等待全部任务完成，把各工作进程的分片合并为正式CSV（按发现顺序，按URL去重）；
+- 工作进程每次领取 batch_size 个任务，逐篇抓取和解析，记录写入自己的分片
+  （<CSV_FILENAME>.shards/<worker_id>.jsonl）并 fsync 之后才把任务标记完成；
+  进程崩溃时未完成的任务在租约过期后由其他工作进程重新领取；
+- 礼貌预算是全局的：每个请求之前都在队列中为该主机预约时间槽，所有进程合计的请求速率
+  不超过 1 / delay；各进程的 AIMD 控制器调整后的 delay 和 Retry-After 暂停写回队列，对所有进程生效；
+- 暂时性失败的任务按指数退避放回队列（not_before），由任意工作进程稍后重试。
+
+协调者和工作进程都可以中途重启：队列记录了发现是否完成以及每个任务的状态。
+开始一次新的爬取之前删除队列文件（--queue-db）。
+"""
+import glob
+import os
+import socket
+import time
+from urllib.parse import urlparse
+
+from extractors import MISSING_DETAILS
+from output_writer import ShardWriter, merge_shards
+from rate_control import RetryableError, backoff_delay, retry_inline
+
+IDLE_POLL_INTERVAL = 2.0 # 秒，没有可领取的任务时再次检查队列的间隔
+PROGRESS_INTERVAL = 10.0 # 秒，协调者打印进度的间隔
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def shard_dir(csv_filename):
+    return csv_filename + ".shards"
+
+
+def polite_wait(scraper, queue, url):
+    """在全局礼貌预算中为 url 所在主机预约时间槽并等待，返回主机名。"""
+    host = urlparse(url).netloc
+    wait = queue.reserve_slot(host, scraper.RATE_CONTROLLER.delay)
+    if wait > 0:
+        time.sleep(wait)
+    return host
+
+
+def iter_listing_pages(scraper, queue, max_pages):
+    """逐页抓取博客列表页，产出 (页码, [post_info])；某一页没有文章时停止。"""
+    for page_num in range(1, max_pages + 1):
+        page_url = scraper.listing_page_url(page_num)
+        print(f"\n--- Scraping Page {page_num} ---")
+        polite_wait(scraper, queue, page_url)
+        posts_on_page = retry_inline(scraper.get_blog_posts_from_page, page_url) or []
+        if not posts_on_page:
+            print(f"No posts found on page {page_num}. Stopping further pagination.")
+            return
+        yield page_num, scraper.admit_new_posts(posts_on_page)
+
+
+def discover(scraper, queue, max_pages, sitemap_url=None):
+    if sitemap_url:
+        pages = scraper.iter_sitemap_pages(sitemap_url)
+    else:
+        pages = iter_listing_pages(scraper, queue, max_pages)
+    for page_num, posts in pages:
+        if page_num > max_pages:
+            break
+        added = queue.enqueue(posts)
+        print(f"--- Queued {added} new articles from page {page_num} ---")
+    queue.mark_discovery_done()
+    print("Discovery finished.")
+
+
+def format_counts(counts):
+    return ", ".join(f"{state} {counts.get(state, 0)}" for state in ("pending", "leased", "done", "failed"))
+
+
+def run_coordinator(scraper, queue, csv_filename, max_pages, sitemap_url=None, dedupe=None, store=None):
+    """发现文章（队列中已记录发现完成时跳过），等待工作进程处理完全部任务，然后合并分片。"""
+    if queue.discovery_done():
+        print("Discovery already finished in a previous run; waiting for workers.")
+    else:
+        discover(scraper, queue, max_pages, sitemap_url)
+
+    last_report = float("-inf")
+    while not queue.finished():
+        if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+            print(f"Waiting for workers: {format_counts(queue.counts())}")
+            last_report = time.monotonic()
+        time.sleep(IDLE_POLL_INTERVAL)
+
+    counts = queue.counts()
+    print(f"\nAll tasks finished: {format_counts(counts)}")
+    if counts.get("failed"):
+        print(f"{counts['failed']} articles failed on every attempt and are missing from the output.")
+    shards = glob.glob(os.path.join(shard_dir(csv_filename), "*.jsonl"))
+    if merge_shards(shards, csv_filename, queue.post_order(), dedupe=dedupe, store=store):
+        for path in shards:
+            os.remove(path)
+
+
+def process_task(scraper, queue, shard, task):
+    """抓取并解析一个任务；返回 True 表示记录已进入分片缓冲，False 表示已放回队列稍后重试。"""
+    post_info = task.post_info
+    print(f"Processing article: {post_info.get('list_title', 'Unknown Title')}")
+    host = polite_wait(scraper, queue, task.url)
+    delay = scraper.RATE_CONTROLLER.delay
+    try:
+        details = scraper.get_article_details(task.url)
+    except RetryableError as e:
+        if e.retry_after is not None:
+            queue.pause_host(host, e.retry_after)
+        if queue.retry(task, backoff_delay(task.attempts - 1, e.retry_after), e):
+            print(f"{e}; will retry later: {task.url}")
+            return False
+        print(f"Giving up on {task.url}: {e}")
+        details = MISSING_DETAILS
+    finally:
+        if scraper.RATE_CONTROLLER.delay != delay:
+            queue.update_host(host, scraper.RATE_CONTROLLER.delay)
+    shard.append(scraper.build_article_record(post_info, details))
+    scraper.report_article(post_info, details)
+    return True
+
+
+def run_worker(scraper, queue, csv_filename, worker_id, batch_size):
+    """领取并处理任务，直到协调者完成发现且队列中没有剩余任务。"""
+    shard = ShardWriter(os.path.join(shard_dir(csv_filename), f"{worker_id}.jsonl"))
+    print(f"Worker {worker_id} started; writing to {shard.path}")
+    try:
+        while True:
+            tasks = queue.lease(worker_id, batch_size)
+            if not tasks:
+                if queue.finished():
+                    break
+                time.sleep(IDLE_POLL_INTERVAL)
+                continue
+            done = []
+            for index, task in enumerate(tasks):
+                # 排在后面的任务要等前面任务的礼貌间隔，每个任务之前为其余任务续租，避免整批在等待中过期
+                if task.url not in queue.renew(worker_id, [t.url for t in tasks[index:]]):
+                    print(f"Lease lost, skipping (another worker has it): {task.url}")
+                    continue
+                if process_task(scraper, queue, shard, task):
+                    done.append(task.url)
+            shard.commit()
+            queue.complete(done)
+    finally:
+        shard.close()
+    print(f"\nWorker {worker_id} finished: {shard.rows_written} articles written.")
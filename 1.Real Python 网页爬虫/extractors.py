@@ -0,0 +1,362 @@
+"""
+可插拔的HTML提取后端。
+
+所有后端遵循同一个返回约定：
+- extract_article(html, article_url) -> (标题, 课程时长, 关键词列表, 正文, 结构化正文)，缺失的字段为 "N/A"，
+  结构化正文为 structured_content 的字典（正文、代码块、小标题、行内代码和单词数），找不到正文时为 None；
+- extract_listing_blocks(html) -> 每个 div.card-body 一个 dict：
+  {"href": 原始href或None, "has_link": 是否有<a>, "title": 标题或"N/A", "date": 日期或"N/A"}，
+  URL补全与过滤由 real_python_scraper.parse_listing_html 统一处理。
+
+各后端按选择器阶段计时，并在走备用选择器时计数（见 crawl_metrics.py）。
+
+可选后端：
+- "bs4"：原有的整页 BeautifulSoup(html.parser) + CSS 选择器路径，作为参照实现；
+- "scoped"：BeautifulSoup + ElementFilter，只为我们读取的子树（h1、课程时长 span、
+  标签所在的 div.mb-0、a.badge、div.article-body）创建节点，其余标签在解析时直接丢弃；
+- "lxml"：lxml.html + 预编译的 XPath，文本拼接规则与 get_text(strip=True) 保持一致。
+"""
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+
+from crawl_metrics import StageTimer, count_fallback
+from structured_content import from_lxml, from_soup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError: # lxml 是可选依赖，只有选择 "lxml" 后端时才需要
+    lxml = None
+    etree = None
+
+# 请求或解析失败时的提取结果
+MISSING_DETAILS = ("N/A", "N/A", [], "N/A", None)
+
+
+class SoupExtractor:
+    """参照实现：整页解析后使用 CSS 选择器，日志输出与最初的爬虫保持一致。"""
+
+    name = "bs4"
+
+    def extract_article(self, html, article_url):
+        timer = StageTimer(self.name)
+        soup = BeautifulSoup(html, "html.parser")
+        timer.lap("document")
+
+        # 获取文章标题
+        title_tag = soup.find("h1")
+        title = title_tag.get_text(strip=True) if title_tag else "N/A"
+        timer.lap("title")
+
+        # 获取课程时长 - 使用新发现的选择器，但注意它可能不存在
+        duration_tag = soup.select_one('span[title="Course duration"]')
+        duration = duration_tag.get_text(strip=True) if duration_tag else "N/A"
+        timer.lap("duration")
+
+        # 抓取关键词标签 - 使用更精确的选择器逻辑（基于您提供的JavaScript代码）
+        keywords = []
+
+        # 1. 尝试找到包含文章标题的父容器 div.col-md-11.col-lg-8.article.with-headerlinks
+        article_content_div = soup.select_one('div.col-md-11.col-lg-8.article.with-headerlinks')
+
+        if article_content_div:
+            print("成功找到文章内容的父容器")
+
+            # 2. 在这个文章内容容器内部，查找包含日期和标签的 div.mb-0
+            info_div = article_content_div.select_one('div.mb-0')
+
+            if info_div:
+                print("成功找到文章信息容器 div.mb-0")
+
+                # 3. 在这个 info_div 内部，查找包含标签的特定 span 元素
+                tags_container_span = info_div.select_one('span.d-inline.d-md-block')
+
+                if tags_container_span:
+                    print("成功找到包含标签的 span 容器")
+
+                    # 4. 在这个 tags_container_span 内部，查找所有具有指定类的 <a> 标签
+                    desired_tags = tags_container_span.select('a.badge.badge-light.text-muted[data-previewable]')
+
+                    if desired_tags:
+                        keywords = [tag.get_text(strip=True) for tag in desired_tags]
+                        print(f"使用精确选择器找到标签: {keywords}")
+                    else:
+                        print("警告：在预期的容器中没有找到 'badge' 标签")
+                else:
+                    print("警告：未能找到包含标签的 span.d-inline.d-md-block 元素")
+            else:
+                print("警告：未能找到文章信息容器 div.mb-0")
+        else:
+            print("警告：未能找到文章内容的父容器，尝试使用备用方法")
+            count_fallback(self.name, "keywords")
+            # 如果精确选择器失败，使用原来的简单选择器作为备用
+            keyword_tags = soup.select('a.badge')
+            if keyword_tags:
+                keywords = [tag.get_text(strip=True) for tag in keyword_tags]
+                print(f"使用备用选择器找到标签: {keywords}")
+
+        if keywords:
+            print(f"最终提取到的关键词: {keywords}")
+        else:
+            print("未找到任何关键词标签")
+        timer.lap("keywords")
+
+        # 获取文章内容
+        article_body_tag = soup.find("div", class_="article-body")
+        if not article_body_tag:
+            # 如果找不到 article-body，尝试找 article
+            count_fallback(self.name, "body")
+            article_body_tag = soup.find("div", class_="article")
+
+        content = article_body_tag.get_text(strip=True) if article_body_tag else "N/A"
+        timer.lap("body")
+        structure = from_soup(article_body_tag) if article_body_tag else None
+        timer.lap("structure")
+
+        if not title_tag or not article_body_tag:
+            print(f"Warning: Could not find title or body for {article_url}. Title found: {'Yes' if title_tag else 'No'}, Body found: {'Yes' if article_body_tag else 'No'}")
+
+        if not title_tag:
+            print(f"Warning: Could not find title for {article_url}.")
+
+        return title, duration, keywords, content, structure
+
+    def extract_listing_blocks(self, html):
+        timer = StageTimer(self.name)
+        soup = BeautifulSoup(html, "html.parser")
+        timer.lap("listing_document")
+        blocks = [self._listing_block(block) for block in soup.select("div.card-body")]
+        timer.lap("listing_cards")
+        return blocks
+
+    @staticmethod
+    def _listing_block(block):
+        a_tag = block.select_one("a")
+        title_tag = None
+        if a_tag:
+            title_tag = a_tag.select_one("h2.card-title")
+        if not title_tag:
+            title_tag = block.select_one("h2.card-title")
+        # 根据新发现，从列表页获取日期，使用span.mr-2选择器
+        date_tag = block.select_one("span.mr-2") if a_tag else None
+        return {
+            "href": a_tag.get("href") if a_tag else None,
+            "has_link": a_tag is not None,
+            "title": title_tag.get_text(strip=True) if title_tag else "N/A",
+            "date": date_tag.get_text(strip=True) if date_tag else "N/A",
+        }
+
+
+def _has_class(raw_class, wanted):
+    return raw_class is not None and wanted in raw_class.split()
+
+
+class _ArticleScope(ElementFilter):
+    """
+    只允许创建我们读取的子树的根节点；被允许的节点内部的子节点照常创建。
+    allow_tag_creation 是 bs4 (>=4.13) 为 parse_only 提供的扩展点。
+    """
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        attrs = attrs or {}
+        raw_class = attrs.get("class")
+        if name == "h1":
+            return True
+        if name == "span":
+            return attrs.get("title") == "Course duration"
+        if name == "div":
+            return _has_class(raw_class, "article-body") or _has_class(raw_class, "mb-0")
+        if name == "a":
+            return _has_class(raw_class, "badge")
+        return False
+
+    def allow_string_creation(self, string):
+        return False
+
+
+class _ListingScope(ElementFilter):
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return name == "div" and _has_class((attrs or {}).get("class"), "card-body")
+
+    def allow_string_creation(self, string):
+        return False
+
+
+class ScopedSoupExtractor(SoupExtractor):
+    """
+    只解析需要的子树的 BeautifulSoup 后端（优先使用 lxml 作为底层解析器）。
+
+    由于文章容器 div.col-md-11.col-lg-8.article.with-headerlinks 几乎包含整页内容，
+    这里不保留它，而是直接取第一个包含标签 span 的 div.mb-0；没有时退回所有 a.badge。
+    找不到 div.article-body 时（需要 div.article 备用路径）退回参照实现整页解析。
+    """
+
+    name = "scoped"
+
+    def __init__(self):
+        self.parser = "lxml" if lxml is not None else "html.parser"
+
+    def extract_article(self, html, article_url):
+        timer = StageTimer(self.name)
+        soup = BeautifulSoup(html, self.parser, parse_only=_ArticleScope())
+        timer.lap("document")
+
+        article_body_tag = soup.find("div", class_="article-body")
+        if not article_body_tag:
+            count_fallback(self.name, "full_parse")
+            return super().extract_article(html, article_url)
+
+        title_tag = soup.find("h1")
+        title = title_tag.get_text(strip=True) if title_tag else "N/A"
+        timer.lap("title")
+        duration_tag = soup.find("span", attrs={"title": "Course duration"})
+        duration = duration_tag.get_text(strip=True) if duration_tag else "N/A"
+        timer.lap("duration")
+
+        keywords = []
+        for info_div in soup.find_all("div", class_="mb-0"):
+            tags_container_span = info_div.select_one("span.d-inline.d-md-block")
+            if tags_container_span:
+                desired_tags = tags_container_span.select("a.badge.badge-light.text-muted[data-previewable]")
+                keywords = [tag.get_text(strip=True) for tag in desired_tags]
+                break
+        else:
+            count_fallback(self.name, "keywords")
+            keywords = [tag.get_text(strip=True) for tag in soup.select("a.badge")]
+        timer.lap("keywords")
+
+        if not title_tag:
+            print(f"Warning: Could not find title for {article_url}.")
+
+        content = article_body_tag.get_text(strip=True)
+        timer.lap("body")
+        structure = from_soup(article_body_tag)
+        timer.lap("structure")
+        return title, duration, keywords, content, structure
+
+    def extract_listing_blocks(self, html):
+        timer = StageTimer(self.name)
+        soup = BeautifulSoup(html, self.parser, parse_only=_ListingScope())
+        timer.lap("listing_document")
+        blocks = [self._listing_block(block) for block in soup.select("div.card-body")]
+        timer.lap("listing_cards")
+        return blocks
+
+
+def _class_predicate(*classes):
+    """XPath 中等价于 CSS 多类选择器的条件。"""
+    return " and ".join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in classes
+    )
+
+
+class LxmlExtractor:
+    """lxml.html + 预编译 XPath 的后端，选择器链与参照实现一一对应。"""
+
+    name = "lxml"
+
+    def __init__(self):
+        if etree is None:
+            raise ImportError("The 'lxml' extractor requires the lxml package: pip install lxml")
+        xp = etree.XPath
+        # get_text() 不会返回 script/style/template/rt/rp 中的文本，这里保持一致
+        self._text_nodes = xp(
+            ".//text()[not(ancestor::script or ancestor::style or ancestor::template "
+            "or ancestor::rt or ancestor::rp)]"
+        )
+        self._title = xp("(//h1)[1]")
+        self._duration = xp('(//span[@title="Course duration"])[1]')
+        self._container = xp(
+            f"(//div[{_class_predicate('col-md-11', 'col-lg-8', 'article', 'with-headerlinks')}])[1]"
+        )
+        self._info_div = xp(f"(.//div[{_class_predicate('mb-0')}])[1]")
+        self._tags_span = xp(f"(.//span[{_class_predicate('d-inline', 'd-md-block')}])[1]")
+        self._desired_tags = xp(f".//a[{_class_predicate('badge', 'badge-light', 'text-muted')} and @data-previewable]")
+        self._fallback_tags = xp(f"//a[{_class_predicate('badge')}]")
+        self._body = xp(f"(//div[{_class_predicate('article-body')}])[1]")
+        self._body_fallback = xp(f"(//div[{_class_predicate('article')}])[1]")
+        self._card_bodies = xp(f"//div[{_class_predicate('card-body')}]")
+        self._first_link = xp("(.//a)[1]")
+        self._card_title = xp(f"(.//h2[{_class_predicate('card-title')}])[1]")
+        self._date = xp(f"(.//span[{_class_predicate('mr-2')}])[1]")
+
+    def text(self, element):
+        """等价于 BeautifulSoup 的 get_text(strip=True)。"""
+        return "".join(node.strip() for node in self._text_nodes(element))
+
+    @staticmethod
+    def _first(result):
+        return result[0] if result else None
+
+    def extract_article(self, html, article_url):
+        timer = StageTimer(self.name)
+        root = lxml.html.fromstring(html)
+        timer.lap("document")
+
+        title_tag = self._first(self._title(root))
+        title = self.text(title_tag) if title_tag is not None else "N/A"
+        timer.lap("title")
+        duration_tag = self._first(self._duration(root))
+        duration = self.text(duration_tag) if duration_tag is not None else "N/A"
+        timer.lap("duration")
+
+        keywords = []
+        container = self._first(self._container(root))
+        if container is not None:
+            info_div = self._first(self._info_div(container))
+            tags_span = self._first(self._tags_span(info_div)) if info_div is not None else None
+            if tags_span is not None:
+                keywords = [self.text(tag) for tag in self._desired_tags(tags_span)]
+        else:
+            count_fallback(self.name, "keywords")
+            keywords = [self.text(tag) for tag in self._fallback_tags(root)]
+        timer.lap("keywords")
+
+        body = self._first(self._body(root))
+        if body is None:
+            count_fallback(self.name, "body")
+            body = self._first(self._body_fallback(root))
+        content = self.text(body) if body is not None else "N/A"
+        timer.lap("body")
+        structure = from_lxml(body) if body is not None else None
+        timer.lap("structure")
+
+        if title_tag is None or body is None:
+            print(f"Warning: Could not find title or body for {article_url}. Title found: {'Yes' if title_tag is not None else 'No'}, Body found: {'Yes' if body is not None else 'No'}")
+
+        return title, duration, keywords, content, structure
+
+    def extract_listing_blocks(self, html):
+        timer = StageTimer(self.name)
+        root = lxml.html.fromstring(html)
+        timer.lap("listing_document")
+        blocks = []
+        for block in self._card_bodies(root):
+            a_tag = self._first(self._first_link(block))
+            title_tag = self._first(self._card_title(a_tag)) if a_tag is not None else None
+            if title_tag is None:
+                title_tag = self._first(self._card_title(block))
+            date_tag = self._first(self._date(block)) if a_tag is not None else None
+            blocks.append({
+                "href": a_tag.get("href") if a_tag is not None else None,
+                "has_link": a_tag is not None,
+                "title": self.text(title_tag) if title_tag is not None else "N/A",
+                "date": self.text(date_tag) if date_tag is not None else "N/A",
+            })
+        timer.lap("listing_cards")
+        return blocks
+
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    ScopedSoupExtractor.name: ScopedSoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def get_extractor(name):
+    """按名称创建提取后端："bs4"、"scoped" 或 "lxml"。"""
+    try:
+        return EXTRACTORS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown extractor '{name}'. Choose from: {', '.join(EXTRACTORS)}") from None
@@ -0,0 +1,192 @@
+"""
+爬取边界（frontier）：URL过滤、规范化与去重。
+
+把爬虫从博客这一个栏目扩展到整个站点后，发现的URL数量会到百万级，这里提供三个组件：
+- compile_url_patterns：把 EXCLUDED_URL_PATTERNS 这样的子串列表编译成一个正则，
+  一次扫描完成全部判断，代替逐个模式的 Python 循环；
+- canonicalize_url：规范化URL（补全相对路径、小写协议和主机、去掉默认端口、片段、跟踪参数，
+  消除 ./ 和 ../、统一百分号编码、排序查询参数），同一页面的不同写法得到相同的字符串；
+- SeenSet：内存有界的去重集合。布隆过滤器先回答“一定没见过”，只有过滤器命中时才查询
+  磁盘上的精确集合（SQLite，按URL的128位摘要存储），因此既没有误判，内存也不随URL数量增长。
+
+Frontier 把规范化和去重组合在一起，供列表页、sitemap 两种发现方式共用。
+"""
+import functools
+import hashlib
+import math
+import os
+import posixpath
+import re
+import sqlite3
+import tempfile
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urljoin, urlsplit, urlunsplit
+
+DEFAULT_EXPECTED_URLS = 1_000_000
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+SEEN_FLUSH_EVERY = 10_000 # 新摘要先缓存在内存中，每累计多少条批量写入精确集合
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = re.compile(r"^(utm_[a-z]+|fbclid|gclid|mc_cid|mc_eid|ref_src)$", re.IGNORECASE)
+PATH_SAFE_CHARS = "/:@!$&'()*+,;=-._~"
+_PLAIN_PATH = re.compile(r"[A-Za-z0-9/:@!$&'()*+,;=\-_~]*\Z") # 不含 %、点号路径段等需要处理的字符
+
+
+@functools.lru_cache(maxsize=32)
+def _compile(patterns):
+    if not patterns:
+        return re.compile(r"(?!)") # 空列表：永远不匹配
+    # 长的模式放在前面，避免较短的前缀先匹配（对是否匹配没有影响，只是让 match.group() 更有意义）
+    return re.compile("|".join(re.escape(p) for p in sorted(patterns, key=len, reverse=True)))
+
+
+def compile_url_patterns(patterns):
+    """把子串模式列表编译为单个正则（按内容缓存，模式列表在运行时被修改后会重新编译）。"""
+    return _compile(tuple(patterns))
+
+
+def _normalize_path(path):
+    if not path:
+        return "/"
+    if _PLAIN_PATH.match(path) and "//" not in path:
+        return path # 常见情况的快速路径：已经是规范形式
+    trailing_slash = path.endswith("/")
+    path = posixpath.normpath(path)
+    if path.startswith("//"): # normpath 保留开头的两个斜杠
+        path = "/" + path.lstrip("/")
+    if path == ".":
+        path = "/"
+    if trailing_slash and not path.endswith("/"):
+        path += "/"
+    # 解码后按统一的规则重新编码：%7E 与 ~、小写与大写十六进制得到相同的结果
+    return quote(unquote(path), safe=PATH_SAFE_CHARS)
+
+
+def canonicalize_url(url, base_url=None):
+    """返回URL的规范形式；base_url 用于补全相对URL。"""
+    if base_url:
+        url = urljoin(base_url, url)
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]" # IPv6
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    query = parts.query
+    if query:
+        query = urlencode(sorted(
+            (key, value) for key, value in parse_qsl(query, keep_blank_values=True)
+            if not TRACKING_PARAMS.match(key)
+        ))
+    return urlunsplit((scheme, netloc, _normalize_path(parts.path), query, ""))
+
+
+class BloomFilter:
+    """
+    定长位数组的布隆过滤器，k 个位置由128位摘要的两半做双重哈希得到。
+    按预期元素数量和误判率确定大小：100 万个URL、1% 误判率约占 1.2 MB。
+    """
+
+    def __init__(self, expected_items, false_positive_rate):
+        expected_items = max(1, expected_items)
+        self.num_bits = max(8, int(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / expected_items * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, digest):
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+class SeenSet:
+    """
+    布隆过滤器 + 磁盘上的精确集合。path 为 None 时使用临时文件，close() 时删除；
+    打开已有的文件时会根据其中的摘要重建布隆过滤器。
+    """
+
+    def __init__(self, path=None, expected_items=DEFAULT_EXPECTED_URLS,
+                 false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+        self._temporary = path is None
+        if self._temporary:
+            fd, path = tempfile.mkstemp(prefix="frontier-", suffix=".db")
+            os.close(fd)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        if self._temporary:
+            # 临时集合不需要崩溃安全
+            self.conn.execute("PRAGMA journal_mode = OFF")
+            self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self.bloom = BloomFilter(expected_items, false_positive_rate)
+        self.size = 0
+        for (digest,) in self.conn.execute("SELECT digest FROM seen"):
+            self.bloom.add(digest)
+            self.size += 1
+        self.exact_lookups = 0 # 布隆过滤器命中、需要查询精确集合的次数
+        self._unflushed = set()
+
+    @staticmethod
+    def digest(key):
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+    def add(self, key):
+        """加入集合；返回 True 表示 key 之前没有出现过。"""
+        digest = self.digest(key)
+        if digest in self.bloom and self._contains_exact(digest):
+            return False
+        self.bloom.add(digest)
+        self._unflushed.add(digest)
+        self.size += 1
+        if len(self._unflushed) >= SEEN_FLUSH_EVERY:
+            self.flush()
+        return True
+
+    def __contains__(self, key):
+        digest = self.digest(key)
+        return digest in self.bloom and self._contains_exact(digest)
+
+    def __len__(self):
+        return self.size
+
+    def _contains_exact(self, digest):
+        self.exact_lookups += 1
+        if digest in self._unflushed:
+            return True
+        return self.conn.execute("SELECT 1 FROM seen WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def flush(self):
+        self.conn.executemany("INSERT INTO seen (digest) VALUES (?)", ((d,) for d in self._unflushed))
+        self.conn.commit()
+        self._unflushed.clear()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+        if self._temporary:
+            os.remove(self.path)
+
+
+class Frontier:
+    """规范化 + 去重：admit(url) 返回规范化后的URL，本次爬取中已经出现过时返回 None。"""
+
+    def __init__(self, seen_path=None, expected_urls=DEFAULT_EXPECTED_URLS,
+                 false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+        self.seen = SeenSet(seen_path, expected_urls, false_positive_rate)
+
+    def admit(self, url, base_url=None):
+        url = canonicalize_url(url, base_url)
+        return url if self.seen.add(url) else None
+
+    def close(self):
+        self.seen.close()
@@ -1,82 +1,306 @@
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.common.by import By
-from bs4 import BeautifulSoup
-import time
+"""
+Real Python 主页文章抓取（Edge 无头浏览器版本）。
+
+默认是混合模式：主页只加载一次，一次性收集全部卡片的URL，文章页先用普通HTTP请求获取并静态解析；
+只有静态提取失败的页面（没有卡片或正文为空，通常是内容依赖 JavaScript 渲染）才交给可复用的
+无头 Edge 浏览器池。浏览器通过 CDP 屏蔽图片、字体和样式表，只在第一次需要时启动。
+
+    python gptzhuaqu.py                   # 混合模式
+    python gptzhuaqu.py --mode browser    # 所有页面都用浏览器渲染
+    python gptzhuaqu.py --browsers 3      # 浏览器池大小（并行渲染的页面数）
+"""
+import argparse
+import contextlib
+import queue
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
 import pandas as pd
+import requests
+from bs4 import BeautifulSoup
+
+try:
+    from selenium import webdriver
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.edge.options import Options
+    from selenium.webdriver.edge.service import Service
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+except ImportError: # selenium 是可选依赖，只有需要浏览器回退时才用到
+    webdriver = None
+
+HOME_URL = "https://realpython.com/"
+OUTPUT_CSV = "realpython_articles.csv"
 
 # 设置 EdgeDriver 路径
-edge_driver_path = "D:\\edgedriver\\msedgedriver.exe"
-service = Service(executable_path=edge_driver_path)
+EDGE_DRIVER_PATH = "D:\\edgedriver\\msedgedriver.exe"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/124.0 Safari/537.36 Edg/124.0"
+}
+HTTP_TIMEOUT = 15 # 秒
+HTTP_DELAY = (0.5, 1.5) # 秒，相邻两次HTTP请求之间的随机间隔
+GONE_STATUSES = {404, 410} # 页面不存在，浏览器渲染也无济于事，直接记为失败
+
+BROWSER_POOL_SIZE = 2
+BROWSER_WAIT_TIMEOUT = 10 # 秒，等待页面中出现目标元素的最长时间
+# 浏览器中屏蔽的资源（Network.setBlockedURLs 的通配模式），只保留HTML和脚本
+BLOCKED_RESOURCES = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css",
+]
+
+CARD_SELECTOR = "div.card"
+ARTICLE_SELECTOR = "div.article"
 
-# 设置 Edge 的 options（非 Chrome）
-options = Options()
-options.add_argument("--headless")  # 可选：无头模式
-options.add_argument("--disable-gpu")
-options.add_argument("--window-size=1920,1080")
 
-# 启动 Edge 浏览器
-driver = webdriver.Edge(service=service, options=options)
+def parse_cards(html, base_url):
+    """从主页HTML中一次性提取全部卡片，按URL去重并保持页面顺序。"""
+    soup = BeautifulSoup(html, "html.parser")
+    cards = []
+    seen = set()
+    for card in soup.select(CARD_SELECTOR):
+        link = card.select_one("h2.card-title a") or card.select_one("a[href]")
+        if not link or not link.get("href"):
+            continue
+        url = urljoin(base_url, link["href"])
+        if url in seen:
+            continue
+        seen.add(url)
+        title_el = card.select_one("h2.card-title")
+        date_el = card.select_one("p.card-text small span")
+        cards.append({
+            "title": title_el.get_text(strip=True) if title_el else link.get_text(strip=True),
+            "url": url,
+            "date": date_el.get_text(strip=True) if date_el else "",
+            "keywords": [tag.get_text(strip=True) for tag in card.select("a.badge")],
+        })
+    return cards
 
-# 打开主页
-driver.get("https://realpython.com/")
-time.sleep(random.uniform(3, 5))
 
-# 提取卡片元素
-cards = driver.find_elements(By.CSS_SELECTOR, "div.card")
-print(f"共找到 {len(cards)} 篇文章")
+def extract_content(html):
+    """正文段落文本；找不到文章容器或没有段落时返回空字符串（视为静态提取失败）。"""
+    soup = BeautifulSoup(html, "html.parser")
+    article_div = soup.select_one(ARTICLE_SELECTOR)
+    if not article_div:
+        return ""
+    return "\n".join(p.get_text(strip=True) for p in article_div.find_all("p"))
 
-results = []
 
-for idx, card in enumerate(cards, start=1):
+def http_get(session, url):
+    """
+    普通HTTP请求，返回 (状态码, HTML)。连接失败时状态码为 None；
+    非 200 时 HTML 为 None，由调用方决定是否交给浏览器回退。
+    """
+    time.sleep(random.uniform(*HTTP_DELAY))
     try:
-        title_el = card.find_element(By.CSS_SELECTOR, "h2.card-title")
-        title = title_el.text.strip()
-        url = title_el.find_element(By.TAG_NAME, "a").get_attribute("href")
+        response = session.get(url, timeout=HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"HTTP 请求失败：{url}（{e}）")
+        return None, None
+    if response.status_code != 200:
+        print(f"HTTP {response.status_code}：{url}")
+        return response.status_code, None
+    return response.status_code, response.text
 
-        date = card.find_element(By.CSS_SELECTOR, "p.card-text small span").text.strip()
-        tags = card.find_elements(By.CSS_SELECTOR, "a.badge")
-        keywords = [tag.text.strip() for tag in tags]
 
-        print(f"第 {idx} 篇文章：{title}")
-        print(f"链接：{url}")
-        print(f"关键词：{keywords}")
+class BrowserPool:
+    """
+    可复用的无头 Edge 浏览器池。浏览器在第一次 acquire 时才启动，最多 size 个，
+    用完放回池中供下一个页面使用，close() 时统一退出。
+    """
 
-        # 访问详情页
-        driver.get(url)
-        time.sleep(random.uniform(2, 4))
+    def __init__(self, size=BROWSER_POOL_SIZE, driver_path=EDGE_DRIVER_PATH):
+        self.size = size
+        self.driver_path = driver_path
+        self._idle = queue.Queue()
+        self._drivers = []
+        self._launched = 0
+        self._lock = threading.Lock()
 
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+    def _launch(self):
+        if webdriver is None:
+            raise ImportError("Browser fallback requires selenium: pip install selenium")
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1080")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        driver = webdriver.Edge(service=Service(executable_path=self.driver_path), options=options)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCES})
+        return driver
 
-        # 正文内容提取
-        article_div = soup.find("div", class_="article")
-        if article_div:
-            paragraphs = article_div.find_all("p")
-            content = "\n".join(p.get_text(strip=True) for p in paragraphs)
+    @contextlib.contextmanager
+    def browser(self):
+        """借出一个浏览器；使用中抛出 WebDriverException（会话崩溃或断开）时退出该浏览器，不再放回池中。"""
+        driver = self._acquire()
+        try:
+            yield driver
+        except WebDriverException:
+            self._discard(driver)
+            raise
+        except BaseException:
+            self._idle.put(driver)
+            raise
         else:
-            content = ""
+            self._idle.put(driver)
 
-        results.append({
-            "title": title,
-            "url": url,
-            "date": date,
-            "keywords": ", ".join(keywords),
-            "content": content
-        })
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+            self._launched -= 1
+        self._idle.put(None) # 唤醒等待中的 _acquire，由它启动替代的浏览器
+
+    def _acquire(self):
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            driver = None
+        while driver is None:
+            with self._lock:
+                launch = self._launched < self.size
+                if launch:
+                    self._launched += 1
+            if launch:
+                break
+            # 池已满，等待其他页面用完；取到 None 表示有浏览器被丢弃，可以启动新的
+            driver = self._idle.get()
+        if driver is not None:
+            return driver
+        try:
+            driver = self._launch()
+        except Exception:
+            with self._lock:
+                self._launched -= 1
+            raise
+        with self._lock:
+            self._drivers.append(driver)
+        return driver
+
+    def render(self, url, wait_selector):
+        """在浏览器中打开 url，等待 wait_selector 出现（超时也照常返回），返回渲染后的HTML。"""
+        with self.browser() as driver:
+            driver.get(url)
+            try:
+                WebDriverWait(driver, BROWSER_WAIT_TIMEOUT).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
+                )
+            except TimeoutException:
+                pass
+            return driver.page_source
+
+    def close(self):
+        for driver in self._drivers:
+            driver.quit()
+        self._drivers.clear()
+        self._launched = 0
+
+
+def collect_cards(session, pool, mode):
+    """主页只加载一次；静态HTML中没有卡片时用浏览器渲染主页。"""
+    if mode == "hybrid":
+        _, html = http_get(session, HOME_URL)
+        cards = parse_cards(html, HOME_URL) if html else []
+        if cards:
+            return cards
+        print("主页静态解析没有找到文章卡片，改用浏览器渲染")
+    return parse_cards(pool.render(HOME_URL, CARD_SELECTOR), HOME_URL)
+
+
+def render_article(pool, card):
+    try:
+        return extract_content(pool.render(card["url"], ARTICLE_SELECTOR))
+    except ImportError:
+        raise
+    except WebDriverException as e:
+        print(f"❌ 浏览器渲染失败：{card['url']}（{e.msg}）")
+        return None
+
+
+def scrape(mode="hybrid", browsers=BROWSER_POOL_SIZE, driver_path=EDGE_DRIVER_PATH):
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    pool = BrowserPool(browsers, driver_path)
+    try:
+        cards = collect_cards(session, pool, mode)
+        print(f"共找到 {len(cards)} 篇文章")
+
+        contents = {}
+        fallback = []
+        for idx, card in enumerate(cards, start=1):
+            print(f"第 {idx} 篇文章：{card['title']}")
+            print(f"链接：{card['url']}")
+            print(f"关键词：{card['keywords']}")
+            if mode == "hybrid":
+                status, html = http_get(session, card["url"])
+                content = extract_content(html) if html else ""
+                if content or status in GONE_STATUSES:
+                    if content:
+                        contents[card["url"]] = content
+                    print("-" * 60)
+                    continue
+            fallback.append(card)
+            print("交给浏览器渲染")
+            print("-" * 60)
+
+        static_count = len(contents)
+        if fallback and webdriver is None:
+            # 没有安装 selenium 时保留静态提取的结果，而不是让整个抓取失败
+            print(f"⚠️ 未安装 selenium，跳过 {len(fallback)} 篇需要浏览器渲染的文章（pip install selenium）")
+            fallback = []
+        if fallback:
+            print(f"{len(fallback)} 篇文章使用浏览器渲染（{min(browsers, len(fallback))} 个浏览器）")
+            with ThreadPoolExecutor(max_workers=browsers) as executor:
+                for card, content in zip(fallback, executor.map(lambda c: render_article(pool, c), fallback)):
+                    if content is not None:
+                        contents[card["url"]] = content
+    finally:
+        pool.close()
+        session.close()
+
+    results = [
+        {
+            "title": card["title"],
+            "url": card["url"],
+            "date": card["date"],
+            "keywords": ", ".join(card["keywords"]),
+            "content": contents[card["url"]],
+        }
+        for card in cards if card["url"] in contents
+    ]
+    print(f"静态提取 {static_count} 篇，浏览器渲染 {len(results) - static_count} 篇，"
+          f"失败 {len(cards) - len(results)} 篇")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Real Python 主页文章抓取（HTTP 优先，浏览器回退）")
+    parser.add_argument("--mode", choices=["hybrid", "browser"], default="hybrid",
+                        help="hybrid：HTTP 优先，静态提取失败时才用浏览器；browser：所有页面都用浏览器")
+    parser.add_argument("--browsers", type=int, default=BROWSER_POOL_SIZE, help="浏览器池大小")
+    parser.add_argument("--driver", default=EDGE_DRIVER_PATH, help="msedgedriver 路径")
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    args = parser.parse_args(argv)
 
-        # 返回主页
-        driver.get("https://realpython.com/")
-        time.sleep(random.uniform(1.5, 3))
+    results = scrape(args.mode, max(1, args.browsers), args.driver)
 
-    except Exception as e:
-        print(f"❌ 抓取第 {idx} 篇失败：{e}")
-    print("-" * 60)
+    # 保存为 CSV
+    df = pd.DataFrame(results, columns=["title", "url", "date", "keywords", "content"])
+    df.to_csv(args.output, index=False, encoding="utf-8-sig")
+    print(f"✅ 抓取完成，已保存为 {args.output}")
 
-driver.quit()
 
-# 保存为 CSV
-df = pd.DataFrame(results)
-df.to_csv("realpython_articles.csv", index=False, encoding="utf-8-sig")
-print("✅ 抓取完成，已保存为 realpython_articles.csv")
+if __name__ == "__main__":
+    main()
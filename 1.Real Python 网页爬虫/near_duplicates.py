@@ -0,0 +1,122 @@
+"""
+爬取过程中的近似重复文章检测（MinHash + LSH）。
+
+Real Python 的课程页和教程页正文经常大段重合，这些重复内容会放大 TF-IDF 矩阵并污染推荐结果。
+每条记录写出之前，NearDuplicateIndex.check() 计算正文的 MinHash 签名：
+- 正文按小写单词切分为连续 SHINGLE_SIZE 个词的片段（shingle），每个片段哈希为 32 位整数，
+  num_perm 个 (a * h + b) mod p 的随机置换各取最小值，两个签名相同位置相等的比例是 Jaccard 相似度的估计；
+- 签名分成 bands 段，每段整体作为一个桶键。只有至少一段完全相同的文章才成为候选，
+  再用签名估计的相似度和 threshold 比较确认，因此每篇文章的代价与语料规模基本无关（不是两两比较）；
+- 确认为近似重复时返回最早出现的那篇文章（簇的代表）的URL，写入 `duplicate_of` 列，否则为空。
+
+bands × rows = num_perm，候选概率在相似度约 (1 / bands) ** (1 / rows) 处陡升，默认 16 × 8 约为 0.71，
+低于默认阈值 0.8，漏检很少；过短的正文（少于 MIN_WORDS 个词，包括抓取失败的 N/A）不参与检测。
+"""
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_THRESHOLD = 0.8 # 估计的 Jaccard 相似度达到该值视为近似重复
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16
+SHINGLE_SIZE = 5 # 每个 shingle 包含的连续单词数
+MIN_WORDS = 30 # 正文太短时 shingle 很少，相似度估计不可靠
+SEED = 1 # 固定的置换参数，同一份正文在不同进程、不同运行中得到相同的签名
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """正文的单词 shingle 集合；单词数不足 MIN_WORDS 时返回空集合。"""
+    words = _WORD_RE.findall(text.lower()) if isinstance(text, str) else []
+    if len(words) < MIN_WORDS:
+        return set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """按到达顺序维护 LSH 桶和签名；check() 同时完成查询和插入。"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(SEED)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets = [{} for _ in range(bands)] # 每段：桶键 -> [url, ...]
+        self._signatures = {} # url -> 签名
+        self._canonical = {} # url -> 所在簇的代表URL（代表本身映射到自己）
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text):
+        """MinHash 签名（uint32 数组）；正文太短时返回 None。"""
+        tokens = shingles(text)
+        if not tokens:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64, count=len(tokens)
+        )
+        # 乘法在 uint64 中回绕，与 datasketch 的做法相同，不影响作为哈希族使用
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def check(self, url, text):
+        """
+        检测 url 的正文是否与已经见过的文章近似重复，返回簇代表的URL（不重复时返回空字符串），
+        并把它加入索引。同一URL（增量模式下内容有变化的文章）不会与自己的旧版本匹配。
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return ""
+        keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+        match = self._best_match(url, signature, keys)
+        self._signatures[url] = signature
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(url)
+        canonical = url if match is None else self._canonical[match]
+        if canonical == url: # 没有匹配，或只匹配到以自己为代表的文章
+            self._canonical[url] = url
+            return ""
+        self._canonical[url] = canonical
+        self.duplicates += 1
+        return canonical
+
+    def _best_match(self, url, signature, keys):
+        best, best_score = None, self.threshold
+        seen = set()
+        for bucket, key in zip(self._buckets, keys):
+            for candidate in bucket.get(key, ()):
+                if candidate == url or candidate in seen:
+                    continue
+                seen.add(candidate)
+                score = float(np.mean(self._signatures[candidate] == signature))
+                if score >= best_score:
+                    best, best_score = candidate, score
+        return best
+
+    def seed_from_csv(self, csv_filename):
+        """
+        用已有CSV中的文章预先填充索引（增量模式下新文章也与之前爬到的文章比较），返回读入的行数。
+        已有文章之间的重复不计入 duplicates（它只统计本次爬取新发现的近似重复）。
+        """
+        # pandas 的 CSV 解析没有 csv 模块 131072 字符的单字段上限，长文章的 Content 也能读入
+        df = pd.read_csv(csv_filename, encoding="utf-8-sig", dtype=str, keep_default_na=False,
+                         usecols=lambda column: column in ("URL", "Content"))
+        count = 0
+        duplicates = self.duplicates
+        for url, content in zip(df["URL"], df["Content"] if "Content" in df else [""] * len(df)):
+            if url:
+                self.check(url, content)
+                count += 1
+        self.duplicates = duplicates
+        return count
@@ -0,0 +1,347 @@
+"""
+流式、带检查点的CSV输出。
+
+爬取过程中每解析完一篇文章就交给 StreamingCSVWriter：
+- 记录先写入 `<CSV_FILENAME>.part`，每 batch_size 条（以及每个列表页完成时）批量 flush + fsync；
+- 每次 flush 之后把新完成的文章URL追加到 `<CSV_FILENAME>.done.log`（每行一个），再原子地更新
+  `<CSV_FILENAME>.checkpoint.json`，记录已提交的列表页以及 .part 和 .done.log 中已提交的字节数；
+  每次提交只写本批新增的内容，开销与已爬取的文章总数无关；
+- 爬取正常结束时 finalize() 把 .part 替换为正式CSV（增量模式下按URL合并进已有CSV），并删除检查点。
+
+进程在中途崩溃时，--resume 会把 .part 截断到最后一次提交的位置，
+从第一个未完成的列表页继续，并跳过 .done.log 中（同样截断到提交位置）已完成的文章。
+
+传入 dedupe（near_duplicates.NearDuplicateIndex）时，每条记录写出前检测正文是否与已写出的文章近似重复，
+结果写入 duplicate_of 列（簇代表的URL，不重复时为空）。
+
+传入 store（shared_lib.ArticleStore）时，每次 flush 把同一批记录按URL upsert 进文章库（SQLite + FTS5），
+文章库中单篇文章的新增或修改只写一行，不需要重写整个文件。
+
+分布式模式（见 distributed.py）下每个工作进程写自己的 ShardWriter 分片（JSON Lines），
+协调者在全部任务完成后用 merge_shards() 合并成正式CSV。
+"""
+import csv
+import json
+import os
+import time
+
+import pandas as pd
+
+from crawl_metrics import observe_write
+from structured_content import STRUCTURE_COLUMNS
+
+CSV_COLUMNS = ["Title", "URL", "Date", "Course Duration", "Keywords", "Content", *STRUCTURE_COLUMNS, "duplicate_of"]
+DEFAULT_BATCH_SIZE = 10 # 每累计多少条记录 flush 一次
+
+
+class StreamingCSVWriter:
+    """
+    追加式CSV写入器。
+
+    列表页通过 expect_page() 登记它包含的文章URL，文章处理完成后调用 article_done()
+    （跳过的文章传 record=None）。一个列表页的文章全部完成、且之前的列表页也都完成时，
+    该页才算“已提交”，这样异步模式下乱序完成的文章也能得到正确的续爬位置。
+    """
+
+    def __init__(self, csv_filename, batch_size=DEFAULT_BATCH_SIZE, columns=CSV_COLUMNS, on_commit=None,
+                 dedupe=None, store=None):
+        self.csv_filename = csv_filename
+        self.part_path = csv_filename + ".part"
+        self.checkpoint_path = csv_filename + ".checkpoint.json"
+        self.done_log_path = csv_filename + ".done.log"
+        self.batch_size = batch_size
+        self.columns = columns
+        self.on_commit = on_commit # 每次数据落盘之后调用，例如提交爬取状态库
+        self.dedupe = dedupe
+        self.store = store
+
+        self.last_committed_page = 0
+        self.done_urls = set()
+        self._new_done_urls = [] # 上次提交之后完成、尚未写入 .done.log 的URL
+        self._done_log = None
+        self.rows_written = 0
+        self._pending_pages = {}
+        self._buffer = []
+        self._file = None
+        self._writer = None
+
+    def open(self, resume=False):
+        """
+        打开 .part 文件。resume=True 且存在检查点时恢复上次的进度，返回续爬的起始页码；
+        否则开始一次全新的写入，返回 1。
+        """
+        output_dir = os.path.dirname(self.csv_filename)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint and os.path.exists(self.part_path):
+            self.last_committed_page = checkpoint["last_committed_page"]
+            self.rows_written = checkpoint["rows_written"]
+            # 丢弃最后一次检查点之后写入、但没有被检查点记录的半截数据
+            with open(self.part_path, "r+b") as f:
+                f.truncate(checkpoint["part_bytes"])
+            if "done_urls" in checkpoint:
+                # 旧格式的检查点：URL列表保存在检查点中，转换为 .done.log
+                self.done_urls = set(checkpoint["done_urls"])
+                self._done_log = open(self.done_log_path, "wb")
+                self._new_done_urls = sorted(self.done_urls)
+            else:
+                self.done_urls = self._load_done_log(checkpoint["done_log_bytes"])
+                self._done_log = open(self.done_log_path, "ab")
+            if self.dedupe is not None:
+                self.dedupe.seed_from_csv(self.part_path) # 续爬的文章也与上次已提交的文章比较
+            self._file = open(self.part_path, "a", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+            print(f"Resuming from checkpoint: {self.rows_written} rows committed, "
+                  f"{len(self.done_urls)} articles done, continuing at page {self.last_committed_page + 1}.")
+            return self.last_committed_page + 1
+
+        if resume:
+            print("No checkpoint found. Starting a fresh crawl.")
+        self._file = open(self.part_path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+        self._writer.writeheader()
+        self._done_log = open(self.done_log_path, "wb")
+        self._commit()
+        return 1
+
+    def is_done(self, url):
+        """续爬时用于跳过上次已经完成的文章。"""
+        return url in self.done_urls
+
+    def expect_page(self, page_num, urls):
+        """登记一个列表页及其需要处理的文章URL（已完成的文章不需要登记）。"""
+        self._pending_pages[page_num] = set(url for url in urls if url not in self.done_urls)
+        self._advance_committed_page()
+
+    def article_done(self, page_num, url, record=None):
+        """一篇文章处理完成；record 为 None 表示跳过（例如增量模式下未变化）。"""
+        if record is not None and self.dedupe is not None:
+            start = time.perf_counter()
+            record["duplicate_of"] = self.dedupe.check(record["URL"], record.get("Content"))
+            observe_write("dedupe", time.perf_counter() - start)
+        start = time.perf_counter()
+        if record is not None:
+            self._buffer.append(record)
+        if url not in self.done_urls:
+            self.done_urls.add(url)
+            self._new_done_urls.append(url)
+        pending = self._pending_pages.get(page_num)
+        if pending is not None:
+            pending.discard(url)
+        page_completed = self._advance_committed_page()
+        observe_write("record", time.perf_counter() - start)
+        if len(self._buffer) >= self.batch_size or page_completed:
+            self.flush()
+
+    def flush(self):
+        """把缓冲的记录写入 .part 文件并 fsync，然后更新检查点。"""
+        if self._file is None:
+            return
+        start = time.perf_counter()
+        for record in self._buffer:
+            self._writer.writerow({column: record.get(column, "N/A") for column in self.columns})
+        if self.store is not None:
+            # 先于检查点写入：崩溃后续爬会重新处理这些文章，upsert 是幂等的
+            self.store.upsert_many(self._buffer)
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+        self._commit()
+        observe_write("flush", time.perf_counter() - start)
+
+    def finalize(self, merge=False):
+        """
+        爬取正常结束：把 .part 变成正式的CSV并删除检查点，返回是否成功。
+        merge=True 时（增量模式）新记录替换已有CSV中相同URL的行并排在最前。
+        """
+        self.flush()
+        self._close_files()
+        try:
+            if merge and os.path.exists(self.csv_filename):
+                new_df = pd.read_csv(self.part_path, encoding="utf-8-sig")
+                if new_df.empty:
+                    print("\nNo new or changed articles. CSV file left unchanged.")
+                else:
+                    existing_df = pd.read_csv(self.csv_filename, encoding="utf-8-sig")
+                    existing_df = existing_df[~existing_df["URL"].isin(new_df["URL"])]
+                    print(f"Merging {len(new_df)} new/changed articles into {len(existing_df)} existing rows.")
+                    merged_df = pd.concat([new_df, existing_df], ignore_index=True)
+                    tmp_path = self.csv_filename + ".tmp"
+                    merged_df.to_csv(tmp_path, index=False, encoding="utf-8-sig")
+                    os.replace(tmp_path, self.csv_filename)
+                os.remove(self.part_path)
+            elif self.rows_written:
+                os.replace(self.part_path, self.csv_filename)
+            else:
+                os.remove(self.part_path)
+                print("\nNo articles were scraped. CSV file not created.")
+            for path in (self.checkpoint_path, self.done_log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        except Exception as e:
+            print(f"Error saving data to CSV: {e}")
+            return False
+
+        if self.rows_written:
+            print(f"\nSuccessfully scraped {self.rows_written} articles.")
+            if self.dedupe is not None and self.dedupe.duplicates:
+                print(f"{self.dedupe.duplicates} articles flagged as near-duplicates (see duplicate_of).")
+            print(f"Data saved to {self.csv_filename}")
+            print(f"Absolute path: {os.path.abspath(self.csv_filename)}")
+        return True
+
+    def close(self):
+        """异常退出时调用：提交已缓冲的记录并保留 .part 和检查点，供 --resume 使用。"""
+        if self._file is not None:
+            self.flush()
+            self._close_files()
+            print(f"Crawl interrupted. Progress saved to {self.checkpoint_path}; rerun with --resume to continue.")
+
+    def _advance_committed_page(self):
+        """按页码顺序推进已提交页，返回本次是否有新的页被提交。"""
+        advanced = False
+        while True:
+            next_page = self.last_committed_page + 1
+            pending = self._pending_pages.get(next_page)
+            if pending is None or pending:
+                return advanced
+            del self._pending_pages[next_page]
+            self.last_committed_page = next_page
+            advanced = True
+
+    def _close_files(self):
+        self._file.close()
+        self._file = None
+        self._done_log.close()
+        self._done_log = None
+
+    def _commit(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if self._new_done_urls:
+            self._done_log.write("".join(url + "\n" for url in self._new_done_urls).encode("utf-8"))
+            self._new_done_urls = []
+        self._done_log.flush()
+        os.fsync(self._done_log.fileno())
+        checkpoint = {
+            "last_committed_page": self.last_committed_page,
+            "rows_written": self.rows_written,
+            "part_bytes": os.path.getsize(self.part_path),
+            "done_log_bytes": self._done_log.tell(),
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+        if self.on_commit:
+            self.on_commit()
+
+    def _load_done_log(self, committed_bytes):
+        """读取 .done.log 中已提交的URL，并截断检查点之后追加的部分。"""
+        if not os.path.exists(self.done_log_path):
+            return set()
+        with open(self.done_log_path, "r+b") as f:
+            f.truncate(committed_bytes)
+            return set(f.read().decode("utf-8").splitlines())
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+class ShardWriter:
+    """
+    分布式模式下单个工作进程的输出分片（JSON Lines，每行一条记录）。
+
+    append() 只缓存记录，commit() 追加写入并 fsync，之后调用方才在任务队列中把对应任务标记完成。
+    进程崩溃时最后一行可能不完整，merge_shards() 会丢弃无法解析的行。
+    """
+
+    def __init__(self, path):
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.path = path
+        self.rows_written = 0
+        self._buffer = []
+        # 上次崩溃留下的不完整行用换行隔开，不影响之后的记录
+        needs_newline = os.path.exists(path) and os.path.getsize(path) > 0 and not _ends_with_newline(path)
+        self._file = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+    def append(self, record):
+        self._buffer.append(record)
+
+    def commit(self):
+        start = time.perf_counter()
+        for record in self._buffer:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+        observe_write("flush", time.perf_counter() - start)
+
+    def close(self):
+        """关闭分片；没有 commit 的记录被丢弃（对应的任务会在租约过期后重新处理）。"""
+        self._file.close()
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def read_shard(path):
+    """逐条读取分片中的记录，跳过不完整的行。"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def merge_shards(shard_paths, csv_filename, order=None, columns=CSV_COLUMNS, dedupe=None, store=None):
+    """
+    把全部分片合并为正式CSV：同一URL出现多次时（任务被重复处理）保留最后读到的记录，
+    按 order（{url: 发现顺序}）排序，原子替换 csv_filename。返回写出的记录数；没有记录时不修改CSV。
+    各工作进程之间没有共享的近似重复索引，传入 dedupe 时在合并阶段按发现顺序统一检测；
+    传入 store 时合并后的记录同时写入文章库。
+    """
+    records = {}
+    for path in sorted(shard_paths):
+        for record in read_shard(path):
+            records[record["URL"]] = record
+    if not records:
+        print("\nNo records in worker shards. CSV file left unchanged.")
+        return 0
+    order = order or {}
+    rows = sorted(records.values(), key=lambda record: order.get(record["URL"], float("inf")))
+    if dedupe is not None:
+        for record in rows:
+            record["duplicate_of"] = dedupe.check(record["URL"], record.get("Content"))
+
+    output_dir = os.path.dirname(csv_filename)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    tmp_path = csv_filename + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for record in rows:
+            writer.writerow({column: record.get(column, "N/A") for column in columns})
+    os.replace(tmp_path, csv_filename)
+    if store is not None:
+        store.upsert_many(rows)
+    print(f"\nMerged {len(rows)} articles from {len(shard_paths)} worker shards.")
+    if dedupe is not None and dedupe.duplicates:
+        print(f"{dedupe.duplicates} articles flagged as near-duplicates (see duplicate_of).")
+    print(f"Data saved to {csv_filename}")
+    print(f"Absolute path: {os.path.abspath(csv_filename)}")
+    return len(rows)
@@ -0,0 +1,206 @@
+"""
+原始响应的本地归档与离线重放。
+
+归档结构（默认位于 ../shared_data/page_archive/）：
+    objects/ab/abcdef....zst   按响应正文 sha256 寻址的压缩文件（内容相同的页面只存一份）
+    index.db                   SQLite 索引：URL、类型（listing/article）、抓取时间、sha256、
+                               ETag/Last-Modified 等，每次抓取追加一行
+
+压缩优先使用 zstandard，未安装时退回标准库 gzip；读取时按文件扩展名解压，两种格式可以混用。
+
+--replay 模式完全不访问网络：按页码读取归档中的列表页（--sitemap 爬取的归档则读取归档的 sitemap，
+按同样的批次划分），再读取每篇文章最近一次归档的正文，用进程池运行提取后端并写出CSV。修改选择器之后重新提取整个语料只是一次纯CPU的批处理。
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import zstandard
+except ImportError: # zstandard 是可选依赖
+    zstandard = None
+
+ARCHIVE_DIR = "../shared_data/page_archive"
+COMMIT_EVERY = 20 # 每归档多少个响应提交一次索引
+ZSTD_LEVEL = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    url           TEXT NOT NULL,
+    kind          TEXT NOT NULL,
+    fetched_at    REAL NOT NULL,
+    sha256        TEXT NOT NULL,
+    object_path   TEXT NOT NULL,
+    size          INTEGER NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    content_type  TEXT
+);
+CREATE INDEX IF NOT EXISTS responses_url ON responses (url, fetched_at);
+"""
+
+
+class PageArchive:
+    """内容寻址的原始响应归档。"""
+
+    def __init__(self, root=ARCHIVE_DIR, commit_every=COMMIT_EVERY):
+        self.root = root
+        self.commit_every = commit_every
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.db"), timeout=30)
+        self.conn.execute("PRAGMA journal_mode = WAL") # 分布式模式下多个进程同时写入
+        self.conn.executescript(SCHEMA)
+        self._uncommitted = 0
+        if zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def store(self, url, body, headers=None, kind="article"):
+        """归档一次响应正文；相同内容只写一次文件。"""
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._existing_object(digest) or self._write_object(digest, body)
+        headers = headers or {}
+        self.conn.execute(
+            "INSERT INTO responses (url, kind, fetched_at, sha256, object_path, size, etag, last_modified, content_type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, kind, time.time(), digest, object_path, len(body),
+             headers.get("ETag"), headers.get("Last-Modified"), headers.get("Content-Type")),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+        return digest
+
+    def load(self, url):
+        """返回 URL 最近一次归档的正文 bytes；没有归档时返回 None。"""
+        row = self.conn.execute(
+            "SELECT object_path FROM responses WHERE url = ? ORDER BY fetched_at DESC, id DESC LIMIT 1", (url,)
+        ).fetchone()
+        return self.read_object(row[0]) if row else None
+
+    def read_object(self, object_path):
+        with open(os.path.join(self.root, object_path), "rb") as f:
+            data = f.read()
+        if object_path.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError("This archive contains zstd objects; install zstandard to read them.")
+            return self._decompressor.decompress(data)
+        return gzip.decompress(data)
+
+    def urls(self, kind):
+        """归档中某类页面的全部URL（按首次归档顺序）。"""
+        rows = self.conn.execute(
+            "SELECT url FROM responses WHERE kind = ? GROUP BY url ORDER BY MIN(id)", (kind,)
+        )
+        return [row[0] for row in rows]
+
+    def commit(self):
+        self.conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def _object_base(self, digest):
+        return os.path.join("objects", digest[:2], digest)
+
+    def _existing_object(self, digest):
+        base = self._object_base(digest)
+        for ext in (".zst", ".gz"):
+            if os.path.exists(os.path.join(self.root, base + ext)):
+                return base + ext
+        return None
+
+    def _write_object(self, digest, body):
+        if zstandard is not None:
+            object_path, data = self._object_base(digest) + ".zst", self._compressor.compress(body)
+        else:
+            object_path, data = self._object_base(digest) + ".gz", gzip.compress(body)
+        full_path = os.path.join(self.root, object_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        tmp_path = f"{full_path}.{os.getpid()}.tmp" # 多个进程可能同时写入同一内容
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, full_path)
+        return object_path
+
+
+def _archived_listing_pages(scraper, archive, max_pages):
+    """按页码读取归档的列表页，产出 (页码, [post_info])；遇到没有归档或没有文章的页码即停止。"""
+    for page_num in range(1, max_pages + 1):
+        page_url = scraper.listing_page_url(page_num)
+        listing_html = archive.load(page_url)
+        if listing_html is None:
+            print(f"No archived listing for page {page_num} ({page_url}). Stopping replay.")
+            return
+        posts_on_page = scraper.parse_listing_html(listing_html, page_url)
+        if not posts_on_page:
+            print(f"No posts found on page {page_num}. Stopping replay.")
+            return
+        yield page_num, scraper.admit_new_posts(posts_on_page) # 与在线爬取相同的规范化和去重
+
+
+def _archived_sitemap_pages(scraper, archive, sitemap_url, max_pages):
+    """按归档的 sitemap（含嵌套索引）分批，批次划分与在线的 sitemap 爬取相同。"""
+    from sitemap import SitemapError, SitemapParser
+
+    def read_archived_sitemap(url):
+        body = archive.load(url)
+        if body is None:
+            print(f"No archived sitemap for {url}, skipping.")
+            return []
+        parser = SitemapParser()
+        try:
+            return parser.feed(body) + parser.close()
+        except SitemapError as e:
+            print(f"Error parsing archived sitemap {url}: {e}")
+            return []
+
+    for page_num, posts in scraper.iter_sitemap_pages(sitemap_url, read=read_archived_sitemap):
+        if page_num > max_pages:
+            return
+        yield page_num, posts
+
+
+def replay_from_archive(scraper, archive, writer, max_pages, parse_workers=None, extractor_name="bs4",
+                        sitemap_url=None):
+    """
+    离线重放：不访问网络，从归档中重新运行 列表页 + 详情页 的完整提取。
+    列表页按 scraper.listing_page_url 的页码顺序读取，遇到没有归档的页码即停止；
+    传入 sitemap_url 时改为读取归档的 sitemap（--sitemap 爬取时归档），按同样的批次处理。
+    列表中没有归档正文的文章会被跳过。
+    """
+    from crawl_metrics import apply_samples
+    from pipeline import _init_parser_worker, parse_article_bytes
+
+    if sitemap_url:
+        pages = _archived_sitemap_pages(scraper, archive, sitemap_url, max_pages)
+    else:
+        pages = _archived_listing_pages(scraper, archive, max_pages)
+    parse_workers = parse_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=parse_workers, initializer=_init_parser_worker,
+                             initargs=(extractor_name,)) as pool:
+        for page_num, posts_on_page in pages:
+            print(f"\n--- Replaying Page {page_num} ---")
+            jobs = []
+            for post_info in posts_on_page:
+                html = archive.load(post_info["url"])
+                if html is None:
+                    print(f"Not in archive, skipping: {post_info['url']}")
+                    continue
+                jobs.append((post_info, html))
+            writer.expect_page(page_num, [post_info["url"] for post_info, _ in jobs])
+
+            urls = [post_info["url"] for post_info, _ in jobs]
+            htmls = [html for _, html in jobs]
+            chunksize = max(1, len(jobs) // (parse_workers * 4))
+            results = pool.map(parse_article_bytes, htmls, urls, chunksize=chunksize)
+            for (post_info, _), (details, samples) in zip(jobs, results):
+                apply_samples(samples)
+                writer.article_done(page_num, post_info["url"], scraper.build_article_record(post_info, details))
+                scraper.report_article(post_info, details)
@@ -0,0 +1,138 @@
+"""
+抓取 / 解析 / 写出 三阶段流水线。
+
+异步模式下HTML解析仍在事件循环所在的线程里运行，一个CPU核很快成为瓶颈。
+这里把一次文章处理拆成三个阶段，阶段之间用有界队列连接（队列满时上游自动等待，形成背压）：
+
+    discover ──url_queue──> 抓取协程 × concurrency (I/O)
+             ──parse_queue──> ProcessPoolExecutor 解析进程 × parse_workers (CPU)
+             ──write_queue──> 唯一的写出协程（爬取状态库 + StreamingCSVWriter）
+
+解析进程只接收原始 bytes，运行与 real_python_scraper.parse_article_html 相同的提取后端；
+状态库和CSV只在写出阶段访问，因此不需要跨进程同步。解析阶段的指标样本随结果一起返回，
+在主进程中计入 crawl_metrics。
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import crawl_metrics
+from async_crawler import AsyncCrawler
+from extractors import MISSING_DETAILS, get_extractor
+from rate_control import RetryableError
+
+STAGE_QUEUE_SIZE_PER_WORKER = 2 # parse_queue / write_queue 长度 = 解析进程数 * 该值
+
+_worker_extractor = None
+
+
+def _init_parser_worker(extractor_name):
+    """每个解析进程启动时创建一次提取后端（lxml 后端会预编译 XPath）。"""
+    global _worker_extractor
+    _worker_extractor = get_extractor(extractor_name)
+    crawl_metrics.buffer_samples()
+
+
+def parse_article_bytes(html, article_url):
+    """在解析进程中运行；返回 (与 parse_article_html 相同的提取结果, 解析指标样本)。"""
+    try:
+        details = _worker_extractor.extract_article(html, article_url)
+    except Exception as e:
+        print(f"An unexpected error occurred while fetching details for {article_url}: {e}")
+        details = MISSING_DETAILS
+    return details, crawl_metrics.take_samples()
+
+
+class PipelineCrawler(AsyncCrawler):
+    """在 AsyncCrawler 的列表页发现和礼貌预算之上，把解析放到进程池里的流水线爬虫。"""
+
+    def __init__(self, scraper, writer, concurrency, per_host, request_delay,
+                 crawl_state=None, parse_workers=None, extractor_name="bs4", adaptive=True):
+        super().__init__(scraper, writer, concurrency, per_host, request_delay, crawl_state, adaptive)
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.extractor_name = extractor_name
+
+    async def fetch_stage(self, session, url_queue, parse_queue):
+        while True:
+            item = await url_queue.get()
+            try:
+                if item is None:
+                    return
+                page_num, post_info = item
+                url = post_info["url"]
+                print(f"Fetching article details from: {url}")
+                headers = self.crawl_state.conditional_headers(url) if self.crawl_state else None
+                try:
+                    result = await self.fetch(session, url, headers=headers)
+                except RetryableError as e:
+                    if self.retry_later(item, e):
+                        continue
+                    result = None
+                await parse_queue.put((page_num, post_info, result))
+            finally:
+                url_queue.task_done()
+
+    async def parse_stage(self, pool, parse_queue, write_queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                return
+            page_num, post_info, result = item
+            details = None
+            if result is not None and result[0] != 304:
+                details, samples = await loop.run_in_executor(pool, parse_article_bytes, result[1], post_info["url"])
+                crawl_metrics.apply_samples(samples)
+            await write_queue.put((page_num, post_info, result, details))
+
+    async def write_stage(self, write_queue):
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                return
+            page_num, post_info, result, details = item
+            details = self.resolve_details(post_info["url"], result, details, post_info.get("lastmod"))
+            self.write_article(page_num, post_info, details)
+
+    async def crawl(self, max_pages, start_page=1, sitemap_url=None):
+        url_queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        parse_queue = asyncio.Queue(maxsize=self.parse_workers * STAGE_QUEUE_SIZE_PER_WORKER)
+        write_queue = asyncio.Queue(maxsize=self.parse_workers * STAGE_QUEUE_SIZE_PER_WORKER)
+
+        with ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            initializer=_init_parser_worker,
+            initargs=(self.extractor_name,),
+        ) as pool:
+            async with self.session() as session:
+                fetchers = [asyncio.create_task(self.fetch_stage(session, url_queue, parse_queue))
+                            for _ in range(self.concurrency)]
+                parsers = [asyncio.create_task(self.parse_stage(pool, parse_queue, write_queue))
+                           for _ in range(self.parse_workers)]
+                writer_task = asyncio.create_task(self.write_stage(write_queue))
+                pump = asyncio.create_task(self.pump_retries(url_queue))
+                try:
+                    await self.discover_articles(session, max_pages, url_queue, start_page, sitemap_url)
+                    await self.drain(url_queue)
+                    pump.cancel()
+                    # 逐级关闭：上一阶段全部结束后再通知下一阶段
+                    for _ in fetchers:
+                        await url_queue.put(None)
+                    await asyncio.gather(*fetchers)
+                    for _ in parsers:
+                        await parse_queue.put(None)
+                    await asyncio.gather(*parsers)
+                    await write_queue.put(None)
+                    await writer_task
+                finally:
+                    for task in fetchers + parsers + [writer_task, pump]:
+                        task.cancel()
+
+
+def run_pipeline_crawl(scraper, writer, max_pages, concurrency, per_host, request_delay,
+                       crawl_state=None, start_page=1, parse_workers=None, extractor_name="bs4",
+                       sitemap_url=None, adaptive=True):
+    """同步入口，参数与 async_crawler.run_async_crawl 相同，另加解析进程数和提取后端名称。"""
+    crawler = PipelineCrawler(scraper, writer, concurrency, per_host, request_delay,
+                              crawl_state, parse_workers, extractor_name, adaptive)
+    asyncio.run(crawler.crawl(max_pages, start_page, sitemap_url))
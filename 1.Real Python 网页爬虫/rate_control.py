@@ -0,0 +1,198 @@
+"""
+自适应请求速率控制与延迟重试。
+
+固定的 REQUEST_DELAY 要么对服务器过于保守，要么在服务器变慢时仍然照常施压。这里用类似 TCP 拥塞控制的
+AIMD（加性增、乘性减）根据观测到的响应调整每个主机的请求速率（1 / 请求间隔）和并发数：
+- 成功且延迟正常：请求速率每次增加 RATE_STEP，并发数大约每一轮（concurrency 个成功请求）加 1；
+- 429 / 5xx、连接错误或超时、响应延迟明显高于基线：请求速率和并发数减半，
+  同一次拥塞在冷却时间内只减一次；
+- 响应带 Retry-After 时，在指定时间之前暂停该主机的全部请求。
+
+暂时性失败（RETRYABLE_STATUSES、连接错误、超时）以 RetryableError 抛出，文章URL进入 RetryQueue，
+按指数退避（加随机抖动，且不早于 Retry-After）延迟重试，超过 MAX_RETRIES 次才放弃。
+"""
+import asyncio
+import email.utils
+import heapq
+import itertools
+import random
+import time
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+RATE_STEP = 0.1 # 请求/秒，每个正常响应增加的请求速率
+LATENCY_FACTOR = 3.0 # 响应延迟超过基线的多少倍视为拥塞
+MIN_CONGESTED_LATENCY = 0.5 # 秒，低于该值的延迟不视为拥塞，避免基线极小时误判
+BASELINE_DRIFT = 1.01 # 基线（最小延迟）每个样本允许上浮的比例，使其能跟上服务器的长期变化
+DECREASE_COOLDOWN = 1.0 # 秒，两次乘性减少之间的最短间隔
+
+MAX_RETRIES = 4 # 每个URL最多重试的次数
+RETRY_BASE_DELAY = 2.0 # 秒，第一次重试前的等待，之后每次翻倍
+RETRY_MAX_DELAY = 120.0
+
+
+class RetryableError(Exception):
+    """暂时性失败，稍后重试可能成功；retry_after 为服务器要求的等待秒数（可能为 None）。"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value, now=None):
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），返回需要等待的秒数；缺失或无法解析时返回 None。"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """第 attempt 次（从 0 开始）重试前的等待秒数：指数退避 + 抖动，不早于 Retry-After。"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(1.0, 1.5)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class AimdController:
+    """
+    单个主机的 AIMD 速率控制器。
+
+    delay 是相邻两次请求发起的最小间隔，limit 是允许的并发请求数；时间使用 time.monotonic()
+    （与 asyncio 事件循环的 loop.time() 相同的时钟）。adaptive=False 时保持初始值不变，
+    只处理 Retry-After。
+    """
+
+    def __init__(self, initial_delay, min_delay, max_delay, max_concurrency,
+                 initial_concurrency=1, adaptive=True):
+        self.delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.rate = 1.0 / initial_delay if initial_delay > 0 else float("inf")
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(min(initial_concurrency, max_concurrency))
+        self.adaptive = adaptive
+        self.paused_until = 0.0
+        self.baseline_latency = None
+        self._last_decrease = float("-inf")
+
+    @property
+    def limit(self):
+        return max(1, int(self.concurrency))
+
+    def record(self, status, latency, retry_after=None, now=None):
+        """
+        记录一次响应：status 为 None 表示连接错误或超时；latency 为到收到响应头为止的秒数。
+        """
+        now = time.monotonic() if now is None else now
+        if retry_after is not None:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        if not self.adaptive:
+            return
+        if status is None or status in RETRYABLE_STATUSES:
+            self._decrease(now)
+            return
+        if latency is not None:
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            else:
+                self.baseline_latency = min(latency, self.baseline_latency * BASELINE_DRIFT)
+            if latency > MIN_CONGESTED_LATENCY and latency > LATENCY_FACTOR * self.baseline_latency:
+                self._decrease(now)
+                return
+        self._increase()
+
+    def _increase(self):
+        self._set_rate(self.rate + RATE_STEP)
+        self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+
+    def _decrease(self, now):
+        if now - self._last_decrease < max(DECREASE_COOLDOWN, self.delay):
+            return
+        self._last_decrease = now
+        # 速率为无穷大（请求间隔为 0）时，从“每个 RATE_STEP 间隔一个请求”的量级开始减半
+        self._set_rate(min(self.rate, 1.0 / RATE_STEP) / 2)
+        self.concurrency = max(1.0, self.concurrency / 2)
+        print(f"Backing off: request delay {self.delay:.2f} s, concurrency {self.limit}")
+
+    def _set_rate(self, rate):
+        """按 [min_delay, max_delay] 限制请求速率，并同步更新 delay。"""
+        max_rate = 1.0 / self.min_delay if self.min_delay > 0 else float("inf")
+        self.rate = min(max_rate, max(1.0 / self.max_delay, rate))
+        self.delay = 1.0 / self.rate if self.rate != float("inf") else 0.0
+
+
+class RetryQueue:
+    """
+    延迟重试队列：按到期时间排序的堆，每个 key（文章URL）独立计数重试次数。
+    同步、异步两种爬取模式共用；本身不等待，由调用方定期取出到期的条目。
+    """
+
+    def __init__(self, max_retries=MAX_RETRIES):
+        self.max_retries = max_retries
+        self._heap = []
+        self._attempts = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, key, item, retry_after=None, now=None):
+        """安排 item 稍后重试；key 的重试次数已用完时返回 False，调用方应当放弃。"""
+        attempt = self._attempts.get(key, 0)
+        if attempt >= self.max_retries:
+            return False
+        self._attempts[key] = attempt + 1
+        now = time.monotonic() if now is None else now
+        due = now + backoff_delay(attempt, retry_after)
+        heapq.heappush(self._heap, (due, next(self._counter), item))
+        return True
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        items = []
+        while self._heap and self._heap[0][0] <= now:
+            items.append(heapq.heappop(self._heap)[2])
+        return items
+
+
+def retry_inline(func, *args, max_retries=MAX_RETRIES):
+    """
+    顺序发现步骤（列表页、sitemap）的重试：遇到 RetryableError 按指数退避原地等待后重试，
+    超过次数后放弃并返回 None。
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func(*args)
+        except RetryableError as e:
+            if attempt == max_retries:
+                print(f"Giving up after {attempt + 1} attempts: {e}")
+                return None
+            delay = backoff_delay(attempt, e.retry_after)
+            print(f"{e}; retrying in {delay:.1f} s")
+            time.sleep(delay)
+
+
+async def retry_inline_async(coro_func, *args, max_retries=MAX_RETRIES):
+    """retry_inline 的异步版本，coro_func(*args) 返回协程。"""
+    for attempt in range(max_retries + 1):
+        try:
+            return await coro_func(*args)
+        except RetryableError as e:
+            if attempt == max_retries:
+                print(f"Giving up after {attempt + 1} attempts: {e}")
+                return None
+            delay = backoff_delay(attempt, e.retry_after)
+            print(f"{e}; retrying in {delay:.1f} s")
+            await asyncio.sleep(delay)
@@ -1,20 +1,76 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import time
 import random
 import os
+import argparse
+import sys
+from urllib.parse import urlparse
+
+from crawl_state import CrawlStateStore, CRAWL_STATE_DB
+from output_writer import StreamingCSVWriter, DEFAULT_BATCH_SIZE
+from extractors import get_extractor, EXTRACTORS, MISSING_DETAILS
+from page_archive import PageArchive, ARCHIVE_DIR, COMMIT_EVERY
+from sitemap import SitemapDiscovery, SitemapParser, SitemapError, SITEMAP_CHUNK_SIZE
+from frontier import Frontier, compile_url_patterns
+from work_queue import WORK_QUEUE_DB, DEFAULT_VISIBILITY_TIMEOUT
+from near_duplicates import NearDuplicateIndex, DEFAULT_THRESHOLD
+from structured_content import structure_columns
+import crawl_metrics
+from rate_control import (
+    AimdController, RetryQueue, RetryableError, RETRYABLE_STATUSES, parse_retry_after, retry_inline,
+)
+
+# 仓库根目录下的 shared_lib（与仪表盘、推荐API共用的数据集读写代码）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared_lib import write_articles_dataset
+from shared_lib.article_store import ArticleStore
 
 BASE_URL = "https://realpython.com"
 BLOG_PAGE_URL = BASE_URL + "/blog/"
 MAX_PAGES_TO_SCRAPE = 1 # 用于测试，稍后可以增加
 
+# sitemap 发现模式（见 sitemap.py）：文章URL按 SITEMAP_PAGE_SIZE 个一批，
+# 每批在 --max-pages 和 --resume 检查点中相当于一个列表页
+SITEMAP_URL = BASE_URL + "/sitemap.xml"
+SITEMAP_PAGE_SIZE = 50
+
 # 更新CSV文件路径，保存到共享数据目录
 CSV_FILENAME = "../shared_data/real_python_courses_analysis.csv"
+# CSV写出之后生成的按年份分区的 Parquet 数据集（见 shared_lib/dataset.py），供仪表盘和API按列读取
+PARQUET_DIR = "../shared_data/real_python_courses_analysis.parquet"
+# 文章库（SQLite + FTS5，见 shared_lib/article_store.py）：每批记录写出CSV的同时按URL upsert
+ARTICLE_STORE_DB = "../shared_data/articles.db"
 
 REQUEST_DELAY = 2 # 秒，避免过于频繁请求
 
-# 定义不希望抓取的URL模式列表
+# 自适应速率控制（见 rate_control.py）：REQUEST_DELAY 只是初始请求间隔，之后根据响应延迟和 429/5xx
+# 在 [MIN_REQUEST_DELAY, MAX_REQUEST_DELAY] 之间调整；--fixed-delay 恢复固定间隔
+MIN_REQUEST_DELAY = 0.2
+MAX_REQUEST_DELAY = 60
+RATE_CONTROLLER = None
+
+# 异步模式：REQUEST_DELAY 作为每个主机的聚合速率（每 REQUEST_DELAY 秒发起一个请求），
+# 而不是每个请求之后的固定等待
+DEFAULT_CONCURRENCY = 8 # 文章抓取协程数量
+DEFAULT_PER_HOST_CONNECTIONS = 4 # 同一主机的最大并发连接数
+
+# HTML提取后端（见 extractors.py）："bs4" 为原有的整页解析，"scoped" / "lxml" 只处理需要的子树
+DEFAULT_EXTRACTOR = "bs4"
+EXTRACTOR = get_extractor(DEFAULT_EXTRACTOR)
+
+# 原始响应归档（见 page_archive.py），默认开启，可用 --no-archive 关闭
+ARCHIVE = None
+
+# 抓取观察者：每个完成的HTTP响应都会以 (url, kind, status, 字节数, 耗时秒) 调用一次，
+# 用于基准测试和指标统计；耗时只包含网络请求本身，不包含礼貌等待
+FETCH_OBSERVERS = [crawl_metrics.record_fetch]
+
+# 本次爬取的URL规范化与去重（见 frontier.py），在 main() 中创建；
+# FRONTIER_EXPECTED_URLS 决定布隆过滤器的大小（100 万约 1.2 MB），超出后误判率上升但结果仍然精确
+FRONTIER = None
+FRONTIER_EXPECTED_URLS = 1_000_000
+
+# 定义不希望抓取的URL模式列表（编译为单个正则匹配，见 frontier.compile_url_patterns）
 EXCLUDED_URL_PATTERNS = [
     "/learning-paths/",
     "/search",
@@ -28,95 +84,145 @@ EXCLUDED_URL_PATTERNS = [
     # 例如： "/static/", "/careers/", "/about/"
 ]
 
+# sitemap 中还包含博客列表页不会出现的页面，sitemap 模式额外排除这些路径
+SITEMAP_EXCLUDED_URL_PATTERNS = [
+    "/tutorials/",
+    "/blog/",
+    "/lessons/",
+    "/account/",
+]
+
+def listing_page_url(page_num):
+    """返回第 page_num 页博客列表的URL（第1页没有 page/ 后缀）。"""
+    if page_num == 1:
+        return BLOG_PAGE_URL
+    return f"{BLOG_PAGE_URL}page/{page_num}/" # Real Python 分页结构
+
+def notify_fetch(url, kind, status, num_bytes, seconds):
+    for observer in FETCH_OBSERVERS:
+        observer(url, kind, status, num_bytes, seconds)
+
+def record_response(response, latency):
+    """把响应交给速率控制器；429/5xx 抛出 RetryableError。"""
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if RATE_CONTROLLER is not None:
+        RATE_CONTROLLER.record(response.status_code, latency, retry_after)
+    if response.status_code in RETRYABLE_STATUSES:
+        raise RetryableError(f"HTTP {response.status_code} for {response.url}", retry_after)
+
+def record_connection_error(url, error):
+    """连接错误和超时同样视为拥塞信号，并作为暂时性失败抛出。"""
+    if RATE_CONTROLLER is not None:
+        RATE_CONTROLLER.record(None, None)
+    raise RetryableError(f"Error fetching {url}: {error}") from error
+
+def polite_sleep():
+    """串行模式下每个请求之前的随机等待，平均值为速率控制器当前的请求间隔，并遵守 Retry-After。"""
+    delay = RATE_CONTROLLER.delay if RATE_CONTROLLER is not None else REQUEST_DELAY
+    wait = random.uniform(delay / 2, delay * 1.5)
+    if RATE_CONTROLLER is not None:
+        wait = max(wait, RATE_CONTROLLER.paused_until - time.monotonic())
+    time.sleep(wait)
+
+def http_get(url, kind, headers=None):
+    """
+    串行模式的GET请求：计时并通知抓取观察者，调用方负责 raise_for_status。
+    429/5xx、连接错误和超时抛出 RetryableError。
+    """
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, headers=headers, timeout=10)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        record_connection_error(url, e)
+    seconds = time.perf_counter() - start
+    ttfb = response.elapsed.total_seconds() # 发出请求到解析完响应头
+    crawl_metrics.observe_fetch_phase(kind, "ttfb", ttfb)
+    crawl_metrics.observe_fetch_phase(kind, "download", max(0.0, seconds - ttfb))
+    notify_fetch(url, kind, response.status_code, len(response.content), seconds)
+    record_response(response, ttfb)
+    return response
+
+def http_stream(url, kind, chunk_size=SITEMAP_CHUNK_SIZE):
+    """流式GET：逐块产出响应正文，读取完毕后通知抓取观察者；HTTP错误状态抛出 RequestException。"""
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, timeout=10, stream=True)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        record_connection_error(url, e)
+    with response:
+        ttfb = response.elapsed.total_seconds()
+        crawl_metrics.observe_fetch_phase(kind, "ttfb", ttfb)
+        record_response(response, ttfb)
+        response.raise_for_status()
+        num_bytes = 0
+        for chunk in response.iter_content(chunk_size):
+            num_bytes += len(chunk)
+            yield chunk
+    seconds = time.perf_counter() - start
+    crawl_metrics.observe_fetch_phase(kind, "download", max(0.0, seconds - ttfb))
+    notify_fetch(url, kind, response.status_code, num_bytes, seconds)
+
+def archive_response(url, body, headers, kind):
+    """启用归档时保存原始响应正文（见 page_archive.py）。"""
+    if ARCHIVE is not None:
+        ARCHIVE.store(url, body, headers, kind)
+
 def get_article_details(article_url):
     """
     抓取单个文章页面的标题、课程时长、关键词。
     根据新发现，课程文章使用 span[title="Course duration"] 显示时长，
     但不是每个文章都有课程时长。
     关键词使用精确的选择器逻辑抓取，基于JavaScript提取代码的逻辑。
-    正文内容抓取部分已暂时注释。
+    暂时性失败（429/5xx、连接错误、超时）抛出 RetryableError，由调用方安排重试。
     """
     try:
         print(f"Fetching article details from: {article_url}")
-        response = requests.get(article_url, timeout=10)
+        response = http_get(article_url, "article")
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # 获取文章标题
-        title_tag = soup.find("h1")
-        title = title_tag.get_text(strip=True) if title_tag else "N/A"
-        
-        # 获取课程时长 - 使用新发现的选择器，但注意它可能不存在
-        duration_tag = soup.select_one('span[title="Course duration"]')
-        duration = duration_tag.get_text(strip=True) if duration_tag else "N/A"
-        
-        # 抓取关键词标签 - 使用更精确的选择器逻辑（基于您提供的JavaScript代码）
-        keywords = []
-        
-        # 1. 尝试找到包含文章标题的父容器 div.col-md-11.col-lg-8.article.with-headerlinks
-        article_content_div = soup.select_one('div.col-md-11.col-lg-8.article.with-headerlinks')
-        
-        if article_content_div:
-            print("成功找到文章内容的父容器")
-            
-            # 2. 在这个文章内容容器内部，查找包含日期和标签的 div.mb-0
-            info_div = article_content_div.select_one('div.mb-0')
-            
-            if info_div:
-                print("成功找到文章信息容器 div.mb-0")
-                
-                # 3. 在这个 info_div 内部，查找包含标签的特定 span 元素
-                tags_container_span = info_div.select_one('span.d-inline.d-md-block')
-                
-                if tags_container_span:
-                    print("成功找到包含标签的 span 容器")
-                    
-                    # 4. 在这个 tags_container_span 内部，查找所有具有指定类的 <a> 标签
-                    desired_tags = tags_container_span.select('a.badge.badge-light.text-muted[data-previewable]')
-                    
-                    if desired_tags:
-                        keywords = [tag.get_text(strip=True) for tag in desired_tags]
-                        print(f"使用精确选择器找到标签: {keywords}")
-                    else:
-                        print("警告：在预期的容器中没有找到 'badge' 标签")
-                else:
-                    print("警告：未能找到包含标签的 span.d-inline.d-md-block 元素")
-            else:
-                print("警告：未能找到文章信息容器 div.mb-0")
-        else:
-            print("警告：未能找到文章内容的父容器，尝试使用备用方法")
-            # 如果精确选择器失败，使用原来的简单选择器作为备用
-            keyword_tags = soup.select('a.badge')
-            if keyword_tags:
-                keywords = [tag.get_text(strip=True) for tag in keyword_tags]
-                print(f"使用备用选择器找到标签: {keywords}")
-        
-        if keywords:
-            print(f"最终提取到的关键词: {keywords}")
-        else:
-            print("未找到任何关键词标签")
-        
-        # 获取文章内容
-        article_body_tag = soup.find("div", class_="article-body")
-        if not article_body_tag:
-            # 如果找不到 article-body，尝试找 article
-            article_body_tag = soup.find("div", class_="article")
-        
-        content = article_body_tag.get_text(strip=True) if article_body_tag else "N/A"
-        
-        if not title_tag or not article_body_tag:
-            print(f"Warning: Could not find title or body for {article_url}. Title found: {'Yes' if title_tag else 'No'}, Body found: {'Yes' if article_body_tag else 'No'}")
-
-        if not title_tag:
-            print(f"Warning: Could not find title for {article_url}.")
+        archive_response(article_url, response.content, response.headers, "article")
+        return parse_article_html(response.content, article_url)
+    except requests.RequestException as e:
+        print(f"Error fetching article {article_url}: {e}")
+        return MISSING_DETAILS
 
-        return title, duration, keywords, content
+def get_article_details_if_changed(article_url, crawl_state, lastmod=None):
+    """
+    增量模式下抓取文章：带上条件请求头，服务器返回 304 或提取结果的哈希未变化时返回 None，
+    否则返回与 get_article_details 相同的提取结果。请求失败时同样返回 None，保留上次的数据。
+    lastmod 为 sitemap 中的修改时间，抓取成功后记入状态库。
+    """
+    try:
+        print(f"Fetching article details from: {article_url}")
+        response = http_get(article_url, "article", headers=crawl_state.conditional_headers(article_url))
+        if response.status_code == 304:
+            crawl_state.mark_seen(article_url, lastmod)
+            print(f"Not modified (304), skipping: {article_url}")
+            return None
+        response.raise_for_status()
     except requests.RequestException as e:
         print(f"Error fetching article {article_url}: {e}")
-        return "N/A", "N/A", []
+        return None
+    archive_response(article_url, response.content, response.headers, "article")
+
+    details = parse_article_html(response.content, article_url)
+    changed = crawl_state.record_fetch(
+        article_url, response.headers.get("ETag"), response.headers.get("Last-Modified"), details, lastmod
+    )
+    if not changed:
+        print(f"Content unchanged, skipping: {article_url}")
+        return None
+    return details
+
+def parse_article_html(html, article_url):
+    """
+    从文章详情页的原始HTML中提取 (标题, 课程时长, 关键词列表, 正文, 结构化正文)。
+    与网络请求解耦，同步、异步两种爬取模式共用当前选择的提取后端（见 extractors.py）。
+    """
+    try:
+        return EXTRACTOR.extract_article(html, article_url)
     except Exception as e:
         print(f"An unexpected error occurred while fetching details for {article_url}: {e}")
-        return "N/A", "N/A", []
+        return MISSING_DETAILS
 
 def get_blog_posts_from_page(page_url):
     """
@@ -125,146 +231,462 @@ def get_blog_posts_from_page(page_url):
     使用 span.mr-2 选择器获取日期。
     """
     print(f"Scraping blog list page: {page_url}")
-    posts_data = []
     try:
-        response = requests.get(page_url, timeout=10)
+        response = http_get(page_url, "listing")
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
+        archive_response(page_url, response.content, response.headers, "listing")
+        return parse_listing_html(response.content, page_url)
+    except requests.RequestException as e:
+        print(f"Error fetching page {page_url}: {e}")
+        return []
 
-        article_blocks = soup.select("div.card-body")
+def parse_listing_html(html, page_url):
+    """从博客列表页的原始HTML中提取文章的 url / list_title / list_date。"""
+    posts_data = []
+    try:
+        article_blocks = EXTRACTOR.extract_listing_blocks(html)
         print(f"Found {len(article_blocks)} potential article blocks on {page_url} using 'div.card-body'.")
 
         if not article_blocks:
             print(f"No article blocks found on {page_url} using selector 'div.card-body'. Check selector or page structure.")
-            print(soup.prettify()[:5000]) 
             return posts_data
 
         for block in article_blocks:
-            a_tag = block.select_one("a")
-            article_url = ""
-            title = "N/A"
-            date = "N/A"  # 默认日期为N/A
+            article_url = block["href"] or ""
+            title = block["title"]
+            date = block["date"]  # 默认日期为N/A
 
-            if a_tag:
-                article_url = a_tag.get("href")
+            if block["has_link"]:
                 if article_url and not article_url.startswith("http"):
                     article_url = BASE_URL + article_url
-                
-                title_tag = a_tag.select_one("h2.card-title")
-                if title_tag:
-                    title = title_tag.get_text(strip=True)
-                elif block.select_one("h2.card-title"): 
-                    title_tag = block.select_one("h2.card-title")
-                    title = title_tag.get_text(strip=True)
-                
-                # 根据新发现，从列表页获取日期，使用span.mr-2选择器
-                date_tag = block.select_one("span.mr-2")
-                if date_tag:
-                    date = date_tag.get_text(strip=True)
             else: 
-                title_tag = block.select_one("h2.card-title")
-                title = title_tag.get_text(strip=True) if title_tag else "N/A"
                 print(f"Warning: Found a card-body without a direct <a> tag for URL. Title: {title}")
 
             # 更新的过滤条件
-            is_excluded = False
-            if article_url: 
-                for pattern in EXCLUDED_URL_PATTERNS:
-                    if pattern in article_url:
-                        is_excluded = True
-                        break
-            
-            if article_url and title != "N/A" and "realpython.com/" in article_url and not is_excluded:
+            if article_url and title != "N/A" and is_article_url(article_url):
                 posts_data.append({
                     "url": article_url,
                     "list_title": title,
                     "list_date": date  # 添加日期到数据中
                 })
             else:
-                if not article_url and a_tag:
-                    article_url_for_log = a_tag.get("href", "N/A")
-                    if not article_url_for_log.startswith("http") and article_url_for_log != "N/A":
-                         article_url_for_log = BASE_URL + article_url_for_log
-                else:
-                    article_url_for_log = article_url if article_url else "N/A"
+                article_url_for_log = article_url if article_url else "N/A"
                 print(f"Skipping non-article or incomplete block: Title='{title}', Date='{date}', URL='{article_url_for_log}'")
 
         print(f"Successfully extracted {len(posts_data)} articles from {page_url}.")
         return posts_data
 
-    except requests.RequestException as e:
-        print(f"Error fetching page {page_url}: {e}")
-        return posts_data
     except Exception as e:
         print(f"An unexpected error occurred on page {page_url}: {e}")
         return posts_data
 
-def main():
-    all_articles_data = []
-    
-    for page_num in range(1, MAX_PAGES_TO_SCRAPE + 1):
-        if page_num == 1:
-            current_page_url = BLOG_PAGE_URL
+def is_article_url(url):
+    """属于 BASE_URL 所在主机、且不匹配任何 EXCLUDED_URL_PATTERNS 的URL才作为文章抓取。"""
+    if f"{urlparse(BASE_URL).netloc}/" not in url:
+        return False
+    return not compile_url_patterns(EXCLUDED_URL_PATTERNS).search(url)
+
+def is_sitemap_article_url(url):
+    """sitemap 模式的文章过滤：在 is_article_url 的基础上排除首页和 SITEMAP_EXCLUDED_URL_PATTERNS。"""
+    if not is_article_url(url) or not urlparse(url).path.strip("/"):
+        return False
+    return not compile_url_patterns(SITEMAP_EXCLUDED_URL_PATTERNS).search(url)
+
+def admit_url(url):
+    """规范化URL并在本次爬取中去重，已经出现过时返回 None；没有创建 FRONTIER 时原样返回。"""
+    if FRONTIER is None:
+        return url
+    return FRONTIER.admit(url)
+
+def admit_sitemap_url(url):
+    """sitemap 条目的过滤 + 去重，供 sitemap.SitemapDiscovery 使用。"""
+    return admit_url(url) if is_sitemap_article_url(url) else None
+
+def admit_new_posts(posts):
+    """去掉本次爬取中已经在其他列表页出现过的文章，其余文章的URL替换为规范形式。"""
+    admitted = []
+    for post_info in posts:
+        url = admit_url(post_info["url"])
+        if url is None:
+            print(f"Duplicate URL, skipping: {post_info['url']}")
+            continue
+        admitted.append(dict(post_info, url=url))
+    return admitted
+
+def read_sitemap(sitemap_url):
+    """流式抓取并解析一个 sitemap 文件，返回其中的条目；请求或解析失败时返回空列表。"""
+    print(f"Reading sitemap: {sitemap_url}")
+    try:
+        return retry_inline(read_sitemap_once, sitemap_url) or []
+    except (requests.RequestException, SitemapError) as e:
+        print(f"Error reading sitemap {sitemap_url}: {e}")
+        return []
+
+def read_sitemap_once(sitemap_url):
+    parser = SitemapParser()
+    entries = []
+    chunks = [] if ARCHIVE is not None else None # 归档完整的 sitemap，供 --replay --sitemap 使用
+    for chunk in http_stream(sitemap_url, "sitemap"):
+        entries.extend(parser.feed(chunk))
+        if chunks is not None:
+            chunks.append(chunk)
+    entries.extend(parser.close())
+    if chunks is not None:
+        archive_response(sitemap_url, b"".join(chunks), None, "sitemap")
+    return entries
+
+def iter_sitemap_pages(sitemap_url, read=read_sitemap):
+    """遍历 sitemap（含嵌套索引），按批产出 (批次号, [post_info])；read(url) 返回一个 sitemap 的条目。"""
+    discovery = SitemapDiscovery(sitemap_url, admit_sitemap_url, SITEMAP_PAGE_SIZE)
+    sitemap = discovery.next_sitemap()
+    while sitemap is not None:
+        yield from discovery.add_entries(read(sitemap))
+        sitemap = discovery.next_sitemap()
+    yield from discovery.finish()
+
+def skip_unchanged_sitemap_posts(posts, crawl_state):
+    """增量模式下去掉 sitemap lastmod 与上次抓取时相同的已知文章（只刷新 last_seen）。"""
+    if not crawl_state:
+        return posts
+    changed = []
+    for post_info in posts:
+        if crawl_state.lastmod_unchanged(post_info["url"], post_info["lastmod"]):
+            crawl_state.mark_seen(post_info["url"])
         else:
-            current_page_url = f"{BLOG_PAGE_URL}page/{page_num}/" # Real Python 分页结构
+            changed.append(post_info)
+    if len(changed) < len(posts):
+        print(f"Skipping {len(posts) - len(changed)} articles with unchanged sitemap lastmod.")
+    return changed
+
+def build_article_record(post_info, details):
+    """把列表页信息和详情页提取结果整合为一行CSV记录，只保留用户需要的字段。"""
+    detail_title, course_duration, keywords, article_content, structure = details
+    return {
+        "Title": detail_title if detail_title != "N/A" else post_info["list_title"],
+        "URL": post_info["url"],
+        "Date": post_info["list_date"],
+        "Course Duration": course_duration,  # 课程时长，可能为N/A
+        "Keywords": ", ".join(keywords) if keywords else "N/A",  # 将关键词列表转换为逗号分隔的字符串
+        "Content": article_content,  # 正文内容
+        **structure_columns(structure),  # 正文、代码块、小标题、行内代码和单词数（见 structured_content.py）
+    }
+
+def report_article(post_info, details):
+    """打印单篇文章的处理结果。"""
+    detail_title, course_duration, keywords = details[:3]
+    print(f"Processed and added: {detail_title if detail_title != 'N/A' else post_info.get('list_title', 'Unknown Title')}")
+    if post_info["list_date"] != "N/A":
+        print(f"Date: {post_info['list_date']}")
+    if course_duration != "N/A":
+        print(f"Course duration: {course_duration}")
+    if keywords:
+        print(f"Keywords: {', '.join(keywords)}")
+
+def crawl_sequential(max_pages, writer, crawl_state=None, start_page=1):
+    """
+    原有的串行爬取流程：逐页、逐篇抓取，每篇之间随机延迟，解析完成后立即交给 writer 写出。
+    传入 crawl_state 时为增量模式：只写出新增或变化的文章，
+    并在某一列表页上的文章全部已知时停止分页。
+    暂时失败的文章进入延迟重试队列，在之后的文章之间穿插重试，全部列表页处理完后再等待剩余的重试。
+    """
+    retries = RetryQueue()
+    for page_num in range(start_page, max_pages + 1):
+        current_page_url = listing_page_url(page_num)
         
         print(f"\n--- Scraping Page {page_num} ---")
         
-        # 从列表页获取初步信息
-        posts_on_page = get_blog_posts_from_page(current_page_url)
+        # 从列表页获取初步信息（暂时性失败时原地退避重试）
+        posts_on_page = retry_inline(get_blog_posts_from_page, current_page_url) or []
         
         if not posts_on_page:
             print(f"No posts found on page {page_num}. Stopping further pagination.")
             break # 如果某一页没有文章了，就停止
 
-        for post_info in posts_on_page:
-            print(f"Processing article: {post_info.get('list_title', 'Unknown Title')}")
-            time.sleep(random.uniform(REQUEST_DELAY / 2, REQUEST_DELAY * 1.5)) # 随机延迟
-            
-            # 获取文章详情页内容，现在返回四个值：标题、课程时长、关键词和正文内容
-            detail_title, course_duration, keywords, article_content = get_article_details(post_info["url"])
-
-            # 整合所有信息，只保留用户需要的字段
-            article_data = {
-                "Title": detail_title if detail_title != "N/A" else post_info["list_title"],
-                "URL": post_info["url"],
-                "Date": post_info["list_date"],
-                "Course Duration": course_duration,  # 课程时长，可能为N/A
-                "Keywords": ", ".join(keywords) if keywords else "N/A",  # 将关键词列表转换为逗号分隔的字符串
-                "Content": article_content,  # 正文内容
-            }
-            all_articles_data.append(article_data)
-            print(f"Processed and added: {detail_title if detail_title != 'N/A' else post_info.get('list_title', 'Unknown Title')}")
-            if post_info["list_date"] != "N/A":
-                print(f"Date: {post_info['list_date']}")
-            if course_duration != "N/A":
-                print(f"Course duration: {course_duration}")
-            if keywords:
-                print(f"Keywords: {', '.join(keywords)}")
+        if crawl_state and crawl_state.all_known(post["url"] for post in posts_on_page):
+            print(f"All articles on page {page_num} are already known. Stopping incremental crawl.")
+            for post_info in posts_on_page:
+                crawl_state.mark_seen(post_info["url"])
+            break
+
+        posts_on_page = admit_new_posts(posts_on_page)
+        process_page_sequential(page_num, posts_on_page, writer, crawl_state, retries)
 
         print(f"--- Finished Page {page_num} ---")
-        if page_num < MAX_PAGES_TO_SCRAPE:
-             print(f"Waiting for {REQUEST_DELAY} seconds before next page...")
-             time.sleep(REQUEST_DELAY)
-
-
-    if all_articles_data:
-        df = pd.DataFrame(all_articles_data)
-        try:
-            # 确保输出目录存在
-            output_dir = os.path.dirname(CSV_FILENAME)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-                print(f"Created directory: {output_dir}")
-            
-            df.to_csv(CSV_FILENAME, index=False, encoding="utf-8-sig")
-            print(f"\nSuccessfully scraped {len(all_articles_data)} articles.")
-            print(f"Data saved to {CSV_FILENAME}")
-            print(f"Absolute path: {os.path.abspath(CSV_FILENAME)}")
-        except Exception as e:
-            print(f"Error saving data to CSV: {e}")
+        if page_num < max_pages:
+             print("Waiting before next page...")
+             polite_sleep()
+    drain_retries_sequential(writer, crawl_state, retries)
+
+def process_page_sequential(page_num, posts_on_page, writer, crawl_state=None, retries=None):
+    """逐篇抓取一个列表页（或一批 sitemap 文章）中的文章，每篇之间随机延迟。"""
+    writer.expect_page(page_num, [post["url"] for post in posts_on_page])
+    for post_info in posts_on_page:
+        if writer.is_done(post_info["url"]):
+            print(f"Already done in previous run, skipping: {post_info['url']}")
+            continue
+        print(f"Processing article: {post_info.get('list_title', 'Unknown Title')}")
+        process_article_sequential(page_num, post_info, writer, crawl_state, retries)
+        if retries:
+            for page, retry_info in retries.pop_due():
+                print(f"Retrying article: {retry_info['url']}")
+                process_article_sequential(page, retry_info, writer, crawl_state, retries)
+
+def process_article_sequential(page_num, post_info, writer, crawl_state=None, retries=None):
+    """抓取、解析并写出一篇文章；暂时性失败时放入 retries，重试次数用完后按请求失败处理。"""
+    polite_sleep() # 随机延迟
+
+    # 获取文章详情页内容，返回四个值：标题、课程时长、关键词和正文内容
+    try:
+        if crawl_state:
+            details = get_article_details_if_changed(post_info["url"], crawl_state, post_info.get("lastmod"))
+        else:
+            details = get_article_details(post_info["url"])
+    except RetryableError as e:
+        if retries is not None and retries.schedule(post_info["url"], (page_num, post_info), e.retry_after):
+            print(f"{e}; will retry later: {post_info['url']}")
+            return
+        print(f"Giving up on {post_info['url']}: {e}")
+        details = None if crawl_state else MISSING_DETAILS
+    if details is None:
+        writer.article_done(page_num, post_info["url"])
+        return
+    writer.article_done(page_num, post_info["url"], build_article_record(post_info, details))
+    report_article(post_info, details)
+
+def drain_retries_sequential(writer, crawl_state, retries):
+    """发现结束后等待并处理重试队列中剩余的文章。"""
+    while retries:
+        time.sleep(max(0.0, retries.next_due() - time.monotonic()))
+        for page_num, post_info in retries.pop_due():
+            print(f"Retrying article: {post_info['url']}")
+            process_article_sequential(page_num, post_info, writer, crawl_state, retries)
+
+def crawl_sitemap_sequential(sitemap_url, max_pages, writer, crawl_state=None, start_page=1):
+    """
+    串行的 sitemap 模式：文章URL来自 sitemap 而不是博客列表页，每批 SITEMAP_PAGE_SIZE 篇；
+    增量模式下 lastmod 未变化的已知文章不发起请求。
+    """
+    retries = RetryQueue()
+    for page_num, posts in iter_sitemap_pages(sitemap_url):
+        if page_num > max_pages:
+            break
+        if page_num < start_page:
+            continue
+        print(f"\n--- Sitemap Batch {page_num} ---")
+        posts = skip_unchanged_sitemap_posts(posts, crawl_state)
+        process_page_sequential(page_num, posts, writer, crawl_state, retries)
+        print(f"--- Finished Sitemap Batch {page_num} ---")
+    drain_retries_sequential(writer, crawl_state, retries)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Real Python 博客文章采集器")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES_TO_SCRAPE,
+                        help="最多抓取的博客列表页数")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="使用 asyncio 并发爬取引擎（见 async_crawler.py）")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="异步模式下的文章抓取协程数量")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST_CONNECTIONS,
+                        help="异步模式下同一主机的最大并发连接数")
+    parser.add_argument("--fixed-delay", action="store_true",
+                        help="关闭自适应速率控制，使用固定的 REQUEST_DELAY 和 --per-host")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="抓取/解析/写出三阶段流水线，解析在进程池中运行（见 pipeline.py）")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="流水线模式下的解析进程数，默认等于CPU核数")
+    parser.add_argument("--sitemap", nargs="?", const=SITEMAP_URL, default=None, metavar="URL",
+                        help="从 sitemap（默认 %(const)s）发现文章URL，代替逐页抓取博客列表页；"
+                             "每批文章计为一页")
+    parser.add_argument("--extractor", choices=sorted(EXTRACTORS), default=DEFAULT_EXTRACTOR,
+                        help="HTML提取后端")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR,
+                        help="原始响应归档目录")
+    parser.add_argument("--no-archive", action="store_true",
+                        help="不归档原始响应")
+    parser.add_argument("--replay", action="store_true",
+                        help="离线重放：不访问网络，从归档中重新提取全部列表页和文章；与 --sitemap 同用时"
+                             "按归档的 sitemap 分批")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量爬取：使用爬取状态库发送条件请求，只抓取新增或变化的文章并合并进CSV")
+    parser.add_argument("--state-db", default=CRAWL_STATE_DB,
+                        help="增量爬取状态库（SQLite）路径")
+    parser.add_argument("--resume", action="store_true",
+                        help="从上次中断的检查点继续爬取（最后提交的列表页和文章）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="每累计多少条记录 flush 一次并更新检查点")
+    parser.add_argument("--metrics-file", default=None, metavar="PATH",
+                        help="定期把 Prometheus 格式的指标写入该文件（供 node-exporter textfile collector 读取）")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help=f"在本地开放 /metrics 端点（monitoring/prometheus.yml 中的端口为 "
+                             f"{crawl_metrics.DEFAULT_METRICS_PORT}）")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="不做近似重复检测（duplicate_of 列留空）")
+    parser.add_argument("--duplicate-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="MinHash 估计的正文 Jaccard 相似度达到该值时标记为近似重复（见 near_duplicates.py）")
+    parser.add_argument("--no-parquet", action="store_true",
+                        help="不生成 Parquet 数据集，只写CSV")
+    parser.add_argument("--parquet-dir", default=PARQUET_DIR,
+                        help="Parquet 数据集目录（按发布年份分区）")
+    parser.add_argument("--no-store", action="store_true",
+                        help="不写入文章库")
+    parser.add_argument("--store-db", default=ARTICLE_STORE_DB,
+                        help="文章库（SQLite + FTS5）路径")
+    role = parser.add_mutually_exclusive_group()
+    role.add_argument("--coordinator", action="store_true",
+                      help="分布式模式的协调者：发现文章放入共享队列，等待工作进程完成后合并分片（见 distributed.py）")
+    role.add_argument("--worker", action="store_true",
+                      help="分布式模式的工作进程：从共享队列领取文章抓取，写入自己的分片")
+    parser.add_argument("--queue-db", default=WORK_QUEUE_DB,
+                        help="分布式模式的共享任务队列（SQLite WAL）路径")
+    parser.add_argument("--worker-id", default=None,
+                        help="工作进程标识，决定分片文件名，默认 <主机名>-<进程号>")
+    parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT,
+                        help="任务租约的有效秒数，超时未完成的任务由其他工作进程重新领取")
+    args = parser.parse_args(argv)
+    if (args.coordinator or args.worker) and (
+        args.use_async or args.pipeline or args.replay or args.incremental or args.resume
+    ):
+        parser.error("--coordinator/--worker cannot be combined with --async, --pipeline, --replay, "
+                     "--incremental or --resume")
+    return args
+
+def export_parquet(csv_filename, dataset_dir):
+    """把最终的CSV转换为 Parquet 数据集；没有安装 pyarrow 时跳过（CSV 仍然是完整的输出）。"""
+    if not os.path.exists(csv_filename):
+        return
+    try:
+        rows = write_articles_dataset(csv_filename, dataset_dir)
+    except ImportError as e:
+        print(f"{e}. Skipping Parquet dataset.")
+        return
+    print(f"Parquet dataset with {rows} articles written to {dataset_dir}")
+
+def run_distributed(args, dedupe=None, store=None):
+    """--coordinator / --worker：通过共享任务队列协作的分布式爬取（见 distributed.py）。"""
+    from distributed import run_coordinator, run_worker, default_worker_id
+    from work_queue import SqliteWorkQueue
+
+    queue = SqliteWorkQueue(args.queue_db, visibility_timeout=args.visibility_timeout)
+    try:
+        if args.coordinator:
+            run_coordinator(sys.modules[__name__], queue, CSV_FILENAME, args.max_pages, args.sitemap, dedupe,
+                            store)
+        else:
+            run_worker(sys.modules[__name__], queue, CSV_FILENAME, args.worker_id or default_worker_id(),
+                       args.batch_size)
+    finally:
+        queue.close()
+
+def main(argv=None):
+    global EXTRACTOR, ARCHIVE, RATE_CONTROLLER, FRONTIER
+    args = parse_args(argv)
+    EXTRACTOR = get_extractor(args.extractor)
+    RATE_CONTROLLER = AimdController(
+        REQUEST_DELAY, MIN_REQUEST_DELAY, MAX_REQUEST_DELAY, max_concurrency=1, adaptive=not args.fixed_delay
+    )
+    distributed = args.coordinator or args.worker
+    if args.replay or not args.no_archive:
+        # 分布式模式下多个进程共用归档索引，每次归档立即提交，避免长时间持有写锁
+        ARCHIVE = PageArchive(args.archive_dir, commit_every=1 if distributed else COMMIT_EVERY)
+    crawl_state = CrawlStateStore(args.state_db) if args.incremental and not args.replay else None
+    # 重放时同样去重：同一篇文章可能出现在归档的两个列表页上（新文章把旧文章挤到下一页）
+    FRONTIER = Frontier(expected_urls=FRONTIER_EXPECTED_URLS)
+    dedupe = None if args.no_dedupe else NearDuplicateIndex(args.duplicate_threshold)
+    if dedupe is not None and args.incremental and not args.replay and os.path.exists(CSV_FILENAME):
+        # 增量模式的新文章也与之前爬到的文章比较
+        print(f"Seeded near-duplicate index with {dedupe.seed_from_csv(CSV_FILENAME)} existing articles.")
+    # 分布式模式下由协调者在合并分片时写入文章库
+    store = None if args.no_store or args.worker else ArticleStore(args.store_db)
+    # 分布式模式由协调者合并各工作进程的分片，不使用 StreamingCSVWriter
+    writer = None
+    start_page = 1
+    if not distributed:
+        # 状态库只在对应的记录落盘之后提交，避免状态库记录了实际上没有保存的文章
+        writer = StreamingCSVWriter(
+            CSV_FILENAME,
+            batch_size=args.batch_size,
+            on_commit=crawl_state.commit if crawl_state else None,
+            dedupe=dedupe,
+            store=store,
+        )
+        start_page = writer.open(resume=args.resume and not args.replay)
+
+    if args.metrics_port is not None:
+        crawl_metrics.start_metrics_server(args.metrics_port)
+    metrics_file = crawl_metrics.TextfileExporter(args.metrics_file).start() if args.metrics_file else None
+    started = time.perf_counter()
+    try:
+        if distributed:
+            run_distributed(args, dedupe, store)
+        elif args.replay:
+            from page_archive import replay_from_archive
+            archive, ARCHIVE = ARCHIVE, None # 重放时不再把读到的页面重复归档
+            replay_from_archive(
+                sys.modules[__name__],
+                archive,
+                writer,
+                max_pages=args.max_pages,
+                parse_workers=args.parse_workers,
+                extractor_name=args.extractor,
+                sitemap_url=args.sitemap,
+            )
+            ARCHIVE = archive
+        elif args.pipeline:
+            from pipeline import run_pipeline_crawl
+            run_pipeline_crawl(
+                sys.modules[__name__],
+                writer,
+                max_pages=args.max_pages,
+                concurrency=args.concurrency,
+                per_host=args.per_host,
+                request_delay=REQUEST_DELAY,
+                crawl_state=crawl_state,
+                start_page=start_page,
+                parse_workers=args.parse_workers,
+                extractor_name=args.extractor,
+                sitemap_url=args.sitemap,
+                adaptive=not args.fixed_delay,
+            )
+        elif args.use_async:
+            from async_crawler import run_async_crawl
+            run_async_crawl(
+                sys.modules[__name__],
+                writer,
+                max_pages=args.max_pages,
+                concurrency=args.concurrency,
+                per_host=args.per_host,
+                request_delay=REQUEST_DELAY,
+                crawl_state=crawl_state,
+                start_page=start_page,
+                sitemap_url=args.sitemap,
+                adaptive=not args.fixed_delay,
+            )
+        elif args.sitemap:
+            crawl_sitemap_sequential(args.sitemap, args.max_pages, writer, crawl_state, start_page)
+        else:
+            crawl_sequential(args.max_pages, writer, crawl_state, start_page)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        raise
     else:
-        print("\nNo articles were scraped. CSV file not created.")
+        if writer is not None:
+            writer.finalize(merge=args.incremental and not args.replay)
+        if not args.no_parquet and not args.worker:
+            export_parquet(CSV_FILENAME, args.parquet_dir)
+    finally:
+        if crawl_state:
+            crawl_state.close()
+        if FRONTIER is not None:
+            FRONTIER.close()
+            FRONTIER = None
+        if ARCHIVE is not None:
+            ARCHIVE.close()
+        if store is not None:
+            store.close()
+        if metrics_file is not None:
+            metrics_file.stop()
+        print(crawl_metrics.summary_table(time.perf_counter() - started))
 
 if __name__ == "__main__":
     main()
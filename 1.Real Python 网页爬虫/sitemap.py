@@ -0,0 +1,171 @@
+"""
+基于 sitemap 的文章URL发现。
+
+列表页模式需要逐页抓取 /blog/page/N/ 并解析 div.card-body；sitemap 模式改为读取站点的
+sitemap.xml（以及其中嵌套的 sitemap 索引），几次请求就能拿到全部文章URL和 lastmod：
+- SitemapParser 基于 xml.etree.ElementTree.XMLPullParser 增量解析响应正文块，
+  每解析完一个 <url> / <sitemap> 条目就把它从树上清除，内存占用与文件大小无关；
+  以 gzip 魔数开头的正文（.xml.gz）会先流式解压；
+- SitemapDiscovery 负责遍历嵌套索引，并把通过过滤和去重（见 frontier.py）的文章URL按固定大小分批，
+  批次号在输出检查点（output_writer）中代替列表页码，用于 --resume；
+- 文章的 lastmod 随 post_info 一起传递，增量模式下与爬取状态库中记录的值比较，
+  未变化的文章不再发起请求。
+"""
+import datetime
+import zlib
+from collections import deque
+from xml.etree import ElementTree
+
+SITEMAP_CHUNK_SIZE = 64 * 1024 # 流式读取 sitemap 的块大小
+MAX_SITEMAP_DEPTH = 3 # sitemap 索引的最大嵌套层数，防止错误配置导致无限递归
+
+
+class SitemapError(Exception):
+    """sitemap 正文无法解压或不是合法的XML。"""
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapParser:
+    """
+    增量 sitemap 解析器。
+
+    feed(chunk) 返回本块中已经完整解析的条目列表，close() 返回剩余条目；
+    条目为 (kind, loc, lastmod)，kind 是 "url"（文章）或 "sitemap"（嵌套的 sitemap），
+    lastmod 缺失时为 None。
+    """
+
+    def __init__(self):
+        self._parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._decompressor = None
+        self._started = False
+
+    def feed(self, chunk):
+        if not self._started:
+            self._started = True
+            if chunk[:2] == b"\x1f\x8b":
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            if self._decompressor is not None:
+                chunk = self._decompressor.decompress(chunk)
+            self._parser.feed(chunk)
+        except (zlib.error, ElementTree.ParseError) as e:
+            raise SitemapError(str(e)) from e
+        return self._read_entries()
+
+    def close(self):
+        try:
+            if self._decompressor is not None:
+                self._parser.feed(self._decompressor.flush())
+            self._parser.close()
+        except (zlib.error, ElementTree.ParseError) as e:
+            raise SitemapError(str(e)) from e
+        return self._read_entries()
+
+    def _read_entries(self):
+        entries = []
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                continue
+            kind = _local_name(element.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            loc = lastmod = None
+            for child in element:
+                name = _local_name(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = (child.text or "").strip() or None
+            if loc:
+                entries.append((kind, loc, lastmod))
+            # 已处理的条目从根节点上摘掉；正在构建中的下一个条目由解析器自己持有引用，不受影响
+            self._root.clear()
+        return entries
+
+
+def format_lastmod(lastmod):
+    """把 W3C 格式的 lastmod 转为与博客列表页相同风格的日期（如 "Jan 05, 2024"），无法解析时返回 "N/A"。"""
+    if not lastmod:
+        return "N/A"
+    try:
+        value = datetime.datetime.fromisoformat(lastmod.replace("Z", "+00:00"))
+    except ValueError:
+        return "N/A"
+    return value.strftime("%b %d, %Y")
+
+
+def post_info_from_sitemap(loc, lastmod):
+    """
+    与 parse_listing_html 返回的 post_info 结构相同；sitemap 中没有标题，
+    list_title 为 "N/A"（输出时使用详情页标题），list_date 取自 lastmod。
+    """
+    return {
+        "url": loc,
+        "list_title": "N/A",
+        "list_date": format_lastmod(lastmod),
+        "lastmod": lastmod,
+    }
+
+
+class SitemapDiscovery:
+    """
+    sitemap 遍历与文章分批，同步、异步两种爬取模式共用。调用方负责抓取：
+
+        url = discovery.next_sitemap()          # 下一个待读取的 sitemap，None 表示遍历结束
+        pages = discovery.add_entries(entries)  # 登记解析结果，返回已经凑满的 (批次号, [post_info])
+        pages = discovery.finish()              # 遍历结束后返回最后一个不满的批次
+
+    admit_url(loc) 负责过滤和去重：返回规范化后的文章URL，不需要抓取或已经出现过时返回 None。
+    批次号只按被接受的URL顺序编号，与增量模式下跳过了哪些文章无关，
+    因此同一份 sitemap 在续爬时得到相同的批次划分。
+    """
+
+    def __init__(self, root_url, admit_url, page_size, max_depth=MAX_SITEMAP_DEPTH):
+        self.admit_url = admit_url
+        self.page_size = page_size
+        self.max_depth = max_depth
+        self._pending = deque([(root_url, 0)])
+        self._seen = set()
+        self._depth = 0
+        self._batch = []
+        self._page_num = 0
+
+    def next_sitemap(self):
+        while self._pending:
+            url, depth = self._pending.popleft()
+            if url not in self._seen:
+                self._seen.add(url)
+                self._depth = depth
+                return url
+        return None
+
+    def add_entries(self, entries):
+        pages = []
+        for kind, loc, lastmod in entries:
+            if kind == "sitemap":
+                if self._depth < self.max_depth:
+                    self._pending.append((loc, self._depth + 1))
+                else:
+                    print(f"Sitemap nesting deeper than {self.max_depth} levels, ignoring: {loc}")
+                continue
+            url = self.admit_url(loc)
+            if url is None:
+                continue
+            self._batch.append(post_info_from_sitemap(url, lastmod))
+            if len(self._batch) >= self.page_size:
+                pages.append(self._next_page())
+        return pages
+
+    def finish(self):
+        return [self._next_page()] if self._batch else []
+
+    def _next_page(self):
+        self._page_num += 1
+        page, self._batch = self._batch, []
+        return self._page_num, page
@@ -0,0 +1,255 @@
+"""
+分布式爬取的持久化任务队列（协调者 + 多个工作进程共用）。
+
+SqliteWorkQueue 是默认的后端，整个爬取的共享状态都在一个 WAL 模式的 SQLite 文件里：
+- tasks：待抓取的文章URL及其 post_info。工作进程以租约（lease）方式领取任务，
+  租约在 visibility_timeout 秒后过期，崩溃的工作进程持有的任务会被其他进程重新领取；
+  一次领取的一批任务要排队等待全局礼貌间隔，工作进程每处理一个任务之前用 renew() 为其余任务续租；
+  成功写入分片后才 complete()，因此每篇文章至少被处理一次（合并分片时按URL去重）；
+- hosts：每个主机的全局礼貌预算。所有进程通过 reserve_slot() 预约请求时间槽，
+  相邻两次请求（无论来自哪个进程）至少间隔该主机当前的 delay；Retry-After 暂停同样全局生效；
+- meta：协调者是否已经完成发现。
+
+时间使用 time.time()（墙上时钟），多个进程之间可以比较。WAL 模式支持同一台机器上的
+多个读写进程，但不能放在网络文件系统上；跨主机运行时需要实现相同方法的其他后端
+（enqueue / lease / renew / complete / retry / reserve_slot / update_host / pause_host /
+mark_discovery_done / discovery_done / finished / counts），例如基于 Redis 或数据库服务。
+"""
+import json
+import os
+import sqlite3
+import time
+
+WORK_QUEUE_DB = "../shared_data/work_queue.db"
+DEFAULT_VISIBILITY_TIMEOUT = 300 # 秒，租约过期后任务重新变为可领取
+DEFAULT_MAX_ATTEMPTS = 5 # 每个任务最多被领取的次数（包括工作进程崩溃导致的租约过期）
+BUSY_TIMEOUT_MS = 30_000 # 其他进程持有写锁时的最长等待
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    url           TEXT PRIMARY KEY,
+    seq           INTEGER NOT NULL,
+    payload       TEXT NOT NULL,
+    state         TEXT NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    not_before    REAL NOT NULL DEFAULT 0,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_error    TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (state, not_before, seq);
+CREATE TABLE IF NOT EXISTS hosts (
+    host          TEXT PRIMARY KEY,
+    delay         REAL,
+    next_slot     REAL NOT NULL DEFAULT 0,
+    paused_until  REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class Task:
+    """领取到的任务：url、post_info 以及这是第几次领取。"""
+
+    __slots__ = ("url", "post_info", "attempts")
+
+    def __init__(self, url, post_info, attempts):
+        self.url = url
+        self.post_info = post_info
+        self.attempts = attempts
+
+
+class SqliteWorkQueue:
+    """SQLite（WAL）后端；每个进程各自打开一个实例。"""
+
+    def __init__(self, path=WORK_QUEUE_DB, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        # isolation_level=None：自己用 BEGIN IMMEDIATE 控制事务，领取任务时先拿写锁，避免两个进程领到同一任务
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def _transaction(self):
+        return _ImmediateTransaction(self.conn)
+
+    # --- 任务 ---
+
+    def enqueue(self, posts):
+        """加入一批文章（post_info 字典）；已经存在的URL被忽略，返回新加入的数量。"""
+        with self._transaction():
+            seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM tasks").fetchone()[0]
+            added = 0
+            for post_info in posts:
+                seq += 1
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO tasks (url, seq, payload) VALUES (?, ?, ?)",
+                    (post_info["url"], seq, json.dumps(post_info, ensure_ascii=False)),
+                )
+                added += cursor.rowcount
+        return added
+
+    def lease(self, owner, limit=1, now=None):
+        """
+        领取最多 limit 个可处理的任务：待处理且已到 not_before 的任务，或租约已经过期的任务。
+        领取次数达到 max_attempts 后租约再次过期的任务标记为 failed，不再分配。
+        """
+        now = time.time() if now is None else now
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE tasks SET state = 'failed', last_error = 'lease expired too many times' "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            rows = self.conn.execute(
+                "SELECT url, payload, attempts FROM tasks "
+                "WHERE (state = 'pending' AND not_before <= ?) OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY seq LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE tasks SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE url = ?",
+                [(owner, now + self.visibility_timeout, url) for url, _, _ in rows],
+            )
+        return [Task(url, json.loads(payload), attempts + 1) for url, payload, attempts in rows]
+
+    def renew(self, owner, urls, now=None):
+        """
+        把 owner 持有的这些任务的租约延长到 now + visibility_timeout，返回续租成功（仍由 owner 持有）的URL集合；
+        租约已经过期并被其他进程领取的任务不在其中。
+        """
+        now = time.time() if now is None else now
+        urls = list(urls)
+        if not urls:
+            return set()
+        with self._transaction():
+            self.conn.executemany(
+                "UPDATE tasks SET lease_expires = ? WHERE url = ? AND state = 'leased' AND lease_owner = ?",
+                [(now + self.visibility_timeout, url, owner) for url in urls],
+            )
+            placeholders = ", ".join("?" * len(urls))
+            rows = self.conn.execute(
+                f"SELECT url FROM tasks WHERE url IN ({placeholders}) AND state = 'leased' AND lease_owner = ?",
+                [*urls, owner],
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def complete(self, urls):
+        """标记任务完成（记录已经持久化到分片之后调用）。"""
+        with self._transaction():
+            self.conn.executemany(
+                "UPDATE tasks SET state = 'done', lease_owner = NULL, lease_expires = NULL WHERE url = ?",
+                [(url,) for url in urls],
+            )
+
+    def retry(self, task, delay, error, now=None):
+        """
+        暂时失败的任务在 delay 秒后重新变为可领取；领取次数已经用完时返回 False，
+        调用方按请求失败处理（写出 N/A 记录后 complete）。
+        """
+        if task.attempts >= self.max_attempts:
+            return False
+        now = time.time() if now is None else now
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE tasks SET state = 'pending', not_before = ?, lease_owner = NULL, lease_expires = NULL, "
+                "last_error = ? WHERE url = ?",
+                (now + delay, str(error), task.url),
+            )
+        return True
+
+    def counts(self):
+        """各状态的任务数。"""
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+
+    def post_order(self):
+        """{url: seq}，合并分片时按发现顺序排列记录。"""
+        return dict(self.conn.execute("SELECT url, seq FROM tasks").fetchall())
+
+    # --- 发现进度 ---
+
+    def mark_discovery_done(self):
+        with self._transaction():
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('discovery_done', '1')")
+
+    def discovery_done(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'discovery_done'").fetchone()
+        return row is not None
+
+    def finished(self):
+        """发现已经完成，且没有待处理或租约中的任务。"""
+        if not self.discovery_done():
+            return False
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')"
+        ).fetchone()
+        return row[0] == 0
+
+    # --- 全局礼貌预算 ---
+
+    def reserve_slot(self, host, default_delay, now=None):
+        """
+        为 host 预约下一个请求时间槽，返回需要等待的秒数。
+        时间槽 = max(现在, 上一个预约 + delay, Retry-After 暂停结束)，所有进程共享；
+        还没有进程写入过 delay 时使用 default_delay。
+        """
+        now = time.time() if now is None else now
+        with self._transaction():
+            row = self.conn.execute(
+                "SELECT delay, next_slot, paused_until FROM hosts WHERE host = ?", (host,)
+            ).fetchone()
+            delay, next_slot, paused_until = row if row else (None, 0.0, 0.0)
+            delay = default_delay if delay is None else delay
+            slot = max(now, next_slot, paused_until)
+            self.conn.execute(
+                "INSERT INTO hosts (host, delay, next_slot) VALUES (?, ?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET next_slot = excluded.next_slot",
+                (host, delay, slot + delay),
+            )
+        return slot - now
+
+    def update_host(self, host, delay):
+        """写入 host 当前的请求间隔（来自某个进程的 AIMD 速率控制器，后写入的生效）。"""
+        with self._transaction():
+            self.conn.execute(
+                "INSERT INTO hosts (host, delay) VALUES (?, ?) ON CONFLICT(host) DO UPDATE SET delay = excluded.delay",
+                (host, delay),
+            )
+
+    def pause_host(self, host, seconds, now=None):
+        """服务器要求的 Retry-After 对所有进程生效。"""
+        now = time.time() if now is None else now
+        with self._transaction():
+            self.conn.execute(
+                "INSERT INTO hosts (host, paused_until) VALUES (?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET paused_until = MAX(paused_until, excluded.paused_until)",
+                (host, now + seconds),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT / ROLLBACK。"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
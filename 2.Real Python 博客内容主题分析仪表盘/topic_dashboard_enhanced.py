@@ -1,10 +1,8 @@
 import pandas as pd
 import streamlit as st
-import re
 import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
-import spacy
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.decomposition import LatentDirichletAllocation
 import matplotlib.pyplot as plt
@@ -13,12 +11,25 @@ from wordcloud import WordCloud
 import numpy as np
 from collections import Counter
 import warnings
+import os
+import pathlib
+import sqlite3
+import sys
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 warnings.filterwarnings('ignore')
 
+# 与爬虫、推荐API共用的数据集读取代码（仓库根目录下的 shared_lib）
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from shared_lib import TEXT_COLUMN, load_article_text
+from shared_lib.lite_tokenizer import LiteTokenizer, load_lemma_table
+from shared_lib.text_preprocessing import DASHBOARD_CONFIG, PreprocessCache, SpacyPreprocessor, load_nlp
+
+# 预处理后端：spacy 或 lite（正则分词 + 词元查找表，不加载SpaCy模型；见 shared_lib/lite_tokenizer.py）
+PREPROCESS_BACKEND = os.environ.get("PREPROCESS_BACKEND", "spacy")
+
 # ===============================
 # 页面配置与样式设置
 # ===============================
@@ -114,15 +125,8 @@ st.markdown("""
 
 @st.cache_resource
 def load_nlp_resources():
-    """加载NLP资源并优化停用词"""
+    """加载NLP资源并优化停用词，返回 (预处理器, 停用词, lemmatizer)；lite 后端不使用 lemmatizer，为 None"""
     try:
-        nltk.download('stopwords', quiet=True)
-        nltk.download('wordnet', quiet=True)
-        nltk.download('averaged_perceptron_tagger', quiet=True)
-        
-        nlp = spacy.load("en_core_web_sm")
-        stop_words = set(stopwords.words('english'))
-        
         # 增强的领域特定停用词
         domain_stopwords = {
             'python', 'code', 'example', 'tutorial', 'learn', 'use', 'using', 
@@ -132,20 +136,37 @@ def load_nlp_resources():
             'chapter', 'section', 'page', 'website', 'link', 'click',
             'read', 'write', 'show', 'display', 'create', 'build'
         }
-        stop_words.update(domain_stopwords)
         
-        lemmatizer = WordNetLemmatizer()
-        return nlp, stop_words, lemmatizer
+        if PREPROCESS_BACKEND == "lite":
+            # 停用词表来自查找表（导出时的 NLTK 英文停用词），不下载、不加载 NLTK 语料
+            table = load_lemma_table()
+            stop_words = set(table['stop_words']) | domain_stopwords
+            preprocessor = LiteTokenizer(table, stop_words, DASHBOARD_CONFIG)
+            lemmatizer = None
+        else:
+            nltk.download('stopwords', quiet=True)
+            nltk.download('wordnet', quiet=True)
+            nltk.download('averaged_perceptron_tagger', quiet=True)
+            
+            stop_words = set(stopwords.words('english')) | domain_stopwords
+            preprocessor = SpacyPreprocessor(load_nlp(), stop_words, DASHBOARD_CONFIG) # 不加载 parser 和 ner
+            lemmatizer = WordNetLemmatizer()
+        return preprocessor, stop_words, lemmatizer
     except Exception as e:
         st.error(f"NLP资源加载失败: {e}")
-        st.info("请确保已安装spacy和英文模型: python -m spacy download en_core_web_sm")
+        if PREPROCESS_BACKEND == "lite":
+            st.info("lite 预处理后端需要词元查找表: python -m shared_lib.lite_tokenizer export")
+        else:
+            st.info("请确保已安装spacy和英文模型: python -m spacy download en_core_web_sm")
         st.stop()
 
 @st.cache_data
 def load_data():
     """加载和预处理数据"""
     try:
-        df = pd.read_csv('../shared_data/real_python_courses_analysis.csv')
+        # 只读取用到的列（优先使用 Parquet 数据集，见 shared_lib/dataset.py）；
+        # Content 列为爬虫提取的 Prose（不含代码块和标题），旧数据中没有 Prose 的文章为原来的 Content
+        df = load_article_text(['Title', 'URL', 'Date']).rename(columns={TEXT_COLUMN: 'Content'})
         
         required_columns = ['Title', 'Content', 'Date']
         if not all(col in df.columns for col in required_columns):
@@ -192,34 +213,16 @@ def load_data():
         st.error(f"数据加载失败: {e}")
         st.stop()
 
-@st.cache_data
-def enhanced_preprocess_text(text, _nlp, _stop_words, _lemmatizer):
-    """增强的文本预处理"""
-    # 基础清理
-    text = text.lower()
-    
-    # 移除HTML标签、代码块和特殊字符
-    text = re.sub(r'<[^>]+>', '', text)
-    text = re.sub(r'```[\s\S]*?```', ' CODE_BLOCK ', text)
-    text = re.sub(r'`[^`]+`', ' CODE_INLINE ', text)
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    text = re.sub(r'[^a-z\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # 使用SpaCy进行高级处理
-    doc = _nlp(text)
-    tokens = []
-    
-    for token in doc:
-        if (token.is_alpha and 
-            not token.is_stop and 
-            token.text not in _stop_words and 
-            len(token.text) > 2 and
-            len(token.text) < 20 and
-            token.pos_ in ['NOUN', 'ADJ', 'VERB']):  # 只保留关键词性
-            tokens.append(token.lemma_)
-    
-    return " ".join(tokens)
+@st.cache_data(show_spinner=False)
+def enhanced_preprocess_corpus(contents, _preprocessor, fingerprint, batch_size=64):
+    """增强的文本预处理：成批处理全部文章（contents 和预处理器的 fingerprint 作为缓存键）"""
+    # shared_data/preprocess_cache.db 中已有的文章（与推荐API共用一个文件，按配置区分）不再重新处理
+    try:
+        cache = PreprocessCache()
+    except (sqlite3.Error, OSError):
+        return _preprocessor.process_cached(contents, batch_size=batch_size)
+    with cache:
+        return _preprocessor.process_cached(contents, cache, batch_size=batch_size)
 
 @st.cache_data
 def train_optimized_lda_model(texts, n_topics=7, max_features=1000, min_df=2, max_df=0.95):
@@ -433,7 +436,7 @@ def main():
     
     # 加载资源
     with st.spinner("🔄 正在加载NLP资源和数据..."):
-        nlp, stop_words, lemmatizer = load_nlp_resources()
+        preprocessor, stop_words, lemmatizer = load_nlp_resources()
         df = load_data()
     
     # 安全地显示日期范围 - 根据load_data的修改调整
@@ -492,19 +495,8 @@ def main():
     
     if 'enhanced_cleaned_content' not in df.columns or df['enhanced_cleaned_content'].isnull().all():
         with st.spinner("🔄 正在进行高级文本预处理..."):
-            progress_bar = st.progress(0)
-            cleaned_texts = []
-            
-            for i, content in enumerate(df['Content']):
-                if pd.notna(content):
-                    cleaned_text = enhanced_preprocess_text(content, nlp, stop_words, lemmatizer)
-                    cleaned_texts.append(cleaned_text)
-                else:
-                    cleaned_texts.append("") # 处理空内容
-                progress_bar.progress((i + 1) / len(df))
-            
-            df['enhanced_cleaned_content'] = cleaned_texts
-            progress_bar.empty()
+            contents = tuple(content if pd.notna(content) else "" for content in df['Content']) # 处理空内容
+            df['enhanced_cleaned_content'] = enhanced_preprocess_corpus(contents, preprocessor, preprocessor.fingerprint)
     
     # 过滤处理后的文本
     df_processed = df[df['enhanced_cleaned_content'].str.len() > 20].copy()
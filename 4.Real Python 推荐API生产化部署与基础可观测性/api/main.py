@@ -1,20 +1,41 @@
-import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
-import spacy
-import re
 from fastapi import FastAPI, HTTPException, status, Request
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
+import datetime
+import json
 import logging
+import os
 from contextlib import asynccontextmanager # 用于 FastAPi 生命周期事件
 import pathlib # <-- 新增导入
+import sqlite3
+import sys
 import time
+from typing import Optional
+
+# 与爬虫、仪表盘共用的数据集读取代码：Docker 中挂载在 /app/shared_lib，本地运行时位于仓库根目录
+try:
+    from shared_lib import TEXT_COLUMN, load_article_text, shared_data_path
+    from shared_lib.article_store import ARTICLE_STORE_DB, ArticleStore
+    from shared_lib.lite_tokenizer import LEMMA_TABLE, LiteTokenizer
+    from shared_lib.neighbor_index import ArticleRecommender, build_neighbor_index, recall_at_k
+    from shared_lib.text_preprocessing import (
+        API_CONFIG, PREPROCESS_CACHE_DB, PreprocessCache, QueryEncoder, SpacyPreprocessor, load_nlp
+    )
+except ImportError:
+    sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent.parent))
+    from shared_lib import TEXT_COLUMN, load_article_text, shared_data_path
+    from shared_lib.article_store import ARTICLE_STORE_DB, ArticleStore
+    from shared_lib.lite_tokenizer import LEMMA_TABLE, LiteTokenizer
+    from shared_lib.neighbor_index import ArticleRecommender, build_neighbor_index, recall_at_k
+    from shared_lib.text_preprocessing import (
+        API_CONFIG, PREPROCESS_CACHE_DB, PreprocessCache, QueryEncoder, SpacyPreprocessor, load_nlp
+    )
 
 # Prometheus 监控相关导入
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
@@ -27,12 +48,42 @@ logger = logging.getLogger(__name__)
 # 它们会在应用启动时加载一次
 df = None
 tfidf_matrix = None
-cosine_sim = None
+neighbor_index = None # 每篇文章的 top-K 近邻（见 shared_lib/neighbor_index.py），代替 N×N 的相似度矩阵
+recommender = None # 推荐请求路径：文章ID -> 行号、近邻索引和标题/URL 列表
 vectorizer = None
+query_encoder = None # /recommend/text：查询文本 -> TF-IDF 向量，带 LRU 缓存
 nlp_model = None
 stop_words_set = None # Renamed from stop_words to avoid conflict with nltk.corpus.stopwords
 lemmatizer = None
 
+# 预处理后端：spacy（en_core_web_sm + NLTK 停用词）或 lite（正则分词 + 词元查找表，不加载 spaCy 模型和 NLTK 语料，
+# 查找表由 python -m shared_lib.lite_tokenizer export 生成）
+PREPROCESS_BACKEND = os.environ.get("PREPROCESS_BACKEND", "spacy")
+LEMMA_TABLE_PATH = os.environ.get("LEMMA_TABLE", str(shared_data_path(LEMMA_TABLE)))
+# 启动时的批量预处理：nlp.pipe 每批的文章数和进程数（1 表示在当前进程中处理）
+PREPROCESS_BATCH_SIZE = int(os.environ.get("PREPROCESS_BATCH_SIZE", "64"))
+PREPROCESS_PROCESSES = int(os.environ.get("PREPROCESS_PROCESSES", "1"))
+# 预处理结果的磁盘缓存：未变化的文章重启后不再经过 spaCy。
+# Docker 中 /shared_data 为只读挂载，由 PREPROCESS_CACHE_DB 指向可写的卷；设为空字符串则不使用缓存
+PREPROCESS_CACHE_PATH = os.environ.get("PREPROCESS_CACHE_DB", str(shared_data_path(PREPROCESS_CACHE_DB)))
+# 近邻索引：每篇文章保存的近邻数（单次推荐最多返回这么多篇）和构建时每块的文章数（峰值内存约 块大小×文章数×4 字节）
+NEIGHBOR_TOP_K = int(os.environ.get("NEIGHBOR_TOP_K", "50"))
+NEIGHBOR_BLOCK_SIZE = int(os.environ.get("NEIGHBOR_BLOCK_SIZE", "512"))
+# 构建方式：exact（分块精确计算，O(N²)）或 lsh（随机超平面 LSH 近似构建，适合几十万篇以上的语料）。
+# LSH_TABLES / LSH_WINDOW 越大召回率越高、构建越慢；NEIGHBOR_RECALL_SAMPLE > 0 时启动后抽样这么多篇文章，
+# 与精确结果比较并记录 recall@K（日志和 neighbor_index_recall 指标）
+NEIGHBOR_BACKEND = os.environ.get("NEIGHBOR_BACKEND", "exact")
+LSH_TABLES = int(os.environ.get("LSH_TABLES", "8"))
+LSH_BITS = int(os.environ.get("LSH_BITS", "16"))
+LSH_WINDOW = int(os.environ.get("LSH_WINDOW", "256"))
+NEIGHBOR_RECALL_SAMPLE = int(os.environ.get("NEIGHBOR_RECALL_SAMPLE", "0"))
+# 批量推荐：/recommend/batch 一次最多接受的文章数（更大的批次用 /recommend/batch/stream），流式响应每次处理的文章数
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "1000"))
+BATCH_STREAM_CHUNK = 500
+# /recommend/text：缓存的查询向量数和查询文本的最大长度（字符）
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "1024"))
+MAX_QUERY_LENGTH = int(os.environ.get("MAX_QUERY_LENGTH", "20000"))
+
 # --- Prometheus 监控指标定义 ---
 # 请求计数器
 REQUEST_COUNT = Counter(
@@ -67,6 +118,19 @@ MODEL_LOADED = Gauge(
     'Whether the ML model is loaded (1) or not (0)'
 )
 
+# 近邻索引相对精确结果的 recall@K（只在 NEIGHBOR_RECALL_SAMPLE > 0 时评估）
+NEIGHBOR_RECALL = Gauge(
+    'neighbor_index_recall',
+    'Sampled recall@K of the neighbor index against exact cosine neighbors'
+)
+
+# /recommend/text 查询向量缓存的命中情况
+QUERY_CACHE_LOOKUPS = Counter(
+    'query_vector_cache_total',
+    'Query vector cache lookups for free-text recommendations',
+    ['result']
+)
+
 # --- API 请求和响应模型定义 ---
 class RecommendationRequest(BaseModel):
     article_id: int
@@ -82,91 +146,151 @@ class RecommendationResponse(BaseModel):
     message: str
     recommendations: list[RecommendedArticle]
 
+class BatchRecommendationRequest(BaseModel):
+    article_ids: list[int]
+    top_n: int = 5
+    sim_threshold: float = 0.05
+
+class BatchRecommendationResult(BaseModel):
+    article_id: int
+    found: bool # 文章ID不在数据集中时为 False，recommendations 为空
+    recommendations: list[RecommendedArticle]
+
+class BatchRecommendationResponse(BaseModel):
+    results: list[BatchRecommendationResult]
+
+class TextRecommendationRequest(BaseModel):
+    text: Optional[str] = None # 任意文本（例如正在输入的草稿）
+    url: Optional[str] = None # 或数据集中已有文章的URL，二者只能给一个
+    top_n: int = 5
+    sim_threshold: float = 0.05
+
+class TextRecommendationResponse(BaseModel):
+    message: str
+    source: str # "text" 或 "url"
+    article_id: Optional[int] = None # 按URL查询时匹配到的文章ID
+    recommendations: list[RecommendedArticle]
+
+class SearchHit(BaseModel):
+    article_id: Optional[int] = None # 文章不在当前加载的数据集中时为空
+    title: Optional[str] = None
+    url: str
+    date: Optional[str] = None
+    snippet: str
+
+class SearchResponse(BaseModel):
+    query: str
+    results: list[SearchHit]
+
+class ArticleSummary(BaseModel):
+    article_id: Optional[int] = None # 文章不在当前加载的数据集中时为空
+    title: Optional[str] = None
+    url: str
+    date: Optional[str] = None
+    keywords: list[str] = []
+
+class ArticleListResponse(BaseModel):
+    total: int # 符合条件的文章数（results 最多 limit 篇）
+    results: list[ArticleSummary]
+
 # --- FastAPI 生命周期事件 (用于在应用启动/关闭时加载/卸载资源) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 应用程序启动时运行
     logger.info("应用启动中：加载数据和模型...")
-    global df, tfidf_matrix, cosine_sim, vectorizer, nlp_model, stop_words_set, lemmatizer
+    global df, tfidf_matrix, neighbor_index, recommender, vectorizer, query_encoder, nlp_model, stop_words_set, lemmatizer
 
     try:
         # 1. 加载数据
-        # Construct the path to the CSV file relative to this script (main.py)
-        # main.py is in api/, csv is in the shared_data directory
-        try:
-            # 尝试Docker路径
-            csv_file_path = '/shared_data/real_python_courses_analysis.csv'
-            if not pathlib.Path(csv_file_path).exists():
-                # 如果Docker路径不存在，使用本地相对路径
-                script_dir = pathlib.Path(__file__).parent.resolve()
-                project_root = script_dir.parent.parent
-                csv_file_path = project_root / 'shared_data' / 'real_python_courses_analysis.csv'
-        except:
-            # 备用方案：使用相对路径
-            script_dir = pathlib.Path(__file__).parent.resolve()
-            project_root = script_dir.parent.parent
-            csv_file_path = project_root / 'shared_data' / 'real_python_courses_analysis.csv'
-        
-        logger.info(f"尝试从以下路径加载CSV: {csv_file_path}")
-        df = pd.read_csv(csv_file_path)
-        # Use actual column names from the CSV: Title, URL, Content
-        df = df[['Title', 'URL', 'Content']].dropna(subset=['Content', 'Title'])
-        df.rename(columns={'Title': 'title', 'URL': 'url', 'Content': 'content'}, inplace=True) # Rename for internal consistency
+        # 只读取标题、URL和正文：优先读取 shared_data 中的 Parquet 数据集（按列存储，其余列不会被读取），
+        # 没有数据集时退回CSV（Docker 中为 /shared_data，本地为仓库根目录下的 shared_data）。
+        # 正文优先使用爬虫提取的 Prose（不含代码块和标题），旧数据退回 Content
+        df = load_article_text(['Title', 'URL'])
+        df = df.dropna(subset=[TEXT_COLUMN, 'Title'])
+        df.rename(columns={'Title': 'title', 'URL': 'url', TEXT_COLUMN: 'content'}, inplace=True) # Rename for internal consistency
         df['article_id'] = df.index # 使用DataFrame索引作为文章ID
         logger.info(f"数据加载成功！共 {len(df)} 篇文章。")
 
-        # 2. 初始化 NLP 工具
+        # 2. 初始化预处理后端
+        if PREPROCESS_BACKEND == "lite":
+            try:
+                preprocessor = LiteTokenizer.load(LEMMA_TABLE_PATH, config=API_CONFIG) # 停用词表来自查找表
+            except FileNotFoundError:
+                raise RuntimeError(
+                    f"lite 预处理后端需要词元查找表 {LEMMA_TABLE_PATH}，请先运行 python -m shared_lib.lite_tokenizer export"
+                )
+            stop_words_set = set(preprocessor.stop_words)
+            logger.info(f"使用 lite 预处理后端（{len(preprocessor.lemmas)} 个词的词元查找表）。")
+        elif PREPROCESS_BACKEND == "spacy":
+            # 不加载 parser 和 ner（预处理只用到词元），模型不存在时自动下载
+            nlp_model = load_nlp()
+
+            nltk_data_path_configured = False
+            try:
+                stopwords.words('english') # Check if stopwords are available
+                nltk_data_path_configured = True
+            except LookupError:
+                logger.info("NLTK stopwords not found. Downloading...")
+                nltk.download('stopwords')
+            try:
+                WordNetLemmatizer().lemmatize('test') # Check if wordnet is available
+                nltk_data_path_configured = True
+            except LookupError:
+                logger.info("NLTK WordNet not found. Downloading...")
+                nltk.download('wordnet')
+            try:
+                nltk.pos_tag(['test']) # Check if averaged_perceptron_tagger is available
+                nltk_data_path_configured = True
+            except LookupError:
+                logger.info("NLTK averaged_perceptron_tagger not found. Downloading...")
+                nltk.download('averaged_perceptron_tagger')
+
+            stop_words_set = set(stopwords.words('english'))
+            lemmatizer = WordNetLemmatizer()
+            # nlp.pipe 成批处理，结果与逐篇调用 nlp_model(text) 相同
+            preprocessor = SpacyPreprocessor(nlp_model, stop_words_set, API_CONFIG)
+        else:
+            raise ValueError(f"未知的预处理后端 PREPROCESS_BACKEND={PREPROCESS_BACKEND}（可选 spacy、lite）")
+
+        # 3. 文本预处理（缓存中已有的文章直接读取）
+        preprocess_cache = None
+        if PREPROCESS_CACHE_PATH:
+            try:
+                preprocess_cache = PreprocessCache(PREPROCESS_CACHE_PATH)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"预处理缓存 {PREPROCESS_CACHE_PATH} 不可用，全部文章重新预处理: {e}")
         try:
-            nlp_model = spacy.load("en_core_web_sm")
-        except OSError:
-            logger.info("Spacy model 'en_core_web_sm' not found. Downloading...")
-            spacy.cli.download("en_core_web_sm")
-            nlp_model = spacy.load("en_core_web_sm")
-            
-        nltk_data_path_configured = False
-        try:
-            stopwords.words('english') # Check if stopwords are available
-            nltk_data_path_configured = True
-        except LookupError:
-            logger.info("NLTK stopwords not found. Downloading...")
-            nltk.download('stopwords')
-        try:
-            WordNetLemmatizer().lemmatize('test') # Check if wordnet is available
-            nltk_data_path_configured = True
-        except LookupError:
-            logger.info("NLTK WordNet not found. Downloading...")
-            nltk.download('wordnet')
-        try:
-            nltk.pos_tag(['test']) # Check if averaged_perceptron_tagger is available
-            nltk_data_path_configured = True
-        except LookupError:
-            logger.info("NLTK averaged_perceptron_tagger not found. Downloading...")
-            nltk.download('averaged_perceptron_tagger')
-
-        stop_words_set = set(stopwords.words('english'))
-        lemmatizer = WordNetLemmatizer()
-
-        # 3. 文本预处理
-        def preprocess_text_internal(text):
-            text = str(text).lower()
-            text = re.sub(r'[^a-z\s]', '', text) # Keep spaces for tokenization
-            doc = nlp_model(text)
-            # Use lemmatization and ensure token.is_alpha and not in stop_words_set
-            tokens = [token.lemma_ for token in doc if token.is_alpha and token.text not in stop_words_set and len(token.text) > 2]
-            return " ".join(tokens)
-
-        df['processed_content'] = df['content'].apply(preprocess_text_internal) # Use 'content' column
-        logger.info("文本预处理完成。")
+            df['processed_content'] = preprocessor.process_cached(
+                df['content'], preprocess_cache, batch_size=PREPROCESS_BATCH_SIZE, n_process=PREPROCESS_PROCESSES
+            ) # Use 'content' column
+        finally:
+            if preprocess_cache is not None:
+                preprocess_cache.close()
+        if preprocess_cache is not None:
+            logger.info(f"文本预处理完成：缓存命中 {preprocess_cache.hits} 篇，新处理 {preprocess_cache.misses} 篇。")
+        else:
+            logger.info("文本预处理完成。")
 
         # 4. TF-IDF 向量化
         vectorizer = TfidfVectorizer(stop_words='english', max_features=5000) # 限制特征数量
         tfidf_matrix = vectorizer.fit_transform(df['processed_content'])
         logger.info(f"TF-IDF 向量化完成。词汇量: {tfidf_matrix.shape[1]}")
 
-        # 5. 计算余弦相似度矩阵
-        logger.info("正在计算余弦相似度矩阵，这可能需要一些时间...")
-        cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
-        logger.info("余弦相似度矩阵计算完成。")
+        # 5. 构建近邻索引：每篇文章只保留 top-K（精确分块计算或 LSH 近似）
+        logger.info(f"正在构建近邻索引（{NEIGHBOR_BACKEND}），这可能需要一些时间...")
+        neighbor_index = build_neighbor_index(
+            tfidf_matrix, NEIGHBOR_BACKEND, k=NEIGHBOR_TOP_K, block_size=NEIGHBOR_BLOCK_SIZE,
+            tables=LSH_TABLES, bits=LSH_BITS, window=LSH_WINDOW
+        )
+        logger.info(f"近邻索引构建完成：每篇文章 {neighbor_index.k} 个近邻，占用 {neighbor_index.nbytes / 1e6:.1f} MB。")
+        if NEIGHBOR_RECALL_SAMPLE > 0:
+            recall = recall_at_k(tfidf_matrix, neighbor_index, sample=NEIGHBOR_RECALL_SAMPLE, threshold=0.05)
+            NEIGHBOR_RECALL.set(recall)
+            logger.info(f"近邻索引 recall@{neighbor_index.k}（抽样 {NEIGHBOR_RECALL_SAMPLE} 篇）: {recall:.3f}")
+        # 请求时不再扫描 DataFrame：文章ID -> 行号的数组和预先取出的标题/URL
+        recommender = ArticleRecommender(df['article_id'], df['title'], df['url'], neighbor_index, tfidf_matrix)
+        # 任意文本查询使用同一个预处理后端和 vectorizer
+        query_encoder = QueryEncoder(preprocessor, vectorizer, cache_size=QUERY_CACHE_SIZE)
 
         # 更新 Prometheus 指标
         DATASET_SIZE.set(len(df))
@@ -185,8 +309,10 @@ async def lifespan(app: FastAPI):
     logger.info("应用关闭中：清理资源...")
     df = None
     tfidf_matrix = None
-    cosine_sim = None
+    neighbor_index = None
+    recommender = None
     vectorizer = None
+    query_encoder = None
     nlp_model = None
     stop_words_set = None
     lemmatizer = None
@@ -226,37 +352,17 @@ async def prometheus_middleware(request: Request, call_next):
 
 # --- 推荐函数 ---
 def get_recommendations_logic(article_id: int, top_n: int = 5, sim_threshold: float = 0.05):
-    if df is None or cosine_sim is None:
-        logger.error("数据或相似度矩阵未加载。")
+    if recommender is None:
+        logger.error("数据或近邻索引未加载。")
         return []
 
-    if article_id not in df['article_id'].values:
+    if article_id not in recommender:
         logger.warning(f"推荐逻辑：文章ID {article_id} 未找到。")
         return []
 
-    idx = df[df['article_id'] == article_id].index[0]
-    sim_scores = list(enumerate(cosine_sim[idx]))
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-
-    filtered_scores = [
-        s for s in sim_scores
-        if s[0] != idx and s[1] > sim_threshold
-    ]
-
-    if not filtered_scores:
+    recommendations_data = recommender.recommend(article_id, top_n, sim_threshold)
+    if not recommendations_data:
         logger.info(f"文章ID {article_id} 未找到高于阈值 ({sim_threshold}) 的推荐。")
-        return []
-
-    article_indices = [i[0] for i in filtered_scores[0:top_n]]
-    
-    # Prepare data for RecommendedArticle model (title, url, article_id)
-    recommendations_data = []
-    for i in article_indices:
-        recommendations_data.append({
-            "article_id": df.loc[i, 'article_id'],
-            "title": df.loc[i, 'title'], # Use renamed 'title'
-            "url": df.loc[i, 'url']      # Use renamed 'url'
-        })
     return recommendations_data
 
 # --- API 接口 (Endpoint) ---
@@ -264,7 +370,7 @@ def get_recommendations_logic(article_id: int, top_n: int = 5, sim_threshold: fl
 async def recommend_articles(request: RecommendationRequest):
     logger.info(f"收到推荐请求：文章ID={request.article_id}, 推荐数量={request.top_n}")
 
-    if df is None or cosine_sim is None:
+    if recommender is None:
         logger.error("API 收到请求但核心数据/模型未加载。")
         RECOMMENDATION_REQUESTS.labels(status="error").inc()
         raise HTTPException(
@@ -272,7 +378,7 @@ async def recommend_articles(request: RecommendationRequest):
             detail="推荐服务正在初始化或遇到内部错误，请稍后重试。"
         )
 
-    if request.article_id not in df['article_id'].values:
+    if request.article_id not in recommender:
         logger.warning(f"请求的文章ID {request.article_id} 未找到。")
         RECOMMENDATION_REQUESTS.labels(status="not_found").inc()
         raise HTTPException(
@@ -304,6 +410,211 @@ async def recommend_articles(request: RecommendationRequest):
             detail="处理推荐请求时发生内部服务器错误。"
         )
 
+def batch_results(article_ids, top_n, sim_threshold):
+    """一次 gather 取出一批文章的推荐，逐篇产出 BatchRecommendationResult 的字典形式。"""
+    results = recommender.recommend_many(article_ids, max(top_n, 0), sim_threshold)
+    for article_id, recommendations in zip(article_ids, results):
+        yield {
+            "article_id": article_id,
+            "found": recommendations is not None,
+            "recommendations": [
+                {"article_id": r["article_id"], "title": r["title"], "url": r["url"]} for r in recommendations or []
+            ],
+        }
+
+def require_recommender():
+    if recommender is None:
+        logger.error("API 收到批量请求但核心数据/模型未加载。")
+        RECOMMENDATION_REQUESTS.labels(status="error").inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="推荐服务正在初始化或遇到内部错误，请稍后重试。"
+        )
+
+@app.post("/recommend/batch", response_model=BatchRecommendationResponse, summary="批量获取多篇文章的推荐")
+def recommend_batch(request: BatchRecommendationRequest):
+    """
+    一次返回多篇文章的推荐（每篇最多 NEIGHBOR_TOP_K 篇）。结果与 article_ids 的顺序一致，
+    不存在的文章 found 为 false。超过 MAX_BATCH_SIZE 篇时请使用 /recommend/batch/stream。
+    """
+    require_recommender()
+    if len(request.article_ids) > MAX_BATCH_SIZE:
+        RECOMMENDATION_REQUESTS.labels(status="error").inc()
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"一次最多 {MAX_BATCH_SIZE} 篇文章，更大的批次请使用 /recommend/batch/stream。"
+        )
+    logger.info(f"收到批量推荐请求：{len(request.article_ids)} 篇文章，推荐数量={request.top_n}")
+    RECOMMENDATION_REQUESTS.labels(status="batch").inc()
+    return BatchRecommendationResponse(
+        results=list(batch_results(request.article_ids, request.top_n, request.sim_threshold))
+    )
+
+@app.post("/recommend/batch/stream", summary="批量获取推荐（NDJSON 流式响应）")
+def recommend_batch_stream(request: BatchRecommendationRequest):
+    """
+    与 /recommend/batch 相同，但不限制批次大小：每行一个 JSON 对象（application/x-ndjson），
+    每 BATCH_STREAM_CHUNK 篇文章计算一次并立即发送，服务端不需要在内存中拼出整个响应。
+    """
+    require_recommender()
+    logger.info(f"收到流式批量推荐请求：{len(request.article_ids)} 篇文章，推荐数量={request.top_n}")
+    RECOMMENDATION_REQUESTS.labels(status="batch").inc()
+    article_ids = request.article_ids
+
+    def lines():
+        for start in range(0, len(article_ids), BATCH_STREAM_CHUNK):
+            chunk = article_ids[start:start + BATCH_STREAM_CHUNK]
+            yield "".join(
+                json.dumps(result, ensure_ascii=False) + "\n"
+                for result in batch_results(chunk, request.top_n, request.sim_threshold)
+            )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/recommend/text", response_model=TextRecommendationResponse, summary="根据任意文本或文章URL获取推荐文章")
+def recommend_text(request: TextRecommendationRequest):
+    """
+    text：经过与建库相同的预处理和 vectorizer.transform，与全部文章的 TF-IDF 向量做稀疏点积，不需要重建索引；
+    最近 QUERY_CACHE_SIZE 个查询的向量有缓存，重复查询不再经过预处理。
+    url：数据集中已有的文章，直接使用近邻索引，结果与 /recommend 相同。
+    """
+    if recommender is None or query_encoder is None:
+        logger.error("API 收到文本推荐请求但核心数据/模型未加载。")
+        RECOMMENDATION_REQUESTS.labels(status="error").inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="推荐服务正在初始化或遇到内部错误，请稍后重试。"
+        )
+    if (request.text is None) == (request.url is None):
+        RECOMMENDATION_REQUESTS.labels(status="error").inc()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="请提供 text 或 url 其中之一。"
+        )
+    top_n = max(request.top_n, 0)
+
+    if request.url is not None:
+        article_id = recommender.article_id_for_url(request.url)
+        if article_id is None:
+            logger.warning(f"请求的URL {request.url} 未找到。")
+            RECOMMENDATION_REQUESTS.labels(status="not_found").inc()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"URL {request.url} 未在数据集中找到。"
+            )
+        logger.info(f"收到URL推荐请求：{request.url}（文章ID={article_id}），推荐数量={top_n}")
+        recommendations = recommender.recommend(article_id, top_n, request.sim_threshold)
+        source = "url"
+    else:
+        if len(request.text) > MAX_QUERY_LENGTH:
+            RECOMMENDATION_REQUESTS.labels(status="error").inc()
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"查询文本最多 {MAX_QUERY_LENGTH} 个字符。"
+            )
+        article_id = None
+        try:
+            vector, cached = query_encoder.encode(request.text)
+            QUERY_CACHE_LOOKUPS.labels(result="hit" if cached else "miss").inc()
+            recommendations = recommender.recommend_vector(vector, top_n, request.sim_threshold)
+        except Exception as e:
+            logger.error(f"处理文本推荐请求时发生未知错误: {e}", exc_info=True)
+            RECOMMENDATION_REQUESTS.labels(status="error").inc()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="处理推荐请求时发生内部服务器错误。"
+            )
+        logger.info(f"收到文本推荐请求：{len(request.text)} 个字符，推荐数量={top_n}，缓存{'命中' if cached else '未命中'}")
+        source = "text"
+
+    if not recommendations:
+        RECOMMENDATION_REQUESTS.labels(status="no_recommendations").inc()
+        return TextRecommendationResponse(
+            message="未找到推荐内容，或所有相似文章均低于阈值。",
+            source=source, article_id=article_id, recommendations=[]
+        )
+    RECOMMENDATION_REQUESTS.labels(status="success").inc()
+    return TextRecommendationResponse(
+        message="成功获取推荐", source=source, article_id=article_id, recommendations=recommendations
+    )
+
+def open_article_store():
+    """以只读方式打开文章库（shared_data/articles.db）；不存在时返回 503。"""
+    store_path = shared_data_path(ARTICLE_STORE_DB)
+    if not store_path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="文章库不存在，请先运行爬虫或导入CSV（python -m shared_lib.article_store import）。"
+        )
+    return ArticleStore(store_path, readonly=True)
+
+def dataset_article_ids():
+    """URL -> 当前加载的数据集中的文章ID（推荐接口使用的ID）。"""
+    if df is None:
+        return {}
+    return dict(zip(df['url'], df['article_id']))
+
+@app.get("/search", response_model=SearchResponse, summary="全文检索文章")
+def search_articles(q: str, limit: int = 10):
+    """
+    在文章库（shared_data/articles.db，SQLite FTS5）中全文检索，按 bm25 相关度排序。
+    q 使用 FTS5 查询语法，例如 `asyncio AND "event loop"`。
+    """
+    try:
+        with open_article_store() as store:
+            hits = store.search(q, max(1, min(limit, 100)))
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"无效的检索语句: {e}")
+
+    article_ids = dataset_article_ids()
+    return SearchResponse(query=q, results=[
+        SearchHit(
+            article_id=article_ids.get(hit["URL"]),
+            title=hit["Title"],
+            url=hit["URL"],
+            date=hit["Date"],
+            snippet=hit["snippet"],
+        )
+        for hit in hits
+    ])
+
+@app.get("/articles", response_model=ArticleListResponse, summary="按发布日期范围和关键词列出文章")
+def list_articles(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    keyword: Optional[str] = None,
+    limit: int = 50,
+):
+    """
+    从文章库按索引查询：只给 start / end 时使用日期索引（ArticleStore.by_date），给 keyword 时使用关键词索引
+    （ArticleStore.by_keyword，同样可限定日期范围）。结果按发布日期排序，article_id 可直接用于 /recommend。
+    """
+    columns = ['URL', 'Title', 'Date', 'Keywords']
+    with open_article_store() as store:
+        if keyword is not None:
+            articles = store.by_keyword(keyword, columns, start, end)
+        else:
+            articles = store.by_date(start, end, columns)
+
+    article_ids = dataset_article_ids()
+    return ArticleListResponse(total=len(articles), results=[
+        ArticleSummary(
+            article_id=article_ids.get(row.URL),
+            title=row.Title,
+            url=row.URL,
+            date=str(row.Date) if isinstance(row.Date, datetime.date) else None,
+            keywords=row.Keywords if isinstance(row.Keywords, list) else [],
+        )
+        for row in articles.head(max(1, min(limit, 500))).itertuples(index=False)
+    ])
+
+@app.get("/articles/keywords", summary="文章库中的关键词及文章数")
+def list_keywords(limit: int = 100):
+    """按文章数从多到少返回 {关键词: 文章数}（关键词索引 ArticleStore.keywords）。"""
+    with open_article_store() as store:
+        counts = store.keywords()
+    return dict(list(counts.items())[:max(1, min(limit, 1000))])
+
 @app.get("/", summary="API 根路径")
 async def root():
     return {"message": "欢迎使用 Real Python 文章推荐 API! 访问 /docs 查看 API 文档。"}
@@ -311,7 +622,7 @@ async def root():
 @app.get("/health", summary="健康检查接口")
 async def health_check():
     # 简单的健康检查，可以根据需要扩展，例如检查数据库连接、模型加载状态等
-    if df is not None and cosine_sim is not None:
+    if df is not None and recommender is not None:
         return {"status": "ok", "message": "API 运行正常，数据和模型已加载。"}
     else:
         return {"status": "error", "message": "API 遇到问题，核心数据或模型未加载。"}
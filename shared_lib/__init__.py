@@ -0,0 +1,21 @@
+"""
+四个项目共用的数据访问代码。
+
+爬虫（项目1）写出、仪表盘（项目2）和推荐API（项目4）读取的都是 shared_data 中的同一份数据，
+读写两端的格式定义放在这里，避免各自解析一遍。
+
+文章库（SQLite + FTS5）在 shared_lib.article_store 中，它同时是命令行工具（python -m shared_lib.article_store），
+这里不导入它。
+仪表盘和推荐API共用的文本预处理在 shared_lib.text_preprocessing 和 shared_lib.lite_tokenizer 中（爬虫不需要），同样不在这里导入。
+
+在 Docker 中挂载为 /app/shared_lib（PYTHONPATH=/app）；本地运行时各项目把仓库根目录加入 sys.path。
+"""
+from shared_lib.dataset import (
+    ARTICLES_CSV,
+    ARTICLES_DATASET,
+    TEXT_COLUMN,
+    load_article_text,
+    load_articles,
+    shared_data_path,
+    write_articles_dataset,
+)
@@ -0,0 +1,347 @@
+"""
+嵌入式文章库：SQLite（WAL）+ FTS5 全文索引。
+
+CSV 每次更新都要整体重写；文章库以URL为键逐篇 upsert，新增或修改一篇文章只写一行
+（加上它的关键词行和全文索引行），不影响其他文章：
+- articles：每篇文章一行，列与CSV对应（Date 存为 ISO 日期，列表字段存为 JSON 数组），按日期建索引；
+- article_keywords：(keyword, article_id) 索引，按关键词查询不需要扫描全表；
+- articles_fts：FTS5 全文索引（标题、小标题、正文；没有结构化正文的旧记录使用 Content），
+  由触发器与 articles 同步，search() 按 bm25 排序并返回摘要片段。
+
+爬虫写出CSV的同时把同一批记录写入文章库（见 output_writer.StreamingCSVWriter 的 store 参数），
+已有的CSV可以用 `python -m shared_lib.article_store import <CSV>` 导入。
+WAL 模式下爬虫写入时仪表盘和推荐API可以同时读取。写入方 close() 时切回 DELETE 日志模式，
+静止状态下的文章库是单个文件，只读挂载（推荐API的 /shared_data:ro）中也能以 readonly=True 打开。
+"""
+import argparse
+import json
+import os
+import pathlib
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from shared_lib.dataset import ARTICLES_CSV, cast_int_columns, shared_data_path
+
+ARTICLE_STORE_DB = "articles.db"
+BUSY_TIMEOUT = 30 # 秒
+DATE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%Y-%m-%d")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id              INTEGER PRIMARY KEY,
+    url             TEXT NOT NULL UNIQUE,
+    title           TEXT,
+    date            TEXT,
+    course_duration TEXT,
+    keywords        TEXT,
+    content         TEXT,
+    prose           TEXT,
+    code_blocks     TEXT,
+    headings        TEXT,
+    inline_code     TEXT,
+    prose_tokens    INTEGER,
+    code_tokens     INTEGER,
+    duplicate_of    TEXT,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_date ON articles (date);
+CREATE TABLE IF NOT EXISTS article_keywords (
+    keyword    TEXT NOT NULL,
+    article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+    PRIMARY KEY (keyword, article_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS article_keywords_article ON article_keywords (article_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (title, headings, body);
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, headings, body)
+    VALUES (new.id, new.title, new.headings, COALESCE(new.prose, new.content));
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE ON articles BEGIN
+    UPDATE articles_fts SET title = new.title, headings = new.headings, body = COALESCE(new.prose, new.content)
+    WHERE rowid = new.id;
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    DELETE FROM articles_fts WHERE rowid = old.id;
+END;
+"""
+
+# CSV列名 -> 文章库列名
+COLUMNS = {
+    "Title": "title",
+    "URL": "url",
+    "Date": "date",
+    "Course Duration": "course_duration",
+    "Keywords": "keywords",
+    "Content": "content",
+    "Prose": "prose",
+    "Code Blocks": "code_blocks",
+    "Headings": "headings",
+    "Inline Code": "inline_code",
+    "Prose Tokens": "prose_tokens",
+    "Code Tokens": "code_tokens",
+    "duplicate_of": "duplicate_of",
+}
+CSV_NAMES = {name: column for column, name in COLUMNS.items()}
+JSON_COLUMNS = ("keywords", "code_blocks", "headings", "inline_code")
+
+
+def _value(record, column):
+    value = record.get(column)
+    if value is None or value == "N/A" or value == "" or (isinstance(value, float) and value != value):
+        return None
+    return value
+
+
+def iso_date(value):
+    """列表页上的日期（例如 "May 28, 2025"）或 date 转换为 ISO 日期；无法解析时返回 None。"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()[:10]
+    if not isinstance(value, str):
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _keyword_list(value):
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str):
+        return []
+    return [keyword.strip() for keyword in value.split(",") if keyword.strip()]
+
+
+def _json_text(value):
+    """列表字段：CSV记录中已经是 JSON 文本，Python 列表则编码。"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    return json.dumps(list(value), ensure_ascii=False)
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ArticleStore:
+    """文章库；每个进程各自打开一个实例。记录使用与CSV相同的列名。"""
+
+    def __init__(self, path=None, readonly=False):
+        self.path = str(path or shared_data_path(ARTICLE_STORE_DB))
+        self.readonly = readonly
+        if readonly:
+            # 只读打开不会创建文件，文章库不存在时抛出 sqlite3.OperationalError
+            uri = pathlib.Path(os.path.abspath(self.path)).as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            return
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # --- 写入 ---
+
+    def upsert(self, record):
+        """写入或更新一篇文章，返回文章ID。"""
+        with self.conn:
+            return self._upsert(record, time.time())
+
+    def upsert_many(self, records):
+        """在一个事务中写入一批文章，返回写入的数量。"""
+        now = time.time()
+        count = 0
+        with self.conn:
+            for record in records:
+                self._upsert(record, now)
+                count += 1
+        return count
+
+    def _upsert(self, record, now):
+        keywords = _keyword_list(_value(record, "Keywords"))
+        row = {
+            "url": record["URL"],
+            "title": _value(record, "Title"),
+            "date": iso_date(_value(record, "Date")),
+            "course_duration": _value(record, "Course Duration"),
+            "keywords": json.dumps(keywords, ensure_ascii=False) if keywords else None,
+            "content": _value(record, "Content"),
+            "prose": _value(record, "Prose"),
+            "code_blocks": _json_text(_value(record, "Code Blocks")),
+            "headings": _json_text(_value(record, "Headings")),
+            "inline_code": _json_text(_value(record, "Inline Code")),
+            "prose_tokens": _int(_value(record, "Prose Tokens")),
+            "code_tokens": _int(_value(record, "Code Tokens")),
+            "duplicate_of": _value(record, "duplicate_of"),
+            "updated_at": now,
+        }
+        columns = ", ".join(row)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in row if column != "url")
+        article_id = self.conn.execute(
+            f"INSERT INTO articles ({columns}) VALUES ({', '.join('?' * len(row))}) "
+            f"ON CONFLICT(url) DO UPDATE SET {updates} RETURNING id",
+            list(row.values()),
+        ).fetchone()[0]
+        self.conn.execute("DELETE FROM article_keywords WHERE article_id = ?", (article_id,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO article_keywords (keyword, article_id) VALUES (?, ?)",
+            [(keyword, article_id) for keyword in keywords],
+        )
+        return article_id
+
+    def delete(self, url):
+        with self.conn:
+            return self.conn.execute("DELETE FROM articles WHERE url = ?", (url,)).rowcount > 0
+
+    def import_csv(self, csv_path, chunksize=500):
+        """把已有的文章CSV导入文章库（按URL upsert），返回导入的数量。"""
+        count = 0
+        for chunk in pd.read_csv(csv_path, encoding="utf-8-sig", dtype=str, keep_default_na=False,
+                                 chunksize=chunksize):
+            count += self.upsert_many(chunk.to_dict("records"))
+        return count
+
+    # --- 查询 ---
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def get(self, url):
+        """按URL读取一篇文章（CSV列名的字典），不存在时返回 None。"""
+        row = self.conn.execute("SELECT * FROM articles WHERE url = ?", (url,)).fetchone()
+        return _record(row) if row is not None else None
+
+    def by_date(self, start=None, end=None, columns=None):
+        """发布日期在 [start, end] 之间的文章（日期为 ISO 字符串或 date），按日期排序，返回 DataFrame。"""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(str(start))
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(str(end))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._frame(f"SELECT {_select(columns)} FROM articles {where} ORDER BY date, id", params, columns)
+
+    def by_keyword(self, keyword, columns=None, start=None, end=None):
+        """带有某个关键词（标签）的文章，可再限定发布日期在 [start, end] 之间，按日期排序，返回 DataFrame。"""
+        conditions, params = ["k.keyword = ?"], [keyword]
+        if start is not None:
+            conditions.append("a.date >= ?")
+            params.append(str(start))
+        if end is not None:
+            conditions.append("a.date <= ?")
+            params.append(str(end))
+        return self._frame(
+            f"SELECT {_select(columns, 'a.')} FROM article_keywords k JOIN articles a ON a.id = k.article_id "
+            f"WHERE {' AND '.join(conditions)} ORDER BY a.date, a.id",
+            params,
+            columns,
+        )
+
+    def keywords(self):
+        """{关键词: 文章数}，按文章数从多到少。"""
+        return dict(self.conn.execute(
+            "SELECT keyword, COUNT(*) AS n FROM article_keywords GROUP BY keyword ORDER BY n DESC, keyword"
+        ).fetchall())
+
+    def search(self, query, limit=10):
+        """
+        全文检索（FTS5 查询语法，例如 `asyncio AND "event loop"`），按 bm25 相关度排序。
+        返回 [{"URL", "Title", "Date", "score", "snippet"}]，score 越小越相关。
+        """
+        rows = self.conn.execute(
+            "SELECT a.url, a.title, a.date, bm25(articles_fts, 10.0, 5.0, 1.0) AS score, "
+            "snippet(articles_fts, 2, '[', ']', '…', 12) AS snippet "
+            "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+            "WHERE articles_fts MATCH ? ORDER BY score LIMIT ?",
+            (query, limit),
+        ).fetchall()
+        return [
+            {"URL": row["url"], "Title": row["title"], "Date": row["date"], "score": row["score"],
+             "snippet": row["snippet"]}
+            for row in rows
+        ]
+
+    def to_frame(self, columns=None):
+        """全部文章（按ID，即首次写入的顺序），列名和类型与 dataset.load_articles 相同。"""
+        return self._frame(f"SELECT {_select(columns)} FROM articles ORDER BY id", [], columns)
+
+    def _frame(self, sql, params, columns):
+        rows = self.conn.execute(sql, params).fetchall()
+        names = columns or list(COLUMNS)
+        return cast_int_columns(pd.DataFrame([_record(row) for row in rows], columns=names))
+
+    def close(self):
+        if not self.readonly:
+            try:
+                self.conn.execute("PRAGMA journal_mode = DELETE") # 其他连接仍在使用时保持 WAL
+            except sqlite3.OperationalError:
+                pass
+        self.conn.close()
+
+
+def _select(columns, prefix=""):
+    names = [COLUMNS[column] for column in (columns or COLUMNS)]
+    return ", ".join(prefix + name for name in names)
+
+
+def _record(row):
+    """数据库行 -> CSV列名的字典；Date 为 date，列表字段解码为列表。"""
+    record = {}
+    for name in row.keys():
+        if name not in CSV_NAMES:
+            continue
+        value = row[name]
+        if name in JSON_COLUMNS and value is not None:
+            value = json.loads(value)
+        elif name == "date" and value is not None:
+            value = datetime.strptime(value, "%Y-%m-%d").date()
+        record[CSV_NAMES[name]] = value
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文章库（SQLite + FTS5）：导入CSV或全文检索")
+    parser.add_argument("--db", default=None, help="文章库路径，默认为 shared_data/articles.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="把文章CSV导入文章库")
+    import_parser.add_argument("csv", nargs="?", default=None, help=f"默认为 shared_data/{ARTICLES_CSV}")
+    search_parser = commands.add_parser("search", help="全文检索")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with ArticleStore(args.db) as store:
+        if args.command == "import":
+            count = store.import_csv(args.csv or shared_data_path(ARTICLES_CSV))
+            print(f"Imported {count} articles; the store now holds {store.count()}.")
+        else:
+            for hit in store.search(args.query, args.limit):
+                print(f"{hit['score']:8.2f}  {hit['Title']}  {hit['URL']}\n          {hit['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
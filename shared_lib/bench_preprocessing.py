@@ -0,0 +1,119 @@
+"""
+文本预处理的微基准测试。
+
+对 shared_data 中的文章正文（Prose，旧数据为 Content）分别用以下方式预处理，报告每秒文章数，
+并检查结果是否与参照方式（原来的逐篇调用、完整流水线）一致：
+- per-doc：完整的 en_core_web_sm，逐篇调用 nlp(text)（原有实现）；
+- per-doc-excl：排除 parser 和 ner 后逐篇调用；
+- pipe：排除 parser 和 ner，nlp.pipe 成批处理；
+- pipe xN：同上，n_process=N（--processes 中的每个值一行）；
+- lite：正则分词 + 词元查找表（见 lite_tokenizer.py；查找表不存在时跳过）。
+
+lite 的结果与 spaCy 不要求逐字相同，另外比较两者对推荐结果的影响：用与推荐API相同的 TF-IDF 设置分别向量化，
+报告每篇文章的 top-k 余弦近邻与参照方式的平均重合比例（1.0 表示推荐结果完全相同）。
+
+用法：
+    python -m shared_lib.bench_preprocessing --limit 200
+    python -m shared_lib.bench_preprocessing --config dashboard --batch-size 128 --processes 2 4
+    python -m shared_lib.bench_preprocessing --lemma-table /tmp/lemma_table.json.gz --top-k 10
+"""
+import argparse
+import time
+
+import numpy as np
+import spacy
+from nltk.corpus import stopwords
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from shared_lib.dataset import TEXT_COLUMN, load_article_text
+from shared_lib.lite_tokenizer import LiteTokenizer
+from shared_lib.neighbor_index import NeighborIndex
+from shared_lib.text_preprocessing import (
+    API_CONFIG,
+    DASHBOARD_CONFIG,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MODEL,
+    SpacyPreprocessor,
+    load_nlp,
+)
+
+CONFIGS = {"api": API_CONFIG, "dashboard": DASHBOARD_CONFIG}
+
+
+def run(name, process, texts):
+    start = time.perf_counter()
+    results = process(texts)
+    elapsed = time.perf_counter() - start
+    return name, elapsed, results
+
+
+def top_k_neighbors(processed, k):
+    """与推荐API相同的 TF-IDF 设置，返回每篇文章的 k 个最近邻（不含自身）的下标。"""
+    tfidf_matrix = TfidfVectorizer(stop_words="english", max_features=5000).fit_transform(processed)
+    return NeighborIndex.build(tfidf_matrix, k=k).indices
+
+
+def neighbor_overlap(processed, baseline, k):
+    """两种预处理结果的 top-k 近邻的平均重合比例。"""
+    k = min(k, len(processed) - 1)
+    if k < 1:
+        return float("nan")
+    neighbors, baseline_neighbors = top_k_neighbors(processed, k), top_k_neighbors(baseline, k)
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(neighbors, baseline_neighbors)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较各预处理方式的速度和结果")
+    parser.add_argument("--config", choices=list(CONFIGS), default="api", help="预处理配置")
+    parser.add_argument("--limit", type=int, default=None, help="只处理前 N 篇文章")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="nlp.pipe 每批的文章数")
+    parser.add_argument("--processes", type=int, nargs="*", default=[2], help="额外测试的 n_process 取值")
+    parser.add_argument("--dataset-dir", help="Parquet 数据集目录（默认 shared_data 中的数据集或CSV）")
+    parser.add_argument("--lemma-table", help="lite 后端的词元查找表（默认 shared_data/lemma_table.json.gz）")
+    parser.add_argument("--top-k", type=int, default=10, help="近邻重合度比较的近邻数")
+    args = parser.parse_args()
+
+    df = load_article_text(dataset_dir=args.dataset_dir).dropna()
+    texts = df[TEXT_COLUMN].tolist()[:args.limit]
+    if not texts:
+        print("No articles found.")
+        return
+    total_mb = sum(len(text) for text in texts) / 1e6
+    print(f"{len(texts)} articles, {total_mb:.2f} MB, config={args.config}, batch_size={args.batch_size}\n")
+
+    config = CONFIGS[args.config]
+    stop_words = set(stopwords.words("english"))
+    full = SpacyPreprocessor(spacy.load(DEFAULT_MODEL), stop_words, config)
+    batched = SpacyPreprocessor(load_nlp(), stop_words, config)
+
+    runs = [
+        ("per-doc", lambda texts: [full.process_one(text) for text in texts]),
+        ("per-doc-excl", lambda texts: [batched.process_one(text) for text in texts]),
+        ("pipe", lambda texts: list(batched.process(texts, batch_size=args.batch_size))),
+    ]
+    for n_process in args.processes:
+        runs.append((f"pipe x{n_process}",
+                     lambda texts, n=n_process: list(batched.process(texts, batch_size=args.batch_size, n_process=n))))
+    try:
+        # 停用词表与 spaCy 后端相同，只比较分词和词元的差异
+        lite_tokenizer = LiteTokenizer.load(args.lemma_table, stop_words, config)
+        runs.append(("lite", lambda texts: list(lite_tokenizer.process(texts))))
+    except FileNotFoundError:
+        print("Lemma table not found, skipping lite (python -m shared_lib.lite_tokenizer export)\n")
+
+    baseline_results = None
+    baseline_time = None
+    print(f"{'method':<14}{'seconds':>10}{'docs/s':>10}{'speedup':>10}{'mismatches':>12}"
+          f"{f'top-{args.top_k} overlap':>18}")
+    for name, process in runs:
+        name, elapsed, results = run(name, process, texts)
+        if baseline_results is None:
+            baseline_results, baseline_time = results, elapsed
+        mismatches = sum(a != b for a, b in zip(results, baseline_results))
+        overlap = neighbor_overlap(results, baseline_results, args.top_k) if mismatches else 1.0
+        print(f"{name:<14}{elapsed:>10.2f}{len(texts) / elapsed:>10.1f}"
+              f"{baseline_time / elapsed:>9.1f}x{mismatches:>12}{overlap:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
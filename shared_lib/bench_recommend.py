@@ -0,0 +1,132 @@
+"""
+推荐请求路径和近邻索引构建的微基准测试。
+
+对每个语料规模生成合成的 TF-IDF 矩阵（每篇文章属于一个主题，词频按主题各自的 Zipf 分布，
+稀疏程度和聚类结构与真实文章相近），分别计时：
+- dense：原来的请求路径——在 article_id 列中查找两遍、对整行相似度 list(enumerate(row)) 排序、逐篇 df.loc；
+  整行相似度预先算好，只计请求本身的耗时（不需要常驻 N×N 矩阵）；
+- index：ArticleRecommender.recommend()，文章ID数组查找 + 近邻索引切片 + 预先取出的标题/URL。
+同时报告构建近邻索引的耗时和内存。
+
+--lsh 时改为评估近似构建（NeighborIndex.build_lsh）：对每个规模和每组 tables × window 报告构建耗时、
+相对精确构建的加速比和 recall@K（recall_at_k 抽样比较）。
+
+用法：
+    python -m shared_lib.bench_recommend
+    python -m shared_lib.bench_recommend --sizes 1000 10000 50000 --requests 2000 --top-k 50
+    python -m shared_lib.bench_recommend --lsh --sizes 20000 --tables 4 8 16 --windows 128 256
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from shared_lib.neighbor_index import (
+    DEFAULT_LSH_BITS,
+    DEFAULT_LSH_TABLES,
+    DEFAULT_LSH_WINDOW,
+    DEFAULT_TOP_K,
+    ArticleRecommender,
+    NeighborIndex,
+    recall_at_k,
+)
+
+TOP_N = 5
+THRESHOLD = 0.05
+
+
+def synthetic_tfidf(n, vocabulary=5000, words_per_doc=300, topics=100, seed=0):
+    """n 篇合成文章的 TF-IDF 矩阵（L2 归一化的 CSR）；vocabulary 与推荐API的 max_features 相同。"""
+    rng = np.random.default_rng(seed)
+    topic_words = np.stack([rng.permutation(vocabulary) for _ in range(topics)])
+    doc_topics = np.repeat(rng.integers(0, topics, size=n), words_per_doc)
+    ranks = np.minimum(rng.zipf(1.3, size=n * words_per_doc) - 1, vocabulary - 1)
+    rows = np.repeat(np.arange(n), words_per_doc)
+    counts = sparse.csr_matrix((np.ones(len(rows)), (rows, topic_words[doc_topics, ranks])), shape=(n, vocabulary))
+    counts.sum_duplicates()
+    return TfidfTransformer().fit_transform(counts)
+
+
+def dense_recommend(df, similarities, article_id):
+    """原来的 get_recommendations_logic（similarities 为该文章的整行相似度）。"""
+    if article_id not in df['article_id'].values:
+        return []
+    idx = df[df['article_id'] == article_id].index[0]
+    sim_scores = sorted(enumerate(similarities), key=lambda x: x[1], reverse=True)
+    filtered_scores = [s for s in sim_scores if s[0] != idx and s[1] > THRESHOLD]
+    return [
+        {"article_id": df.loc[i, 'article_id'], "title": df.loc[i, 'title'], "url": df.loc[i, 'url']}
+        for i, _ in filtered_scores[:TOP_N]
+    ]
+
+
+def evaluate_lsh(args):
+    print(f"{'articles':>10}{'tables':>8}{'window':>8}{'build s':>10}{'speedup':>10}{f'recall@{args.top_k}':>12}")
+    for n in args.sizes:
+        matrix = synthetic_tfidf(n)
+        start = time.perf_counter()
+        NeighborIndex.build(matrix, k=args.top_k)
+        exact_time = time.perf_counter() - start
+        print(f"{n:>10}{'exact':>16}{exact_time:>10.2f}{1:>9.1f}x{1:>12.3f}")
+        for tables in args.tables:
+            for window in args.windows:
+                start = time.perf_counter()
+                index = NeighborIndex.build_lsh(matrix, k=args.top_k, tables=tables, bits=args.bits, window=window)
+                build_time = time.perf_counter() - start
+                recall = recall_at_k(matrix, index, sample=args.recall_sample, threshold=THRESHOLD)
+                print(f"{n:>10}{tables:>8}{window:>8}{build_time:>10.2f}{exact_time / build_time:>9.1f}x{recall:>12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较推荐请求路径的单次耗时和近邻索引的构建方式")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 4000, 16000], help="语料规模（文章数）")
+    parser.add_argument("--requests", type=int, default=1000, help="每个规模计时的请求数")
+    parser.add_argument("--dense-requests", type=int, default=50, help="dense 路径计时的请求数（它慢得多）")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="近邻索引每篇文章保存的近邻数")
+    parser.add_argument("--lsh", action="store_true", help="评估 LSH 近似构建的耗时和 recall@K")
+    parser.add_argument("--tables", type=int, nargs="*", default=[DEFAULT_LSH_TABLES], help="LSH 表数")
+    parser.add_argument("--windows", type=int, nargs="*", default=[DEFAULT_LSH_WINDOW], help="LSH 组大小")
+    parser.add_argument("--bits", type=int, default=DEFAULT_LSH_BITS, help="LSH 每张表的超平面数")
+    parser.add_argument("--recall-sample", type=int, default=1000, help="计算 recall@K 时抽样的文章数")
+    args = parser.parse_args()
+    if args.lsh:
+        evaluate_lsh(args)
+        return
+
+    print(f"{'articles':>10}{'build s':>10}{'index MB':>10}{'dense us/req':>14}{'index us/req':>14}{'speedup':>10}")
+    rng = np.random.default_rng(1)
+    for n in args.sizes:
+        matrix = synthetic_tfidf(n)
+        df = pd.DataFrame({
+            "article_id": np.arange(n),
+            "title": [f"Article {i}" for i in range(n)],
+            "url": [f"https://realpython.com/article-{i}/" for i in range(n)],
+        })
+
+        start = time.perf_counter()
+        index = NeighborIndex.build(matrix, k=args.top_k)
+        build_time = time.perf_counter() - start
+        recommender = ArticleRecommender(df["article_id"], df["title"], df["url"], index)
+
+        dense_ids = rng.integers(0, n, size=args.dense_requests)
+        rows = {article_id: (matrix[article_id] @ matrix.T).toarray().ravel() for article_id in set(dense_ids.tolist())}
+        start = time.perf_counter()
+        for article_id in dense_ids.tolist():
+            dense_recommend(df, rows[article_id], article_id)
+        dense_time = (time.perf_counter() - start) / len(dense_ids)
+
+        ids = rng.integers(0, n, size=args.requests).tolist()
+        start = time.perf_counter()
+        for article_id in ids:
+            recommender.recommend(article_id, TOP_N, THRESHOLD)
+        index_time = (time.perf_counter() - start) / len(ids)
+
+        print(f"{n:>10}{build_time:>10.2f}{index.nbytes / 1e6:>10.2f}{dense_time * 1e6:>14.1f}"
+              f"{index_time * 1e6:>14.1f}{dense_time / index_time:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
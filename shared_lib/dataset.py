@@ -0,0 +1,209 @@
+"""
+文章数据的列式存储（Parquet）和按需读取。
+
+real_python_courses_analysis.csv 每行都带着几十KB的 Content / Prose / Code Blocks，
+只需要标题和URL的读取方也得把整个文件解析一遍，冷启动时间随语料总文本量增长。
+爬虫在写出CSV之后用 write_articles_dataset() 生成同名的 Parquet 数据集：
+- 按发布年份分区（hive 风格的 year=2024/ 目录，日期缺失的文章在 year=__HIVE_DEFAULT_PARTITION__/），
+  每个分区内按日期排序，每 ROW_GROUP_SIZE 篇一个行组，行组统计信息可以按日期跳过；
+- 列有类型：Date 为日期，Keywords / Code Blocks / Headings / Inline Code 为字符串列表，
+  单词数为整数，"N/A" 写为空值；zstd 压缩；
+- 额外的 _row 列记录文章在CSV中的位置，load_articles 按它恢复CSV的顺序，
+  这样推荐API以行号作为文章ID时，两种来源得到相同的ID；
+- 先写入临时目录再整体替换，读取方不会看到写了一半的数据集。
+
+load_articles(columns, years, filter) 只读取请求的列（Parquet 按列存储，未请求的正文列不会被读取或解压），
+按年份裁剪分区、按 filter 裁剪行组。数据集不存在或没有安装 pyarrow 时退回读取CSV（只保留请求的列），
+返回的列类型与 Parquet 一致，调用方不需要区分两种来源。
+
+load_article_text() 在此基础上返回下游分析用的正文（TEXT_COLUMN 列）：有 Prose 时使用 Prose（爬取时已经去掉代码块、
+标题和行内代码，见爬虫的 structured_content.py），旧数据中没有 Prose 的文章退回 Content。
+"""
+import json
+import os
+import pathlib
+import shutil
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError: # pyarrow 是可选依赖，没有时 load_articles 读取CSV
+    pa = None
+    ds = None
+
+ARTICLES_CSV = "real_python_courses_analysis.csv"
+ARTICLES_DATASET = "real_python_courses_analysis.parquet"
+DOCKER_SHARED_DATA = "/shared_data"
+ROW_GROUP_SIZE = 256 # 每个行组的文章数
+PARTITION_COLUMN = "year"
+ORDER_COLUMN = "_row"
+
+LIST_COLUMNS = ["Keywords", "Code Blocks", "Headings", "Inline Code"]
+INT_COLUMNS = ["Prose Tokens", "Code Tokens"]
+TEXT_COLUMN = "Text"
+
+if pa is not None:
+    SCHEMA = pa.schema([
+        ("Title", pa.string()),
+        ("URL", pa.string()),
+        ("Date", pa.date32()),
+        ("Course Duration", pa.string()),
+        ("Keywords", pa.list_(pa.string())),
+        ("Content", pa.string()),
+        ("Prose", pa.string()),
+        ("Code Blocks", pa.list_(pa.string())),
+        ("Headings", pa.list_(pa.string())),
+        ("Inline Code", pa.list_(pa.string())),
+        ("Prose Tokens", pa.int32()),
+        ("Code Tokens", pa.int32()),
+        ("duplicate_of", pa.string()),
+        (ORDER_COLUMN, pa.int32()),
+        (PARTITION_COLUMN, pa.int16()),
+    ])
+
+
+def shared_data_path(name=""):
+    """
+    shared_data 中的路径：Docker 中挂载在 /shared_data，本地运行时为仓库根目录下的 shared_data。
+    """
+    if os.path.isdir(DOCKER_SHARED_DATA):
+        return pathlib.Path(DOCKER_SHARED_DATA) / name
+    return pathlib.Path(__file__).resolve().parent.parent / "shared_data" / name
+
+
+def _split_keywords(value):
+    if not isinstance(value, str) or value == "N/A":
+        return None
+    return [keyword.strip() for keyword in value.split(",") if keyword.strip()]
+
+
+def _json_list(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        items = json.loads(value)
+    except ValueError:
+        return None
+    return items if isinstance(items, list) else None
+
+
+def typed_articles(df):
+    """把从CSV读入的文章（全部为字符串）转换为数据集的列类型；只处理 df 中存在的列。"""
+    df = df.copy()
+    if "Date" in df:
+        df["Date"] = pd.to_datetime(df["Date"], format="mixed", errors="coerce").dt.date
+    if "Keywords" in df:
+        df["Keywords"] = df["Keywords"].map(_split_keywords)
+    for column in LIST_COLUMNS[1:]:
+        if column in df:
+            df[column] = df[column].map(_json_list)
+    return cast_int_columns(df)
+
+
+def cast_int_columns(df):
+    """单词数列转换为可空整数 Int32（Parquet 中含空值的整数列读入 pandas 时为 float64）；原地修改并返回 df。"""
+    for column in INT_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("Int32")
+    return df
+
+
+def write_articles_dataset(csv_path, dataset_dir):
+    """把文章CSV转换为按年份分区的 Parquet 数据集（整体替换 dataset_dir），返回文章数。"""
+    if pa is None:
+        raise ImportError("Writing the Parquet dataset requires pyarrow: pip install pyarrow")
+    df = typed_articles(pd.read_csv(csv_path, encoding="utf-8-sig", dtype=str, keep_default_na=False,
+                                    na_values=["N/A", ""]))
+    for field in SCHEMA:
+        if field.name not in df and field.name not in (ORDER_COLUMN, PARTITION_COLUMN):
+            df[field.name] = None # 旧版本CSV缺少的列
+    df[ORDER_COLUMN] = range(len(df))
+    dates = pd.to_datetime(df["Date"])
+    df[PARTITION_COLUMN] = dates.dt.year.astype("Int16")
+    df = df.assign(_sort_date=dates).sort_values("_sort_date", kind="stable").drop(columns="_sort_date")
+    table = pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+
+    dataset_dir = str(dataset_dir)
+    tmp_dir = dataset_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    ds.write_dataset(
+        table,
+        tmp_dir,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.int16())]), flavor="hive"),
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        min_rows_per_group=ROW_GROUP_SIZE,
+        max_rows_per_group=ROW_GROUP_SIZE,
+        basename_template="part-{i}.parquet",
+    )
+    old_dir = dataset_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(dataset_dir):
+        os.replace(dataset_dir, old_dir)
+    os.replace(tmp_dir, dataset_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return table.num_rows
+
+
+def _dataset_dir(dataset_dir=None):
+    """load_articles 读取的 Parquet 数据集目录；数据集不存在或没有安装 pyarrow 时为 None（读取CSV）。"""
+    dataset_dir = pathlib.Path(dataset_dir) if dataset_dir else shared_data_path(ARTICLES_DATASET)
+    return dataset_dir if ds is not None and dataset_dir.is_dir() else None
+
+
+def article_columns(dataset_dir=None, csv_path=None):
+    """load_articles 能读取的列名（Parquet 数据集的全部列，或CSV表头中的列）。"""
+    if _dataset_dir(dataset_dir) is not None:
+        return [name for name in SCHEMA.names if name not in (ORDER_COLUMN, PARTITION_COLUMN)]
+    csv_path = pathlib.Path(csv_path) if csv_path else shared_data_path(ARTICLES_CSV)
+    return list(pd.read_csv(csv_path, encoding="utf-8-sig", nrows=0).columns)
+
+
+def load_articles(columns=None, years=None, filter=None, dataset_dir=None, csv_path=None):
+    """
+    读取文章，返回 DataFrame。
+
+    columns：需要的列（默认全部）；years：只读取这些发布年份的分区；
+    filter：额外的 pyarrow.dataset 表达式，例如 ds.field("Prose Tokens") > 200，只在读取 Parquet 时使用。
+    dataset_dir / csv_path 默认为 shared_data 中的数据集和CSV。
+    """
+    dataset_dir = _dataset_dir(dataset_dir)
+    if dataset_dir is not None:
+        dataset = ds.dataset(dataset_dir, format="parquet", partitioning="hive", schema=SCHEMA)
+        expression = filter
+        if years is not None:
+            year_filter = ds.field(PARTITION_COLUMN).isin(list(years))
+            expression = year_filter if expression is None else expression & year_filter
+        read_columns = None if columns is None else [*columns, ORDER_COLUMN]
+        df = dataset.to_table(columns=read_columns, filter=expression).to_pandas()
+        df = df.sort_values(ORDER_COLUMN, kind="stable").drop(columns=ORDER_COLUMN).reset_index(drop=True)
+        cast_int_columns(df)
+        return df if columns is not None else df.drop(columns=PARTITION_COLUMN)
+
+    csv_path = pathlib.Path(csv_path) if csv_path else shared_data_path(ARTICLES_CSV)
+    usecols = columns
+    if years is not None and columns is not None and "Date" not in columns:
+        usecols = [*columns, "Date"]
+    df = typed_articles(pd.read_csv(csv_path, encoding="utf-8-sig", usecols=usecols))
+    if years is not None:
+        df = df[pd.to_datetime(df["Date"]).dt.year.isin(list(years))]
+    return df[columns] if columns is not None else df
+
+
+def load_article_text(columns=(), years=None, filter=None, dataset_dir=None, csv_path=None):
+    """
+    读取 columns 和文章正文，正文在 TEXT_COLUMN 列：Prose 非空时使用 Prose，否则使用 Content。
+    其余参数与 load_articles 相同；columns 中没有请求的 Prose / Content 不会出现在结果中。
+    """
+    available = article_columns(dataset_dir, csv_path)
+    text_columns = [column for column in ("Prose", "Content") if column in available]
+    read_columns = list(dict.fromkeys([*columns, *text_columns]))
+    df = load_articles(read_columns, years=years, filter=filter, dataset_dir=dataset_dir, csv_path=csv_path)
+    text = df["Content"] if "Content" in df else pd.Series(None, index=df.index, dtype=object)
+    if "Prose" in df:
+        prose = df["Prose"]
+        text = prose.where(prose.notna() & (prose.astype(str).str.strip() != ""), text)
+    df[TEXT_COLUMN] = text
+    return df.drop(columns=[column for column in text_columns if column not in columns])
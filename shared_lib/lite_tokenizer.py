@@ -0,0 +1,167 @@
+"""
+lite 预处理后端：正则分词 + 词元查找表 + 停用词表，不加载 spaCy 模型和 NLTK 语料。
+
+推荐API的 TF-IDF 只用到词元（仪表盘另外按词性过滤），en_core_web_sm 和三个 NLTK 语料库却占了容器的大部分内存
+和启动时间。lite 后端把需要的信息预先导出为一个查找表（shared_data/lemma_table.json.gz）：
+- lemmas：语料中出现过的每个词 -> 该词最常见的 [词元, 词性]，由 spaCy 在全部文章上统计；
+- stop_words：NLTK 英文停用词（API_CONFIG 的默认停用词表）；spacy_stop_words：spaCy 停用词（DASHBOARD_CONFIG 使用）。
+运行时只做：配置中的 cleaner 清理 -> [a-z]+ 正则分词 -> 查表，每个词的处理结果按词缓存。
+查找表中没有的词（导出之后才出现的词）词元取词本身，词性视为 NOUN（spaCy 对未登录词最常见的标注）。
+
+与 spaCy 后端的差异：词元和词性不再依赖上下文；spaCy 分词器会拆开的缩写（例如 "dont"）不再拆开。
+两种后端的速度和 TF-IDF 近邻重合度见 bench_preprocessing.py。
+
+导出查找表（需要 spaCy 和 NLTK；语料变化较大时重新导出）：
+    python -m shared_lib.lite_tokenizer export
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import re
+from collections import Counter, defaultdict
+
+from shared_lib.dataset import TEXT_COLUMN, load_article_text, shared_data_path
+from shared_lib.text_preprocessing import (
+    API_CONFIG,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MODEL,
+    Preprocessor,
+    clean_letters,
+    clean_markup,
+    load_nlp,
+)
+
+LEMMA_TABLE = "lemma_table.json.gz"
+LEMMA_TABLE_VERSION = 1
+UNKNOWN_POS = "NOUN"
+
+TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def load_lemma_table(path=None):
+    """读取查找表；文件不存在时抛出 FileNotFoundError。"""
+    path = pathlib.Path(path) if path else shared_data_path(LEMMA_TABLE)
+    with open(path, "rb") as f:
+        raw = f.read()
+    table = json.loads(gzip.decompress(raw).decode("utf-8"))
+    if table.get("version") != LEMMA_TABLE_VERSION:
+        raise ValueError(f"{path}: unsupported lemma table version {table.get('version')}, re-run the export")
+    table["sha1"] = hashlib.sha1(raw).hexdigest()
+    return table
+
+
+class LiteTokenizer(Preprocessor):
+    """lite 后端；stop_words 为 None 时使用查找表中的 NLTK 停用词。"""
+
+    def __init__(self, table, stop_words=None, config=API_CONFIG):
+        self.lemmas = table["lemmas"]
+        self.spacy_stop_words = frozenset(table["spacy_stop_words"])
+        self.table_hash = table["sha1"]
+        # 词 -> 保留时的词元，不保留时为 None；只缓存查找表和停用词表中的词，
+        # 推荐API的文本查询可能带来任意多的未登录词，缓存大小不能随之增长
+        self._words = {}
+        super().__init__(table["stop_words"] if stop_words is None else stop_words, config)
+
+    @classmethod
+    def load(cls, path=None, stop_words=None, config=API_CONFIG):
+        return cls(load_lemma_table(path), stop_words, config)
+
+    def _backend_fingerprint(self):
+        return {"lite": self.table_hash}
+
+    def _lemma(self, word):
+        lemma = self._words.get(word, False)
+        if lemma is not False:
+            return lemma
+        lemma, pos = self.lemmas.get(word, (word, UNKNOWN_POS))
+        config = self.config
+        keep = (
+            self._keep_word(word)
+            and not (config.drop_spacy_stop_words and word in self.spacy_stop_words)
+            and (config.keep_pos is None or pos in config.keep_pos)
+        )
+        lemma = lemma if keep else None
+        if word in self.lemmas or word in self.stop_words:
+            self._words[word] = lemma
+        return lemma
+
+    def process(self, texts, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        """按输入顺序逐篇产出处理结果；batch_size / n_process 只是为了与 SpacyPreprocessor 的接口一致。"""
+        cleaner = self.config.cleaner
+        for text in texts:
+            if not isinstance(text, str):
+                yield ""
+                continue
+            lemmas = (self._lemma(word) for word in TOKEN_RE.findall(cleaner(text)))
+            yield " ".join(lemma for lemma in lemmas if lemma is not None)
+
+
+def _nltk_stop_words():
+    import nltk
+    from nltk.corpus import stopwords
+    try:
+        return set(stopwords.words("english"))
+    except LookupError:
+        nltk.download("stopwords", quiet=True)
+        return set(stopwords.words("english"))
+
+
+def export_lemma_table(texts, output=None, model=DEFAULT_MODEL, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+    """
+    用 spaCy 处理 texts（两种配置的清理结果各一遍），为每个词记录最常见的 (词元, 词性)，
+    连同两份停用词表写入 output（先写临时文件再替换），返回词数。
+    """
+    from spacy import __version__ as spacy_version
+    from spacy.lang.en.stop_words import STOP_WORDS
+
+    nlp = load_nlp(model)
+    counts = defaultdict(Counter)
+    cleaned = (cleaner(text) for text in texts if isinstance(text, str) for cleaner in (clean_letters, clean_markup))
+    for doc in nlp.pipe(cleaned, batch_size=batch_size, n_process=n_process):
+        for token in doc:
+            if token.is_alpha:
+                counts[token.text][(token.lemma_, token.pos_)] += 1
+
+    meta = nlp.meta
+    table = {
+        "version": LEMMA_TABLE_VERSION,
+        "spacy": spacy_version,
+        "model": f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}",
+        "lemmas": {word: list(counter.most_common(1)[0][0]) for word, counter in sorted(counts.items())},
+        "stop_words": sorted(_nltk_stop_words()),
+        "spacy_stop_words": sorted(STOP_WORDS),
+    }
+    output = str(output or shared_data_path(LEMMA_TABLE))
+    output_dir = os.path.dirname(output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(gzip.compress(json.dumps(table, ensure_ascii=False, separators=(",", ":")).encode("utf-8")))
+    os.replace(tmp_path, output)
+    return len(table["lemmas"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="lite 预处理后端的词元查找表")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="用 spaCy 处理全部文章，导出词元查找表")
+    export.add_argument("--output", help=f"输出文件（默认 shared_data/{LEMMA_TABLE}）")
+    export.add_argument("--dataset-dir", help="Parquet 数据集目录（默认 shared_data 中的数据集或CSV）")
+    export.add_argument("--csv", help="数据集不存在时读取的文章CSV")
+    export.add_argument("--model", default=DEFAULT_MODEL, help="spaCy 模型")
+    export.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="nlp.pipe 每批的文章数")
+    export.add_argument("--processes", type=int, default=1, help="nlp.pipe 的进程数")
+    args = parser.parse_args()
+
+    texts = load_article_text(dataset_dir=args.dataset_dir, csv_path=args.csv)[TEXT_COLUMN].tolist()
+    words = export_lemma_table(texts, args.output, model=args.model, batch_size=args.batch_size,
+                               n_process=args.processes)
+    print(f"Exported {words} words from {len(texts)} articles to {args.output or shared_data_path(LEMMA_TABLE)}")
+
+
+if __name__ == "__main__":
+    main()
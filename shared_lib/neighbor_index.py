@@ -0,0 +1,281 @@
+"""
+文章的 top-K 余弦近邻索引。
+
+推荐API原来在启动时计算 cosine_similarity(tfidf_matrix, tfidf_matrix)，常驻一个 N×N 的 float64 稠密矩阵
+（3.2 万篇文章时约 8 GB），而每次推荐只用到一行中最相似的几篇。NeighborIndex.build() 按 block_size 行分块：
+每块只计算该块与全部文章的相似度（block_size×N 的临时矩阵），用 argpartition 取出每行的前 K 个（不含自身）
+后丢弃。结果保存为两个 N×K 数组：indices（int32，近邻在矩阵中的行号）和 scores（float32，按相似度降序），
+内存为 O(N·K)，构建时的峰值内存为 O(block_size·(N + 特征数))，都不随语料平方增长。
+
+相似度相同的近邻按行号升序排列，与原来对整行稳定排序的结果一致；每篇文章最多只能推荐 K 篇。
+
+ArticleRecommender 是推荐请求的处理路径：文章ID -> 行号的数组、近邻索引和预先取出的标题/URL 列表。
+原来每次请求要扫描两到三遍 article_id 列、对整行 N 个相似度排序，再逐篇 df.loc；现在排序在构建索引时已经完成，
+一次请求只是一次数组查找、对 K 个相似度的切片和阈值比较，加上 top_n 次列表取值，耗时与文章总数无关
+（见 bench_recommend.py）。
+
+精确构建的计算量仍是 O(N²)，语料扩大到几十万篇时改用近似构建 NeighborIndex.build_lsh()（随机超平面 LSH，
+进程内实现，不依赖外部服务）：每张表用 bits 个随机超平面把每篇文章映射为一个签名，按签名排序后每 window 篇
+一组，只在组内精确计算相似度并合并进各自的 top-K。签名相近的文章（夹角小）排序后相邻，大概率落在同一组。
+计算量约为 tables × N × window，与 N² 无关；tables 和 window 越大召回率越高、构建越慢，bits 决定排序的粒度。
+两种构建得到同样的 NeighborIndex，请求路径不变；recall_at_k() 抽样与精确结果比较，报告 recall@K。
+
+不在语料中的查询（任意文本）没有预先算好的近邻：ArticleRecommender.recommend_vector() 用查询的 TF-IDF 向量与
+全部文章做一次稀疏矩阵-向量乘法（O(nnz)），再用 argpartition 取前 top_n 篇。
+"""
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+DEFAULT_TOP_K = 50
+DEFAULT_BLOCK_SIZE = 512
+NEIGHBOR_BACKENDS = ("exact", "lsh")
+DEFAULT_LSH_TABLES = 8
+DEFAULT_LSH_BITS = 16
+DEFAULT_LSH_WINDOW = 256
+
+
+def _top_k_block(similarities, k):
+    """similarities 每行的前 k 个（相似度降序，相同时行号升序），返回 (indices, scores)。"""
+    candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.lexsort((candidates, -candidate_scores), axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def _exact_top_k(vectors, rows, k):
+    """vectors（已 L2 归一化）中 rows 这些行与全部行的精确 top-k（不含自身）。"""
+    block = vectors[rows].T
+    # 稀疏矩阵乘稠密块（特征数×len(rows)）比稀疏乘稀疏再转稠密快得多
+    block = block.toarray() if sparse.issparse(block) else block
+    similarities = np.ascontiguousarray((vectors @ block).T)
+    similarities[np.arange(len(rows)), rows] = -np.inf # 不推荐文章本身
+    return _top_k_block(similarities, k)
+
+
+def _merge_top_k(indices, scores, new_indices, new_scores, k):
+    """把新的候选近邻合并进已有的 top-k（同一近邻可能在多张表中出现，只保留一次）。"""
+    candidates = np.concatenate([indices, new_indices], axis=1)
+    candidate_scores = np.concatenate([scores, new_scores], axis=1)
+    order = np.argsort(candidates, axis=1, kind="stable")
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+    duplicate = np.zeros(candidates.shape, dtype=bool)
+    duplicate[:, 1:] = candidates[:, 1:] == candidates[:, :-1]
+    candidate_scores[duplicate] = -np.inf
+    # 候选按行号排好序，_top_k_block 按位置打破平局即按行号
+    positions, top_scores = _top_k_block(candidate_scores, k)
+    return np.take_along_axis(candidates, positions, axis=1), top_scores
+
+
+class NeighborIndex:
+    """每篇文章（矩阵中的一行）的 top-K 近邻；行号与构建时的矩阵行号相同。"""
+
+    def __init__(self, indices, scores):
+        self.indices = indices
+        self.scores = scores
+
+    @classmethod
+    def build(cls, matrix, k=DEFAULT_TOP_K, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        从文档向量矩阵（例如 TF-IDF 的稀疏矩阵，每行一篇文章）构建索引。
+        行向量先做 L2 归一化，点积即余弦相似度；零向量与所有文章的相似度为 0。
+        """
+        n = matrix.shape[0]
+        k = max(0, min(k, n - 1))
+        indices = np.empty((n, k), dtype=np.int32)
+        scores = np.empty((n, k), dtype=np.float32)
+        if k == 0:
+            return cls(indices, scores)
+
+        vectors = normalize(matrix).astype(np.float32)
+        for start in range(0, n, block_size):
+            end = min(start + block_size, n)
+            indices[start:end], scores[start:end] = _exact_top_k(vectors, np.arange(start, end), k)
+        return cls(indices, scores)
+
+    @classmethod
+    def build_lsh(cls, matrix, k=DEFAULT_TOP_K, tables=DEFAULT_LSH_TABLES, bits=DEFAULT_LSH_BITS,
+                  window=DEFAULT_LSH_WINDOW, seed=0):
+        """
+        近似构建（随机超平面 LSH，见模块说明）。找到的近邻的相似度是精确值；
+        少于 k 个候选的文章，空位的行号为 -1、相似度为 -inf，neighbors() 不会返回它们。
+        """
+        n = matrix.shape[0]
+        k = max(0, min(k, n - 1))
+        indices = np.full((n, k), -1, dtype=np.int32)
+        scores = np.full((n, k), -np.inf, dtype=np.float32)
+        if k == 0:
+            return cls(indices, scores)
+
+        vectors = normalize(matrix).astype(np.float32)
+        if sparse.issparse(vectors):
+            vectors = vectors.tocsr()
+        rng = np.random.default_rng(seed)
+        weights = np.left_shift(1, np.arange(bits, dtype=np.int64))
+        for table in range(tables):
+            planes = rng.standard_normal((vectors.shape[1], bits)).astype(np.float32)
+            signatures = (np.asarray(vectors @ planes) > 0) @ weights
+            order = np.argsort(signatures, kind="stable").astype(np.int32)
+            # 奇数表的分组错开半个窗口，减少总被切在组边界两侧的相邻文章
+            offset = (window // 2) * (table % 2)
+            for start in range(-offset, n, window):
+                rows = order[max(start, 0):start + window]
+                if len(rows) < 2:
+                    continue
+                group = vectors[rows]
+                block = group.T.toarray() if sparse.issparse(group) else group.T
+                similarities = np.ascontiguousarray(group @ block)
+                np.fill_diagonal(similarities, -np.inf)
+                positions, group_scores = _top_k_block(similarities, min(k, len(rows) - 1))
+                indices[rows], scores[rows] = _merge_top_k(
+                    indices[rows], scores[rows], rows[positions], group_scores, k
+                )
+        return cls(indices, scores)
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes + self.scores.nbytes
+
+    def neighbors(self, row, top_n, threshold=0.0):
+        """第 row 篇文章相似度高于 threshold 的前 top_n 个近邻，返回 [(行号, 相似度)]；top_n <= 0 时为空。"""
+        top_n = max(top_n, 0) # 负数切片会返回 K 个近邻中除最后几个以外的全部
+        row_scores = self.scores[row, :top_n]
+        keep = row_scores > threshold
+        return list(zip(self.indices[row, :top_n][keep].tolist(), row_scores[keep].tolist()))
+
+
+def build_neighbor_index(matrix, backend="exact", k=DEFAULT_TOP_K, block_size=DEFAULT_BLOCK_SIZE,
+                         tables=DEFAULT_LSH_TABLES, bits=DEFAULT_LSH_BITS, window=DEFAULT_LSH_WINDOW):
+    """按 backend（NEIGHBOR_BACKENDS 之一）构建近邻索引；exact 只使用 block_size，lsh 只使用 tables / bits / window。"""
+    if backend == "exact":
+        return NeighborIndex.build(matrix, k=k, block_size=block_size)
+    if backend == "lsh":
+        return NeighborIndex.build_lsh(matrix, k=k, tables=tables, bits=bits, window=window)
+    raise ValueError(f"Unknown neighbor backend {backend!r}, expected one of {', '.join(NEIGHBOR_BACKENDS)}")
+
+
+def recall_at_k(matrix, index, k=None, sample=1000, threshold=0.0, block_size=DEFAULT_BLOCK_SIZE, seed=0):
+    """
+    index 相对精确近邻的 recall@k：随机抽取 sample 篇文章精确计算 top-k（只计相似度高于 threshold 的近邻），
+    返回其中被 index 找到的比例。精确近邻都不高于 threshold 的文章不计入；没有可比较的文章时返回 1.0。
+    """
+    n = matrix.shape[0]
+    k = index.k if k is None else min(k, index.k)
+    if k == 0:
+        return 1.0
+    rows = np.sort(np.random.default_rng(seed).choice(n, size=min(sample, n), replace=False))
+    vectors = normalize(matrix).astype(np.float32)
+    found = total = 0
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        exact_indices, exact_scores = _exact_top_k(vectors, block_rows, k)
+        for row, truth, truth_scores in zip(block_rows, exact_indices, exact_scores):
+            truth = set(truth[truth_scores > threshold].tolist())
+            approx = index.indices[row, :k][index.scores[row, :k] > threshold]
+            found += len(truth.intersection(approx.tolist()))
+            total += len(truth)
+    return found / total if total else 1.0
+
+
+class ArticleRecommender:
+    """
+    按文章ID推荐。article_ids 为非负整数（推荐API中是 DataFrame 的行标签），
+    与 titles / urls 以及 index 的行一一对应。matrix 为构建索引所用的 L2 归一化 TF-IDF 矩阵，
+    只有 recommend_vector() 需要。
+    """
+
+    def __init__(self, article_ids, titles, urls, index, matrix=None):
+        ids = np.asarray(article_ids, dtype=np.int64)
+        self.article_ids = ids.tolist()
+        self.titles = list(titles)
+        self.urls = list(urls)
+        self.index = index
+        self.matrix = sparse.csr_matrix(matrix) if matrix is not None else None
+        self._url_rows = None
+        self.rows = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int32) # 文章ID -> 行号，-1 表示不存在
+        self.rows[ids] = np.arange(len(ids), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.article_ids)
+
+    def row(self, article_id):
+        """文章ID对应的行号，不存在时返回 -1。"""
+        if 0 <= article_id < len(self.rows):
+            return int(self.rows[article_id])
+        return -1
+
+    def __contains__(self, article_id):
+        return self.row(article_id) >= 0
+
+    def article_id_for_url(self, url):
+        """URL 对应的文章ID（忽略首尾空白和末尾的 /），不存在时返回 None。"""
+        if self._url_rows is None:
+            self._url_rows = {str(u).strip().rstrip("/"): i for i, u in reversed(list(enumerate(self.urls)))}
+        row = self._url_rows.get(url.strip().rstrip("/"))
+        return None if row is None else self.article_ids[row]
+
+    def recommend(self, article_id, top_n, threshold=0.0):
+        """相似度高于 threshold 的前 top_n 篇文章，返回 [{"article_id", "title", "url", "score"}]；文章不存在时返回空列表。"""
+        row = self.row(article_id)
+        if row < 0:
+            return []
+        return [
+            {"article_id": self.article_ids[i], "title": self.titles[i], "url": self.urls[i], "score": score}
+            for i, score in self.index.neighbors(row, top_n, threshold)
+        ]
+
+    def recommend_many(self, article_ids, top_n, threshold=0.0):
+        """
+        批量推荐：一次数组 gather 取出全部文章的前 top_n 个近邻并按阈值过滤。
+        返回与 article_ids 一一对应的列表，每项与 recommend() 的结果相同；不存在的文章为 None。
+        """
+        # 先在 Python 中排除范围外的ID：任意大的整数转换为 int64 时会溢出
+        size = len(self.rows)
+        ids = np.array([i if 0 <= i < size else -1 for i in article_ids], dtype=np.int64)
+        rows = np.full(len(ids), -1, dtype=np.int32)
+        in_range = ids >= 0
+        rows[in_range] = self.rows[ids[in_range]]
+        found = np.flatnonzero(rows >= 0)
+        top_n = max(top_n, 0)
+        neighbor_rows = self.index.indices[rows[found], :top_n]
+        neighbor_scores = self.index.scores[rows[found], :top_n]
+        keep = neighbor_scores > threshold
+
+        results = [None] * len(ids)
+        for position, row_neighbors, row_scores, row_keep in zip(
+            found.tolist(), neighbor_rows.tolist(), neighbor_scores.tolist(), keep.tolist()
+        ):
+            results[position] = [
+                {"article_id": self.article_ids[i], "title": self.titles[i], "url": self.urls[i], "score": score}
+                for i, score, kept in zip(row_neighbors, row_scores, row_keep)
+                if kept
+            ]
+        return results
+
+    def recommend_vector(self, vector, top_n, threshold=0.0):
+        """
+        与任意查询向量（1×特征数，与 matrix 同一个 vectorizer 得到并 L2 归一化）余弦相似度高于 threshold 的
+        前 top_n 篇文章，格式与 recommend() 相同；相似度相同时按行号升序。
+        """
+        if self.matrix is None:
+            raise ValueError("recommend_vector() requires the TF-IDF matrix")
+        top_n = min(top_n, self.matrix.shape[0])
+        if top_n <= 0:
+            return []
+        query = np.asarray(sparse.csr_matrix(vector).toarray(), dtype=self.matrix.dtype).ravel()
+        scores = self.matrix @ query
+        candidates = np.argpartition(-scores, top_n - 1)[:top_n]
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [
+            {"article_id": self.article_ids[i], "title": self.titles[i], "url": self.urls[i], "score": float(scores[i])}
+            for i in candidates.tolist()
+            if scores[i] > threshold
+        ]
@@ -0,0 +1,299 @@
+"""
+推荐API和主题仪表盘共用的 spaCy 文本预处理。
+
+原来两边都是每篇文章调用一次 nlp(text)，跑完整的 en_core_web_sm 流水线（包括从未用到的依存句法分析
+和命名实体识别），清理用的正则也每次重新查找编译缓存；预处理是两者启动时间的主要部分。这里：
+- load_nlp() 加载模型时排除 parser 和 ner（词形还原只依赖 tok2vec / tagger / attribute_ruler / lemmatizer，
+  结果不变）；
+- SpacyPreprocessor.process() 用 nlp.pipe 按 batch_size 成批处理，n_process > 1 时使用多进程；
+- 清理正则在模块加载时编译一次。
+
+两种配置与原有的逐篇实现保持相同的输出：
+- API_CONFIG：小写 + 只保留字母和空白，保留长度大于 2、不在停用词表中的词的词元；
+- DASHBOARD_CONFIG：先去掉 HTML、代码块、行内代码和URL，额外去掉 spaCy 停用词、长度不小于 20 的词，
+  只保留名词、形容词和动词。
+
+PreprocessCache 是预处理结果的磁盘缓存（shared_data/preprocess_cache.db，SQLite）：键为文章内容和预处理配置指纹
+（PREPROCESS_VERSION、spaCy 与模型版本、启用的组件、配置和停用词表）的哈希。process_cached() 只让新增或修改过的
+文章经过 spaCy，重启时未变化的文章直接从缓存读取；配置或模型变化后指纹不同，旧条目不会再被命中。
+
+QueryEncoder 把推荐API收到的查询文本经过同样的预处理和 vectorizer.transform 转换为 TF-IDF 向量，
+最近用过的查询向量保存在进程内的 LRU 缓存中，重复的查询（例如边输入边推荐）不再经过 spaCy。
+
+除 spaCy 后端（SpacyPreprocessor）外还有不加载 spaCy 模型和 NLTK 语料的 lite 后端（见 lite_tokenizer.py），
+两者都是 Preprocessor 的子类，使用相同的配置和缓存；这个模块只在 load_nlp() 中导入 spaCy。
+
+    python -m shared_lib.bench_preprocessing --limit 200    # docs/s 基准（见 bench_preprocessing.py）
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from shared_lib.dataset import shared_data_path
+
+DEFAULT_MODEL = "en_core_web_sm"
+# 两种预处理都只用到词性和词元
+UNUSED_COMPONENTS = ("parser", "ner")
+DEFAULT_BATCH_SIZE = 64
+
+PREPROCESS_CACHE_DB = "preprocess_cache.db"
+# 修改清理正则或词元过滤逻辑时加一，使已有的缓存条目失效
+PREPROCESS_VERSION = 1
+BUSY_TIMEOUT = 30 # 秒
+LOOKUP_CHUNK = 500 # 每条 SELECT ... IN (...) 查询的键数，低于旧版 SQLite 的变量个数上限
+DEFAULT_QUERY_CACHE_SIZE = 1024 # QueryEncoder 缓存的查询向量数
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    key    TEXT PRIMARY KEY,
+    tokens TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+CODE_FENCE_RE = re.compile(r"```[\s\S]*?```")
+CODE_INLINE_RE = re.compile(r"`[^`]+`")
+URL_RE = re.compile(r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+")
+NON_LETTER_RE = re.compile(r"[^a-z\s]")
+SPACE_RE = re.compile(r"\s+")
+
+
+def clean_letters(text):
+    """小写，只保留 a-z 和空白（API 原有的清理）。"""
+    return NON_LETTER_RE.sub("", str(text).lower())
+
+
+def clean_markup(text):
+    """小写，去掉 HTML、代码、URL 和非字母字符，合并空白（仪表盘原有的清理）。"""
+    text = text.lower()
+    text = HTML_TAG_RE.sub("", text)
+    text = CODE_FENCE_RE.sub(" CODE_BLOCK ", text)
+    text = CODE_INLINE_RE.sub(" CODE_INLINE ", text)
+    text = URL_RE.sub("", text)
+    text = NON_LETTER_RE.sub("", text)
+    return SPACE_RE.sub(" ", text).strip()
+
+
+@dataclass(frozen=True)
+class PreprocessConfig:
+    cleaner: object
+    min_length: int = 3 # 保留的词至少这么长
+    max_length: Optional[int] = None # 保留的词短于这个长度
+    drop_spacy_stop_words: bool = False
+    keep_pos: Optional[frozenset] = None # 只保留这些词性，None 表示不限
+
+
+API_CONFIG = PreprocessConfig(cleaner=clean_letters)
+DASHBOARD_CONFIG = PreprocessConfig(
+    cleaner=clean_markup,
+    max_length=20,
+    drop_spacy_stop_words=True,
+    keep_pos=frozenset({"NOUN", "ADJ", "VERB"}),
+)
+
+
+def load_nlp(model=DEFAULT_MODEL, exclude=UNUSED_COMPONENTS):
+    """加载 spaCy 模型（不加载 exclude 中的组件）；模型不存在时先下载。"""
+    import spacy # 在这里导入：lite 后端（见 lite_tokenizer.py）不需要加载 spaCy
+    try:
+        return spacy.load(model, exclude=list(exclude))
+    except OSError:
+        spacy.cli.download(model)
+        return spacy.load(model, exclude=list(exclude))
+
+
+class PreprocessCache:
+    """预处理结果的磁盘缓存；每个进程各自打开一个实例。目录不可写时构造函数抛出 sqlite3.Error。"""
+
+    def __init__(self, path=None):
+        self.path = str(path or shared_data_path(PREPROCESS_CACHE_DB))
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(CACHE_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def get_many(self, keys):
+        """返回 {键: 词元串}，只包含已缓存的键。"""
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            found.update(self.conn.execute(f"SELECT key, tokens FROM tokens WHERE key IN ({placeholders})", chunk))
+        return found
+
+    def put_many(self, items):
+        """在一个事务中写入 (键, 词元串)。"""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO tokens (key, tokens) VALUES (?, ?)", items)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class Preprocessor:
+    """
+    预处理后端的公共部分：把文章正文转换为空格分隔的词元串，供 TF-IDF / LDA 使用。
+    子类实现 process() 和 _backend_fingerprint()。
+    """
+
+    def __init__(self, stop_words=(), config=API_CONFIG):
+        self.stop_words = frozenset(stop_words)
+        self.config = config
+        self.fingerprint = self._fingerprint()
+
+    def _backend_fingerprint(self):
+        raise NotImplementedError
+
+    def _fingerprint(self):
+        """决定预处理结果的全部因素的哈希，作为缓存键的一部分。"""
+        config = self.config
+        parts = {
+            "version": PREPROCESS_VERSION,
+            "backend": self._backend_fingerprint(),
+            "cleaner": config.cleaner.__name__,
+            "min_length": config.min_length,
+            "max_length": config.max_length,
+            "drop_spacy_stop_words": config.drop_spacy_stop_words,
+            "keep_pos": sorted(config.keep_pos) if config.keep_pos is not None else None,
+            "stop_words": sorted(self.stop_words),
+        }
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def cache_key(self, text):
+        return hashlib.sha1(f"{self.fingerprint}\0{text}".encode("utf-8")).hexdigest()
+
+    def _keep_word(self, text):
+        """只取决于词本身的过滤条件（长度、停用词表）。"""
+        config = self.config
+        return (
+            len(text) >= config.min_length
+            and (config.max_length is None or len(text) < config.max_length)
+            and text not in self.stop_words
+        )
+
+    def process(self, texts, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        raise NotImplementedError
+
+    def process_one(self, text):
+        return next(iter(self.process([text])))
+
+    def process_cached(self, texts, cache=None, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        """
+        返回与 list(process(texts)) 相同的列表。cache 为 PreprocessCache 时先查缓存，
+        只有未命中的文章（相同内容只处理一次）经过预处理，结果写回缓存。
+        """
+        if cache is None:
+            return list(self.process(texts, batch_size=batch_size, n_process=n_process))
+        texts = [text if isinstance(text, str) else "" for text in texts]
+        keys = [self.cache_key(text) for text in texts]
+        results = cache.get_many(set(keys))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in results:
+                missing.setdefault(key, text)
+        if missing:
+            processed = dict(zip(missing, self.process(missing.values(), batch_size=batch_size, n_process=n_process)))
+            cache.put_many(processed.items())
+            results.update(processed)
+        cache.misses += len(missing)
+        cache.hits += len(texts) - len(missing)
+        return [results[key] for key in keys]
+
+
+class SpacyPreprocessor(Preprocessor):
+    """spaCy 后端：词元和词性来自 spaCy 模型。"""
+
+    def __init__(self, nlp, stop_words=(), config=API_CONFIG):
+        self.nlp = nlp
+        super().__init__(stop_words, config)
+
+    def _backend_fingerprint(self):
+        import spacy
+        meta = self.nlp.meta
+        return {
+            "spacy": spacy.__version__,
+            "model": f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}",
+            "pipeline": list(self.nlp.pipe_names),
+        }
+
+    def _keep(self, token):
+        config = self.config
+        return (
+            token.is_alpha
+            and self._keep_word(token.text)
+            and not (config.drop_spacy_stop_words and token.is_stop)
+            and (config.keep_pos is None or token.pos_ in config.keep_pos)
+        )
+
+    def process_one(self, text):
+        return " ".join(token.lemma_ for token in self.nlp(self.config.cleaner(text)) if self._keep(token))
+
+    def process(self, texts, batch_size=DEFAULT_BATCH_SIZE, n_process=1):
+        """
+        按输入顺序逐篇产出处理结果；空值（None / NaN）产出空字符串。
+        n_process > 1 时 spaCy 启动子进程，调用方需要位于 `if __name__ == "__main__":` 之后或服务进程中。
+        """
+        cleaned = (self.config.cleaner(text) if isinstance(text, str) else "" for text in texts)
+        for doc in self.nlp.pipe(cleaned, batch_size=batch_size, n_process=n_process):
+            yield " ".join(token.lemma_ for token in doc if self._keep(token))
+
+
+class QueryEncoder:
+    """
+    查询文本 -> TF-IDF 向量（1×特征数的稀疏矩阵），最近 cache_size 个查询的向量按 LRU 缓存。
+    缓存键为 preprocessor.cache_key(text)，只在进程内有效；多个线程可以同时调用 encode()。
+    """
+
+    def __init__(self, preprocessor, vectorizer, cache_size=DEFAULT_QUERY_CACHE_SIZE):
+        self.preprocessor = preprocessor
+        self.vectorizer = vectorizer
+        self.cache_size = cache_size
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def encode(self, text):
+        """返回 (向量, 是否命中缓存)。"""
+        key = self.preprocessor.cache_key(text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                self.hits += 1
+                return vector, True
+        # 预处理和向量化在锁外进行，同一查询并发到达时可能各算一遍，结果相同
+        vector = self.vectorizer.transform([self.preprocessor.process_one(text)])
+        with self._lock:
+            self.misses += 1
+            if self.cache_size > 0:
+                self._vectors[key] = vector
+                self._vectors.move_to_end(key)
+                while len(self._vectors) > self.cache_size:
+                    self._vectors.popitem(last=False)
+        return vector, False